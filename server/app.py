@@ -3,7 +3,8 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from dotenv import load_dotenv
-from database.database import client, MONGODB_URI
+from database.database import client, db, MONGODB_URI
+from database.migrations import verify_schema, migrate_in_background, SCHEMA_VERSION, MIGRATE_ON_STARTUP
 from routes.auth_routes import auth_router
 from routes.user_routes import user_router
 from routes.transaction_routes import transaction_router
@@ -11,7 +12,13 @@ from routes.dashboard_routes import dashboard_router
 from routes.chat_routes import router as chat_router
 from routes.cache_routes import router as cache_router
 from routes.upload_routes import upload_router
+from routes.category_routes import category_router
+from routes.import_job_routes import import_job_router
+from routes.metrics_routes import metrics_router
+from routes.admin_routes import admin_router
 from contextlib import asynccontextmanager
+import asyncio
+import logging
 import os
 import time
 import traceback
@@ -19,11 +26,17 @@ import traceback
 load_dotenv()  # loads variables from .env file
 
 # Import logger AFTER load_dotenv
-from utils.logger import logger
+from utils.logger import logger, request_logger
+from utils.uploads import MAX_UPLOAD_BYTES, MULTIPART_OVERHEAD_BYTES
+from database.monitoring import current_route
+from utils.metrics import http_requests_total, http_request_duration_seconds, http_requests_in_flight, route_template
+from utils.profiling import ProfilingMiddleware
+from utils.loop_monitor import loop_monitor, LOOP_MONITOR_ENABLED
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    migration_task = None
     try:
         logger.info("🚀 Starting Expense Tracker API...")
         
@@ -34,22 +47,35 @@ async def lifespan(app: FastAPI):
         else:
             logger.error("❌ GEMINI_API_KEY NOT found in environment!")
 
-        await client.admin.command("ping")
-        logger.info(f"✅ Database Connected: {MONGODB_URI}")
-        
-        # Create indexes on startup
-        logger.info("📊 Creating MongoDB indexes...")
-        from scripts.create_indexes import create_indexes
-        await create_indexes()
-        logger.info("✅ Indexes created successfully")
+        if getattr(app.state, "schema_verified", False):
+            # Checked once by the pre-fork master (serve.py) before forking this worker
+            logger.info(f"✅ Database schema verified by the master: {MONGODB_URI}")
+        else:
+            # One indexed read: proves the connection and checks the schema version
+            version = await verify_schema(db)
+            logger.info(f"✅ Database Connected: {MONGODB_URI}")
+            if version < SCHEMA_VERSION and MIGRATE_ON_STARTUP:
+                migration_task = asyncio.create_task(migrate_in_background(db))
         
     except Exception as e:
         logger.error(f"❌ Startup error: {str(e)}")
         logger.error(traceback.format_exc())
+
+    # Background import jobs (also resumes jobs interrupted by a restart)
+    from services.import_job_service import import_job_worker
+    await import_job_worker.start()
+
+    if LOOP_MONITOR_ENABLED:
+        await loop_monitor.start()
     
     yield
     
     logger.info("👋 Shutting down...")
+    if migration_task is not None and not migration_task.done():
+        migration_task.cancel()
+        await asyncio.gather(migration_task, return_exceptions=True)
+    await loop_monitor.stop()
+    await import_job_worker.stop()
     client.close()
 
 
@@ -61,21 +87,35 @@ app = FastAPI(
 )
 
 
+# Opt-in profiling of admin requests (X-Profile: 1). Added before the
+# @app.middleware functions so it is innermost and shares the handler's task.
+app.add_middleware(ProfilingMiddleware)
+
+
 # Request logging middleware
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
     start_time = time.time()
+    http_requests_in_flight.inc()
+    # Lets the Mongo command listener attribute slow queries to this request
+    current_route.set(f"{request.method} {request.url.path}")
     
-    # Log incoming request
-    logger.info(f"📨 {request.method} {request.url.path}")
-    logger.debug(f"Headers: {dict(request.headers)}")
+    # Log incoming request (arguments are only formatted if DEBUG is enabled)
+    if request_logger.isEnabledFor(logging.DEBUG):
+        request_logger.debug("📨 %s %s - Headers: %s", request.method, request.url.path, dict(request.headers))
     
+    status_code = 500
     try:
         response = await call_next(request)
         process_time = time.time() - start_time
+        status_code = response.status_code
         
         # Log response
-        logger.info(f"✅ {request.method} {request.url.path} - {response.status_code} ({process_time:.2f}s)")
+        request_logger.info(
+            "✅ %s %s - %s (%.2fs)", request.method, request.url.path, response.status_code, process_time,
+            extra={"method": request.method, "path": request.url.path, "status": response.status_code,
+                   "duration_ms": round(process_time * 1000, 1)}
+        )
         
         # Add process time header
         response.headers["X-Process-Time"] = str(process_time)
@@ -86,6 +126,34 @@ async def log_requests(request: Request, call_next):
         logger.error(f"❌ {request.method} {request.url.path} - Error: {str(e)} ({process_time:.2f}s)")
         logger.error(traceback.format_exc())
         raise
+    finally:
+        http_requests_in_flight.dec()
+        route = route_template(request.scope)
+        http_requests_total.inc(method=request.method, route=route, status=status_code)
+        http_request_duration_seconds.observe(time.time() - start_time, method=request.method, route=route,
+                                             status=status_code)
+
+
+# Routes that take statement uploads
+UPLOAD_PATH_PREFIXES = ("/api/upload", "/api/import-jobs")
+
+
+# Reject oversized uploads before the multipart body is read
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    if request.method == "POST" and request.url.path.startswith(UPLOAD_PATH_PREFIXES):
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES:
+            logger.warning(f"⚠️ Upload rejected: {content_length} bytes on {request.url.path}")
+            return JSONResponse(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                content={
+                    "success": False,
+                    "error": "File too large",
+                    "detail": f"Maximum upload size is {MAX_UPLOAD_BYTES // (1024 * 1024)}MB"
+                }
+            )
+    return await call_next(request)
 
 
 # Global exception handler
@@ -132,7 +200,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["X-Process-Time"]
+    expose_headers=["X-Process-Time", "X-Profile-Id"]
 )
 
 
@@ -146,6 +214,10 @@ app.include_router(dashboard_router, prefix="/dashboard", tags=["dashboard"])
 app.include_router(chat_router, prefix="/api/chat", tags=["AI Chatbot"])
 app.include_router(cache_router, prefix="/api/cache", tags=["Cache Management"])
 app.include_router(upload_router, prefix="/api/upload", tags=["Upload"]) # Added include_router for upload_router
+app.include_router(category_router, prefix="/api/categories", tags=["Categories"])
+app.include_router(import_job_router, prefix="/api/import-jobs", tags=["Import Jobs"])
+app.include_router(metrics_router, prefix="/metrics", tags=["Metrics"])
+app.include_router(admin_router, prefix="/api/admin", tags=["Admin"])
 
 
 @app.get("/", include_in_schema=False)
@@ -5,8 +5,10 @@ from dotenv import load_dotenv
 
 load_dotenv()  # load .env vars
 
+from database.monitoring import command_listener
+
 MONGODB_URI = os.getenv("MONGODB_URL")
 DB_NAME = os.getenv("DATABASE_NAME", "farm")
 
-client = AsyncIOMotorClient(MONGODB_URI)
+client = AsyncIOMotorClient(MONGODB_URI, event_listeners=[command_listener])
 db = client[DB_NAME]
@@ -0,0 +1,193 @@
+"""
+Versioned schema migrations
+
+Each migration is an idempotent async step `up(db)` with a version number.
+Applied versions are recorded in the `schema_migrations` collection
+({_id: version, name, applied_at, duration_ms, applied_by}); a migration
+runs exactly once per database because the runner holds a lease-based lock
+(the `_id: "lock"` document) while it applies pending steps, re-reads the
+applied versions after taking it, and renews the lease while a step runs.
+
+App startup only reads the highest applied version (one indexed find_one,
+which also proves the connection). When the database is behind, the API
+still starts; with MIGRATE_ON_STARTUP the pending steps are applied by a
+background task on whichever replica takes the lock, otherwise run:
+
+    python -m database.migrations            # apply pending migrations
+    python -m database.migrations --status   # applied / pending
+
+New indexes or data changes get a new entry in MIGRATIONS; never edit a
+migration that has shipped.
+
+Environment:
+    MIGRATE_ON_STARTUP         "false" leaves pending migrations to the CLI (true)
+    MIGRATION_LOCK_SECONDS     lock lease, renewed while a step runs (60)
+"""
+import argparse
+import asyncio
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from utils.logger import logger
+
+MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "true").lower() == "true"
+MIGRATION_LOCK_SECONDS = int(os.getenv("MIGRATION_LOCK_SECONDS", "60"))
+MIGRATION_LOCK_POLL_SECONDS = 2
+LOCK_ID = "lock"
+
+
+async def baseline_indexes(db):
+    from scripts.create_indexes import create_indexes
+    await create_indexes(db)
+
+
+async def workload_transaction_indexes(db):
+    from scripts.migrate_transaction_indexes import migrate_indexes
+    await migrate_indexes(db)
+
+
+MIGRATIONS: List[Dict[str, Any]] = [
+    {"version": 1, "name": "baseline_indexes", "up": baseline_indexes},
+    {"version": 2, "name": "workload_transaction_indexes", "up": workload_transaction_indexes},
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1]["version"]
+
+
+def lock_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+async def schema_version(db) -> int:
+    """Highest applied migration version (0 for an empty database)"""
+    latest = await db.schema_migrations.find_one({"_id": {"$type": "number"}}, {"_id": 1}, sort=[("_id", -1)])
+    return latest["_id"] if latest else 0
+
+
+async def applied_migrations(db) -> List[Dict[str, Any]]:
+    return await db.schema_migrations.find({"_id": {"$type": "number"}}).sort("_id", 1).to_list(None)
+
+
+def pending_migrations(applied_versions) -> List[Dict[str, Any]]:
+    applied_versions = set(applied_versions)
+    return [m for m in MIGRATIONS if m["version"] not in applied_versions]
+
+
+async def acquire_lock(db, owner: str, lease_seconds: int = MIGRATION_LOCK_SECONDS) -> bool:
+    """Take (or renew) the migration lock; False while another owner's lease is live"""
+    now = datetime.now()
+    try:
+        await db.schema_migrations.update_one(
+            {"_id": LOCK_ID, "$or": [{"owner": owner}, {"expires_at": {"$lt": now}}]},
+            {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=lease_seconds)}},
+            upsert=True
+        )
+        return True
+    except DuplicateKeyError:
+        # The filter missed an existing lock, so the upsert collided with it
+        return False
+
+
+async def release_lock(db, owner: str):
+    await db.schema_migrations.delete_one({"_id": LOCK_ID, "owner": owner})
+
+
+async def _renew_lock(db, owner: str, lease_seconds: int):
+    while True:
+        await asyncio.sleep(lease_seconds / 3)
+        if not await acquire_lock(db, owner, lease_seconds):
+            logger.error("❌ Lost the migration lock while a migration was running")
+            return
+
+
+async def run_migrations(db, wait: bool = True, owner: Optional[str] = None,
+                         lease_seconds: int = MIGRATION_LOCK_SECONDS) -> List[int]:
+    """
+    Apply pending migrations in order under the lock. Returns the versions
+    applied here. With wait=False, returns [] when another process holds
+    the lock; with wait=True, waits for it (and for whatever it applies).
+    """
+    owner = owner or lock_owner()
+    while not await acquire_lock(db, owner, lease_seconds):
+        if not wait:
+            logger.info("ℹ️ Another process is applying migrations")
+            return []
+        await asyncio.sleep(MIGRATION_LOCK_POLL_SECONDS)
+
+    applied = []
+    renewer = asyncio.create_task(_renew_lock(db, owner, lease_seconds))
+    try:
+        # Re-read under the lock: a previous holder may have applied some
+        done = [m["_id"] for m in await applied_migrations(db)]
+        for migration in pending_migrations(done):
+            logger.info(f"🔧 Applying migration {migration['version']} {migration['name']}...")
+            started = time.perf_counter()
+            await migration["up"](db)
+            duration_ms = round((time.perf_counter() - started) * 1000)
+            await db.schema_migrations.insert_one({
+                "_id": migration["version"],
+                "name": migration["name"],
+                "applied_at": datetime.now(),
+                "duration_ms": duration_ms,
+                "applied_by": owner,
+            })
+            applied.append(migration["version"])
+            logger.info(f"✅ Migration {migration['version']} applied in {duration_ms}ms")
+    finally:
+        renewer.cancel()
+        try:
+            await renewer
+        except asyncio.CancelledError:
+            pass
+        await release_lock(db, owner)
+    return applied
+
+
+async def verify_schema(db) -> int:
+    """Startup check: log whether the database is at SCHEMA_VERSION, return its version"""
+    version = await schema_version(db)
+    if version >= SCHEMA_VERSION:
+        logger.info(f"✅ Database schema at version {version}")
+    else:
+        logger.warning(f"⚠️ Database schema at version {version}, expected {SCHEMA_VERSION} "
+                       f"(pending: {', '.join(m['name'] for m in pending_migrations(range(version + 1)))})")
+    return version
+
+
+async def migrate_in_background(db):
+    """Startup task: apply pending migrations unless another replica is already doing so"""
+    try:
+        await run_migrations(db, wait=False)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Background migration failed: {str(e)}")
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations")
+    parser.add_argument("--status", action="store_true", help="list applied and pending migrations")
+    args = parser.parse_args(argv)
+
+    from database.database import client, db
+    try:
+        applied = await applied_migrations(db)
+        if args.status:
+            for record in applied:
+                print(f"  ✅ {record['_id']:>4} {record['name']:<32} {record['applied_at']:%Y-%m-%d %H:%M} {record['applied_by']}")
+            for migration in pending_migrations(r["_id"] for r in applied):
+                print(f"  ⏳ {migration['version']:>4} {migration['name']}")
+            return
+        versions = await run_migrations(db)
+        print(f"✅ Applied {versions}" if versions else "✅ Nothing to apply")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,325 @@
+"""
+MongoDB command monitoring: per-command metrics, query shape statistics
+and a slow-query log
+
+A pymongo CommandListener registered on the client times every command and
+records its collection, query shape (the filter/pipeline with literal
+values redacted) and the number of documents returned. Commands slower than
+SLOW_QUERY_MS are logged with the route that issued them and kept in a small
+in-memory buffer, from which an explain() plan summary can be requested.
+"""
+import json
+import logging
+import os
+import threading
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, Tuple, Any, Optional, List
+from pymongo import monitoring
+from utils.metrics import metrics
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_BUFFER = 100
+MAX_QUERY_SHAPES = 500
+MAX_OPEN_CURSORS = 1000  # cursors closed early (killCursors) are never seen exhausted
+
+# Driver chatter that would swamp the per-collection numbers
+IGNORED_COMMANDS = {"hello", "ismaster", "isMaster", "ping", "saslStart", "saslContinue", "endSessions", "buildInfo", "killCursors", "explain"}
+
+# Command fields that make up the query shape
+SHAPE_FIELDS = {
+    "find": ("filter", "sort", "projection"),
+    "aggregate": ("pipeline",),
+    "count": ("query",),
+    "distinct": ("key", "query"),
+    "findAndModify": ("query", "sort", "update"),
+    "update": ("updates",),
+    "delete": ("deletes",),
+}
+EXPLAINABLE_COMMANDS = set(SHAPE_FIELDS)
+
+# Values kept verbatim because they are part of the shape, not literals
+VERBATIM_KEYS = {"sort", "projection", "key", "$sort", "$project"}
+
+# Route of the request that issued a command ("GET /dashboard/kpis"), set by the request middleware.
+# Motor copies the context into its executor threads, so the listener can read it.
+current_route: ContextVar[str] = ContextVar("current_route", default="")
+
+slow_query_logger = logging.getLogger("expense_tracker.slow_queries")
+
+mongo_command_duration_seconds = metrics.histogram(
+    "mongo_command_duration_seconds",
+    "MongoDB command latency by collection and command",
+    ("collection", "command"),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+mongo_command_failures_total = metrics.counter(
+    "mongo_command_failures_total", "Failed MongoDB commands by collection and command", ("collection", "command")
+)
+mongo_documents_returned_total = metrics.counter(
+    "mongo_documents_returned_total", "Documents returned (or matched, for writes and counts) by collection and command", ("collection", "command")
+)
+mongo_slow_commands_total = metrics.counter(
+    "mongo_slow_commands_total", "Commands slower than SLOW_QUERY_MS by collection and command", ("collection", "command")
+)
+
+
+def command_collection(command_name: str, command: Dict[str, Any]) -> str:
+    """The target collection of a command ('' for database-level commands)"""
+    target = command.get("collection") if command_name == "getMore" else command.get(command_name)
+    return target if isinstance(target, str) else ""
+
+
+def redact(value: Any, verbatim: bool = False) -> Any:
+    """Replace literal values with '?', keeping field names, operators and $field paths"""
+    if isinstance(value, dict):
+        return {k: redact(v, verbatim or k in VERBATIM_KEYS) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        items = [redact(v, verbatim) for v in value]
+        # Literal arrays ($in lists) collapse so their length doesn't change the shape
+        if items and all(item == "?" for item in items):
+            return ["?"]
+        return items
+    if verbatim or (isinstance(value, str) and value.startswith("$")):
+        return value
+    return "?"
+
+
+def command_shape(command_name: str, command: Dict[str, Any]) -> str:
+    """Redacted JSON of the fields that determine how a command executes"""
+    fields = SHAPE_FIELDS.get(command_name)
+    if not fields:
+        return command_name
+    shape = {}
+    for field in fields:
+        if field in command:
+            value = command[field]
+            # Write commands carry one statement per document; the first describes the batch
+            if field in ("updates", "deletes"):
+                value = list(value[:1])
+            shape[field] = redact(value, field in VERBATIM_KEYS)
+    return json.dumps(shape, default=str, separators=(",", ":"))
+
+
+def documents_returned(command_name: str, reply: Dict[str, Any]) -> int:
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch") or cursor.get("nextBatch") or [])
+    if command_name == "distinct":
+        return len(reply.get("values") or [])
+    if command_name == "findAndModify":
+        return 1 if reply.get("value") else 0
+    n = reply.get("n")
+    return n if isinstance(n, int) else 0
+
+
+def explainable_command(command: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of a command without session/cluster fields, suitable for {explain: ...}"""
+    return {
+        k: v for k, v in command.items()
+        if not k.startswith("$") and k not in ("lsid", "txnNumber", "autocommit", "startTransaction")
+    }
+
+
+class CommandMetricsListener(monitoring.CommandListener):
+    """
+    Times every command. Started events carry the command document and
+    succeeded/failed events only the reply, so the command is remembered in
+    between; getMore batches are attributed to the cursor's originating query.
+    Events fire on the driver's threads.
+    """
+
+    def __init__(self, slow_query_ms: float = SLOW_QUERY_MS):
+        self.slow_query_ms = slow_query_ms
+        self._pending: Dict[Tuple[Any, int], Tuple[str, str, Dict[str, Any], str, str]] = {}
+        self._cursors: Dict[int, Tuple[str, Dict[str, Any], str]] = {}
+        self._shapes: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        self._slow: deque = deque(maxlen=SLOW_QUERY_BUFFER)
+        self._slow_seq = 0
+        self._lock = threading.Lock()
+
+    def started(self, event: monitoring.CommandStartedEvent):
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        entry = (
+            command_collection(event.command_name, event.command),
+            event.command_name,
+            event.command,
+            current_route.get(),
+            event.database_name
+        )
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = entry
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent):
+        with self._lock:
+            entry = self._pending.pop((event.connection_id, event.request_id), None)
+        if entry is None:
+            return
+        collection, command_name, command, route, database = entry
+        duration_ms = event.duration_micros / 1000
+        docs = documents_returned(command_name, event.reply)
+        mongo_command_duration_seconds.observe(duration_ms / 1000, collection=collection, command=command_name)
+        mongo_documents_returned_total.inc(docs, collection=collection, command=command_name)
+
+        cursor = event.reply.get("cursor") if isinstance(event.reply.get("cursor"), dict) else {}
+        cursor_id = cursor.get("id", 0)
+        if command_name == "getMore":
+            # Attribute later batches to the query that opened the cursor
+            with self._lock:
+                origin = self._cursors.get(command.get("getMore"))
+                if origin and not cursor_id:
+                    self._cursors.pop(command.get("getMore"), None)
+            if not origin:
+                return
+            command_name, command, shape = origin
+        else:
+            shape = command_shape(command_name, command)
+            if cursor_id:
+                with self._lock:
+                    if len(self._cursors) >= MAX_OPEN_CURSORS:
+                        self._cursors.pop(next(iter(self._cursors)))
+                    self._cursors[cursor_id] = (command_name, command, shape)
+
+        self._record_shape(collection, command_name, shape, duration_ms, docs)
+        if duration_ms >= self.slow_query_ms:
+            self._record_slow(collection, command_name, command, shape, duration_ms, docs, route, database)
+
+    def failed(self, event: monitoring.CommandFailedEvent):
+        with self._lock:
+            entry = self._pending.pop((event.connection_id, event.request_id), None)
+        if entry is None:
+            return
+        collection, command_name = entry[0], entry[1]
+        mongo_command_duration_seconds.observe(event.duration_micros / 1e6, collection=collection, command=command_name)
+        mongo_command_failures_total.inc(collection=collection, command=command_name)
+
+    def _record_shape(self, collection: str, command_name: str, shape: str, duration_ms: float, docs: int):
+        key = (collection, command_name, shape)
+        with self._lock:
+            stats = self._shapes.get(key)
+            if stats is None:
+                if len(self._shapes) >= MAX_QUERY_SHAPES:
+                    key = (collection, command_name, "(other)")
+                    stats = self._shapes.get(key)
+                if stats is None:
+                    stats = self._shapes[key] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "docs": 0}
+            stats["count"] += 1
+            stats["total_ms"] += duration_ms
+            stats["max_ms"] = max(stats["max_ms"], duration_ms)
+            stats["docs"] += docs
+
+    def _record_slow(self, collection, command_name, command, shape, duration_ms, docs, route, database):
+        mongo_slow_commands_total.inc(collection=collection, command=command_name)
+        with self._lock:
+            self._slow_seq += 1
+            self._slow.append({
+                "id": self._slow_seq,
+                "at": datetime.now(),
+                "database": database,
+                "collection": collection,
+                "command": command_name,
+                "shape": shape,
+                "duration_ms": round(duration_ms, 1),
+                "docs": docs,
+                "route": route,
+                "explain": None,
+                "_command": explainable_command(command) if command_name in EXPLAINABLE_COMMANDS else None
+            })
+        slow_query_logger.warning(
+            "🐢 Slow %s on %s: %.1fms, %d docs (%s) %s", command_name, collection, duration_ms, docs, route or "no route", shape,
+            extra={"collection": collection, "command": command_name, "duration_ms": round(duration_ms, 1),
+                   "docs": docs, "route": route, "shape": shape}
+        )
+
+    def query_stats(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Query shapes ordered by total time spent"""
+        with self._lock:
+            items = list(self._shapes.items())
+        items.sort(key=lambda item: item[1]["total_ms"], reverse=True)
+        return [
+            {
+                "collection": collection, "command": command_name, "shape": shape,
+                "count": s["count"], "total_ms": round(s["total_ms"], 1), "avg_ms": round(s["total_ms"] / s["count"], 2),
+                "max_ms": round(s["max_ms"], 1), "docs": s["docs"]
+            }
+            for (collection, command_name, shape), s in items[:limit]
+        ]
+
+    def slow_queries(self) -> List[Dict[str, Any]]:
+        """Recent slow commands, newest first"""
+        with self._lock:
+            entries = list(self._slow)
+        return [{k: v for k, v in entry.items() if not k.startswith("_")} for entry in reversed(entries)]
+
+    def get_slow_query(self, slow_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return next((entry for entry in self._slow if entry["id"] == slow_id), None)
+
+    def reset(self):
+        with self._lock:
+            self._shapes.clear()
+            self._slow.clear()
+            self._cursors.clear()
+
+
+def _find_key(document: Any, key: str) -> Any:
+    """First value of `key` anywhere in a nested explain document"""
+    if isinstance(document, dict):
+        if key in document:
+            return document[key]
+        children = document.values()
+    elif isinstance(document, list):
+        children = document
+    else:
+        return None
+    for child in children:
+        found = _find_key(child, key)
+        if found is not None:
+            return found
+    return None
+
+
+def _plan_stages(plan: Any) -> List[str]:
+    """Flatten a winning plan into 'STAGE(index)' entries, leaf first"""
+    if not isinstance(plan, dict):
+        return []
+    plan = plan.get("queryPlan", plan)
+    stages = []
+    for child in plan.get("inputStages", []) + ([plan["inputStage"]] if "inputStage" in plan else []):
+        stages.extend(_plan_stages(child))
+    if "stage" in plan:
+        stages.append(f"{plan['stage']}({plan['indexName']})" if plan.get("indexName") else plan["stage"])
+    return stages
+
+
+def summarize_explain(explain: Dict[str, Any]) -> Dict[str, Any]:
+    """Plan stages, indexes used and (with executionStats) examined/returned counts"""
+    stages = _plan_stages(_find_key(explain, "winningPlan"))
+    stats = _find_key(explain, "executionStats") or {}
+    return {
+        "plan": " -> ".join(stages),
+        "collection_scan": any(stage.startswith("COLLSCAN") for stage in stages),
+        "indexes": sorted({stage[stage.index("(") + 1:-1] for stage in stages if "(" in stage}),
+        "keys_examined": stats.get("totalKeysExamined"),
+        "docs_examined": stats.get("totalDocsExamined"),
+        "returned": stats.get("nReturned"),
+        "execution_ms": stats.get("executionTimeMillis"),
+    }
+
+
+async def explain_slow_query(client, slow_id: int, verbosity: str = "queryPlanner") -> Optional[Dict[str, Any]]:
+    """Run explain() for a recorded slow command and keep the summary with it"""
+    entry = command_listener.get_slow_query(slow_id)
+    if entry is None:
+        return None
+    if entry["_command"] is None:
+        raise ValueError(f"'{entry['command']}' commands cannot be explained")
+    explain = await client[entry["database"]].command({"explain": entry["_command"], "verbosity": verbosity})
+    entry["explain"] = summarize_explain(explain)
+    return {k: v for k, v in entry.items() if not k.startswith("_")}
+
+
+# Global instance
+command_listener = CommandMetricsListener()
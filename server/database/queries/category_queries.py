@@ -0,0 +1,58 @@
+"""
+Merchant category memo database queries
+"""
+from database.database import db
+from bson import ObjectId
+from datetime import datetime
+from pymongo import UpdateOne
+from typing import List, Dict, Any, Optional, Tuple
+
+
+async def increment_merchant_counts_query(entries: List[Tuple[Optional[ObjectId], str, str, int]]) -> None:
+    """Upsert (user_id, merchant, category) counters; user_id None is the global memo"""
+    if not entries:
+        return
+    now = datetime.now()
+    await db.merchant_categories.bulk_write([
+        UpdateOne(
+            {"user_id": user_id, "merchant": merchant, "category": category},
+            {"$inc": {"count": count}, "$set": {"updated_at": now}},
+            upsert=True
+        )
+        for user_id, merchant, category, count in entries
+    ], ordered=False)
+
+
+async def get_merchant_counts_query(user_id: str, merchants: List[str]) -> List[Dict[str, Any]]:
+    """Get user and global counters for the given merchants"""
+    cursor = db.merchant_categories.find(
+        {"user_id": {"$in": [ObjectId(user_id), None]}, "merchant": {"$in": merchants}},
+        {"_id": 0, "user_id": 1, "merchant": 1, "category": 1, "count": 1}
+    )
+    return await cursor.to_list(length=None)
+
+
+async def replace_merchant_counts_query(user_id: Optional[ObjectId], entries: List[Tuple[Optional[ObjectId], str, str, int]]) -> None:
+    """Replace one user's counters (or, with user_id None, the whole memo) with freshly computed ones"""
+    await db.merchant_categories.delete_many({"user_id": user_id} if user_id else {})
+    now = datetime.now()
+    docs = [
+        {"user_id": owner, "merchant": merchant, "category": category, "count": count, "updated_at": now}
+        for owner, merchant, category, count in entries
+    ]
+    if docs:
+        await db.merchant_categories.insert_many(docs, ordered=False)
+
+
+async def get_description_category_counts_query(match: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Count transactions per (user, description, category)"""
+    pipeline = [
+        {"$match": match},
+        {
+            "$group": {
+                "_id": {"user_id": "$user_id", "description": "$description", "category": "$category"},
+                "count": {"$sum": 1}
+            }
+        }
+    ]
+    return await db.transactions.aggregate(pipeline, allowDiskUse=True).to_list(length=None)
@@ -4,8 +4,12 @@ Transaction database queries
 from database.database import db
 from bson import ObjectId
 from datetime import datetime
+from pymongo import InsertOne
+from pymongo.errors import BulkWriteError
 from typing import List, Dict, Any, Optional
 
+DUPLICATE_KEY_ERROR = 11000
+
 async def create_transaction_query(transaction_data: Dict[str, Any]) -> Dict[str, Any]:
     """Insert a new transaction"""
     result = await db.transactions.insert_one(transaction_data)
@@ -13,6 +17,59 @@ async def create_transaction_query(transaction_data: Dict[str, Any]) -> Dict[str
     transaction_data.pop("_id", None)
     return transaction_data
 
+async def bulk_insert_transactions_query(docs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Unordered bulk insert. Rows rejected by the fingerprint unique index are
+    reported as skipped; any other write error as failed. `inserted_indexes`
+    lists the positions in `docs` that were written.
+    """
+    try:
+        result = await db.transactions.bulk_write([InsertOne(doc) for doc in docs], ordered=False)
+        return {"inserted": result.inserted_count, "inserted_indexes": list(range(len(docs))),
+                "skipped": 0, "failed": 0, "errors": []}
+    except BulkWriteError as e:
+        write_errors = e.details.get("writeErrors", [])
+        duplicates = sum(1 for err in write_errors if err.get("code") == DUPLICATE_KEY_ERROR)
+        others = [err for err in write_errors if err.get("code") != DUPLICATE_KEY_ERROR]
+        # Unordered: every operation without a write error was applied
+        rejected = {err.get("index") for err in write_errors}
+        return {
+            "inserted": e.details.get("nInserted", 0),
+            "inserted_indexes": [index for index in range(len(docs)) if index not in rejected],
+            "skipped": duplicates,
+            "failed": len(others),
+            "errors": [{"index": err.get("index"), "error": err.get("errmsg")} for err in others]
+        }
+
+async def bulk_write_transactions_query(operations: List[Any]) -> Dict[str, Any]:
+    """
+    Run mixed insert/update/delete operations as one unordered bulk_write.
+    Returns the aggregate counts and the write errors keyed by operation index.
+    """
+    try:
+        result = await db.transactions.bulk_write(operations, ordered=False)
+        return {
+            "inserted": result.inserted_count,
+            "modified": result.modified_count,
+            "deleted": result.deleted_count,
+            "errors": {}
+        }
+    except BulkWriteError as e:
+        return {
+            "inserted": e.details.get("nInserted", 0),
+            "modified": e.details.get("nModified", 0),
+            "deleted": e.details.get("nRemoved", 0),
+            "errors": {err.get("index"): err.get("errmsg") for err in e.details.get("writeErrors", [])}
+        }
+
+async def get_existing_transaction_ids_query(user_id: str, transaction_ids: List[ObjectId]) -> set:
+    """Return which of the given transaction IDs belong to the user"""
+    cursor = db.transactions.find(
+        {"_id": {"$in": transaction_ids}, "user_id": ObjectId(user_id)},
+        {"_id": 1}
+    )
+    return {doc["_id"] for doc in await cursor.to_list(length=None)}
+
 async def get_transaction_by_id_query(user_id: str, transaction_id: str) -> Optional[Dict[str, Any]]:
     """Get a transaction by ID and User ID"""
     return await db.transactions.find_one({
@@ -57,6 +114,10 @@ async def get_all_transactions_query(query: Dict[str, Any], sort_field: str = "d
     cursor = db.transactions.find(query).sort(sort_field, sort_order)
     return await cursor.to_list(length=None)
 
+async def aggregate_transactions_query(pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Run an aggregation pipeline over the transactions collection"""
+    return await db.transactions.aggregate(pipeline).to_list(length=None)
+
 async def get_filtered_totals_query(query: Dict[str, Any]) -> Dict[str, float]:
     """Calculate total credits and debits for filtered transactions"""
     pipeline = [
@@ -58,3 +58,13 @@ async def soft_delete_user_query(user_id: str) -> bool:
         }}
     )
     return result.matched_count > 0
+
+
+async def get_data_version_query(user_id: str) -> int:
+    """Counter bumped on every write to the user's transactions (0 before the first)"""
+    doc = await db.user_data_versions.find_one({"_id": ObjectId(user_id)})
+    return doc["version"] if doc else 0
+
+async def bump_data_version_query(user_id: str) -> None:
+    """Increment the user's data version"""
+    await db.user_data_versions.update_one({"_id": ObjectId(user_id)}, {"$inc": {"version": 1}}, upsert=True)
@@ -5,113 +5,259 @@ Fixes:
 1. user_id stored as string -> convert to ObjectId
 2. date stored as string -> convert to datetime
 3. Missing fields (payment_method, created_at, updated_at) -> add defaults
+
+Only documents that need a fix are read (NEEDS_FIX is evaluated by the
+server). They are read in _id order, BATCH_SIZE at a time, and fixed with
+one unordered bulk_write per batch. After every batch the last _id is
+checkpointed in `migration_checkpoints`, so an interrupted run picks up
+where it stopped. --partitions splits the _id space into ranges of roughly
+equal size (sampled) that are migrated concurrently, each with its own
+checkpoint. Verification counts the remaining documents by $type.
+
+    python migrate_transactions.py --dry-run
+    python migrate_transactions.py --partitions 4
+    python migrate_transactions.py --restart      # ignore checkpoints
+
+Environment:
+    MONGODB_URL          MongoDB connection string
+    DATABASE_NAME        database to migrate (farm)
+    MIGRATION_BATCH_SIZE documents per batch (1000)
 """
+import argparse
 import asyncio
+import time
 from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
 import os
 from bson import ObjectId
 from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from pymongo import UpdateOne
 
 load_dotenv()
 
 MONGODB_URI = os.getenv("MONGODB_URL")
 DB_NAME = os.getenv("DATABASE_NAME", "farm")
+BATCH_SIZE = int(os.getenv("MIGRATION_BATCH_SIZE", "1000"))
+CHECKPOINT_ID = "migrate_transactions"
+SAMPLE_PER_PARTITION = 1000
+MAX_REPORTED_ERRORS = 50
+
+NEEDS_FIX = {"$or": [
+    {"user_id": {"$type": "string"}},
+    {"date": {"$type": "string"}},
+    {"payment_method": {"$exists": False}},
+    {"created_at": {"$exists": False}},
+    {"updated_at": {"$exists": False}},
+]}
+
+DATE_FORMATS = ("%Y-%m-%d", "%d-%m-%Y")
+
+
+def parse_date(value: str) -> Optional[datetime]:
+    # Try ISO format first
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        pass
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            pass
+    return None
+
+
+def fix_document(doc: Dict[str, Any], now: datetime) -> Tuple[Dict[str, Any], Optional[str]]:
+    """The $set for one document, or ({}, error) when it cannot be fixed"""
+    updates = {}
+
+    # Fix 1: user_id as string -> ObjectId
+    if isinstance(doc.get("user_id"), str):
+        try:
+            updates["user_id"] = ObjectId(doc["user_id"])
+        except Exception as e:
+            return {}, f"Cannot convert user_id '{doc['user_id']}': {e}"
+
+    # Fix 2: date as string -> datetime
+    if isinstance(doc.get("date"), str):
+        parsed = parse_date(doc["date"])
+        if parsed is None:
+            return {}, f"Cannot parse date '{doc['date']}' for doc {doc['_id']}"
+        updates["date"] = parsed
+
+    # Fix 3: Missing fields
+    if "payment_method" not in doc:
+        updates["payment_method"] = "Other"
+    if "created_at" not in doc:
+        # If we just converted the date, use the converted value for created_at
+        date = updates.get("date", doc.get("date"))
+        updates["created_at"] = date if isinstance(date, datetime) else now
+    if "updated_at" not in doc:
+        updates["updated_at"] = now
+    return updates, None
+
+
+async def partition_ranges(db, partitions: int) -> List[Tuple[Optional[ObjectId], Optional[ObjectId]]]:
+    """[lower, upper) _id ranges of about equal size, from a sample of _ids"""
+    if partitions <= 1:
+        return [(None, None)]
+    buckets = await db.transactions.aggregate([
+        {"$sample": {"size": SAMPLE_PER_PARTITION * partitions}},
+        {"$project": {"_id": 1}},
+        {"$bucketAuto": {"groupBy": "$_id", "buckets": partitions}},
+    ]).to_list(None)
+    bounds = [bucket["_id"]["min"] for bucket in buckets[1:]]
+    return list(zip([None] + bounds, bounds + [None]))
+
+
+def range_filter(lower, upper, after) -> Dict[str, Any]:
+    id_filter = {}
+    if after is not None:
+        id_filter["$gt"] = after
+    elif lower is not None:
+        id_filter["$gte"] = lower
+    if upper is not None:
+        id_filter["$lt"] = upper
+    return {**NEEDS_FIX, "_id": id_filter} if id_filter else NEEDS_FIX
+
 
+async def migrate_range(db, index: int, lower, upper, stats: Dict[str, Any], dry_run: bool, batch_size: int):
+    checkpoint_id = f"{CHECKPOINT_ID}:{index}"
+    checkpoint = None if dry_run else await db.migration_checkpoints.find_one({"_id": checkpoint_id})
+    if checkpoint and checkpoint.get("done"):
+        return
+    after = checkpoint.get("last_id") if checkpoint else None
 
-async def migrate():
-    client = AsyncIOMotorClient(MONGODB_URI)
-    db = client[DB_NAME]
-
-    print("Starting migration...")
-
-    # Find all transactions where user_id is a string (not ObjectId)
-    all_docs = await db.transactions.find({}).to_list(None)
-    
-    fixed_count = 0
-    errors = []
-
-    for doc in all_docs:
-        updates = {}
-        
-        # Fix 1: user_id as string -> ObjectId
-        if isinstance(doc.get("user_id"), str):
-            try:
-                updates["user_id"] = ObjectId(doc["user_id"])
-            except Exception as e:
-                errors.append(f"Cannot convert user_id '{doc['user_id']}': {e}")
-                continue
-
-        # Fix 2: date as string -> datetime
-        if isinstance(doc.get("date"), str):
-            date_str = doc["date"]
-            try:
-                # Try ISO format first
-                parsed = datetime.fromisoformat(date_str)
-                updates["date"] = parsed
-            except ValueError:
-                try:
-                    parsed = datetime.strptime(date_str, "%Y-%m-%d")
-                    updates["date"] = parsed
-                except ValueError:
-                    try:
-                        parsed = datetime.strptime(date_str, "%d-%m-%Y")
-                        updates["date"] = parsed
-                    except ValueError:
-                        errors.append(f"Cannot parse date '{date_str}' for doc {doc['_id']}")
-                        continue
-
-        # Fix 3: Missing fields
-        if "payment_method" not in doc:
-            updates["payment_method"] = "Other"
-        if "created_at" not in doc:
-            updates["created_at"] = doc.get("date") if isinstance(doc.get("date"), datetime) else datetime.now()
-        if "updated_at" not in doc:
-            updates["updated_at"] = datetime.now()
-
-        if updates:
-            # If we just converted the date, use the converted value for created_at
-            if "date" in updates and "created_at" in updates:
-                updates["created_at"] = updates["date"]
-            
-            await db.transactions.update_one(
-                {"_id": doc["_id"]},
-                {"$set": updates}
-            )
-            fixed_count += 1
-
-    print(f"\nMigration complete:")
-    print(f"  Total documents scanned: {len(all_docs)}")
-    print(f"  Documents fixed: {fixed_count}")
-    
-    if errors:
-        print(f"  Errors ({len(errors)}):")
-        for e in errors:
+    while True:
+        docs = await db.transactions.find(range_filter(lower, upper, after)).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not docs:
+            break
+        now = datetime.now()
+        operations = []
+        for doc in docs:
+            updates, error = fix_document(doc, now)
+            if error:
+                stats["errors"] += 1
+                if len(stats["error_samples"]) < MAX_REPORTED_ERRORS:
+                    stats["error_samples"].append(error)
+            elif updates:
+                operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": updates}))
+        stats["scanned"] += len(docs)
+        after = docs[-1]["_id"]
+        if dry_run:
+            stats["fixed"] += len(operations)
+            continue
+        if operations:
+            result = await db.transactions.bulk_write(operations, ordered=False)
+            stats["fixed"] += result.modified_count
+        await db.migration_checkpoints.update_one(
+            {"_id": checkpoint_id},
+            {"$set": {"last_id": after, "lower": lower, "upper": upper, "updated_at": now}},
+            upsert=True
+        )
+
+    if not dry_run:
+        await db.migration_checkpoints.update_one({"_id": checkpoint_id}, {"$set": {"done": True}}, upsert=True)
+
+
+async def saved_ranges(db):
+    """Partition ranges of an interrupted run, so its checkpoints stay valid"""
+    checkpoints = await db.migration_checkpoints.find({"_id": {"$regex": f"^{CHECKPOINT_ID}:"}}).to_list(None)
+    if not checkpoints:
+        return None
+    checkpoints.sort(key=lambda c: int(c["_id"].split(":")[1]))
+    return [(c.get("lower"), c.get("upper")) for c in checkpoints]
+
+
+async def verify(db) -> Dict[str, int]:
+    return {
+        "string_user_ids": await db.transactions.count_documents({"user_id": {"$type": "string"}}),
+        "string_dates": await db.transactions.count_documents({"date": {"$type": "string"}}),
+        "missing_fields": await db.transactions.count_documents({"$or": NEEDS_FIX["$or"][2:]}),
+    }
+
+
+async def migrate(dry_run: bool = False, partitions: int = 1, batch_size: int = BATCH_SIZE, restart: bool = False, db=None):
+    client = None
+    if db is None:
+        client = AsyncIOMotorClient(MONGODB_URI)
+        db = client[DB_NAME]
+
+    print("Starting migration..." + (" (dry run)" if dry_run else ""))
+    started = time.perf_counter()
+
+    if restart and not dry_run:
+        await db.migration_checkpoints.delete_many({"_id": {"$regex": f"^{CHECKPOINT_ID}:"}})
+    ranges = None if dry_run else await saved_ranges(db)
+    if ranges:
+        print(f"  Resuming {len(ranges)} partition(s) from checkpoints")
+    else:
+        ranges = await partition_ranges(db, partitions)
+        if not dry_run:
+            # Record every range up front so a resumed run sees all of them
+            for index, (lower, upper) in enumerate(ranges):
+                await db.migration_checkpoints.update_one(
+                    {"_id": f"{CHECKPOINT_ID}:{index}"}, {"$set": {"lower": lower, "upper": upper}}, upsert=True
+                )
+
+    stats = {"scanned": 0, "fixed": 0, "errors": 0, "error_samples": []}
+    tasks = [
+        asyncio.create_task(migrate_range(db, index, lower, upper, stats, dry_run, batch_size))
+        for index, (lower, upper) in enumerate(ranges)
+    ]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        # Stop the other partitions too; their checkpoints are kept for the next run
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if client is not None:
+            client.close()
+        raise
+
+    print(f"\nMigration {'dry run ' if dry_run else ''}complete in {time.perf_counter() - started:.1f}s:")
+    print(f"  Documents needing fixes scanned: {stats['scanned']}")
+    print(f"  Documents {'to fix' if dry_run else 'fixed'}: {stats['fixed']}")
+
+    if stats["errors"]:
+        print(f"  Errors ({stats['errors']}):")
+        for e in stats["error_samples"]:
             print(f"    - {e}")
 
-    # Verify: check for any remaining string user_ids or string dates
-    remaining_str_uid = 0
-    remaining_str_date = 0
-    all_docs_after = await db.transactions.find({}).to_list(None)
-    for doc in all_docs_after:
-        if isinstance(doc.get("user_id"), str):
-            remaining_str_uid += 1
-        if isinstance(doc.get("date"), str):
-            remaining_str_date += 1
-    
-    print(f"\n  Remaining string user_ids: {remaining_str_uid}")
-    print(f"  Remaining string dates: {remaining_str_date}")
-
-    # Now verify KPI aggregation works for all users
-    users = await db.transactions.distinct("user_id")
-    print(f"\n  Distinct users after migration: {len(users)}")
-    for uid in users:
-        count = await db.transactions.count_documents({"user_id": uid})
-        print(f"    user_id={uid} (type={type(uid).__name__}) -> {count} transactions")
-
-    client.close()
+    # Verify: count what is still unfixed without reading it
+    remaining = await verify(db)
+    print(f"\n  Remaining string user_ids: {remaining['string_user_ids']}")
+    print(f"  Remaining string dates: {remaining['string_dates']}")
+    print(f"  Remaining documents with missing fields: {remaining['missing_fields']}")
+
+    # user_id types across the collection (KPI aggregations need ObjectIds)
+    by_type = await db.transactions.aggregate([
+        {"$group": {"_id": {"$type": "$user_id"}, "transactions": {"$sum": 1}}}
+    ]).to_list(None)
+    for row in by_type:
+        print(f"    user_id type={row['_id']} -> {row['transactions']} transactions")
+
+    # Every partition finished: the next run starts over
+    if not dry_run:
+        await db.migration_checkpoints.delete_many({"_id": {"$regex": f"^{CHECKPOINT_ID}:"}})
+
+    if client is not None:
+        client.close()
     print("\nDone!")
+    return {**stats, "remaining": remaining}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fix inconsistent transaction documents")
+    parser.add_argument("--dry-run", action="store_true", help="report what would change without writing")
+    parser.add_argument("--partitions", type=int, default=1, help="_id ranges migrated concurrently")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--restart", action="store_true", help="discard checkpoints of an interrupted run")
+    return parser.parse_args(argv)
 
 
 if __name__ == "__main__":
-    asyncio.run(migrate())
+    args = parse_args()
+    asyncio.run(migrate(args.dry_run, args.partitions, args.batch_size, args.restart))
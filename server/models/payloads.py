@@ -135,6 +135,36 @@ class TransactionUpdate(BaseModel):
         return v
 
 
+class BulkTransactionRequest(BaseModel):
+    """
+    Bulk create/update payload. Items are validated one by one against
+    TransactionCreate / TransactionUpdate (plus an `id` for updates) so a
+    bad row is reported in the per-item results instead of failing the batch.
+    """
+    items: List[Dict[str, Any]] = Field(..., min_length=1, max_length=1000)
+
+
+class BulkTransactionDelete(BaseModel):
+    """Bulk delete payload"""
+    ids: List[str] = Field(..., min_length=1, max_length=1000)
+
+
+# --- Statement Upload Models ---
+
+class TransactionItem(BaseModel):
+    """Transaction extracted from an uploaded statement"""
+    date: str
+    description: str
+    amount: float
+    type: str  # 'credit' or 'debit'
+    category: str
+
+
+class ConfirmPayload(BaseModel):
+    """User-reviewed transactions to import"""
+    transactions: List[TransactionItem]
+
+
 # Chat Models
 class ChatRequest(BaseModel):
     message: str = Field(..., description="The user's message to the chatbot")
@@ -0,0 +1,140 @@
+"""
+Admin routes - Diagnostics for operators (admin role only)
+
+Query stats, slow queries and loop blocks are recorded in memory by the
+worker that served the request. Under serve.py each worker keeps its own,
+so a response covers one worker only; `meta.pid` says which.
+"""
+import asyncio
+import os
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+from models.payloads import APIResponse
+from database.database import client, db
+from database.migrations import applied_migrations, pending_migrations, SCHEMA_VERSION
+from database.monitoring import command_listener, explain_slow_query
+from utils.auth import require_role
+from utils.profiling import profile_store
+from utils.loop_monitor import loop_monitor
+from utils.logger import logger
+
+admin_router = APIRouter()
+
+
+@admin_router.get("/query-stats", response_model=APIResponse)
+async def get_query_stats(
+    limit: int = Query(20, ge=1, le=200),
+    current_user: dict = Depends(require_role("admin"))
+):
+    """MongoDB query shapes ordered by total time spent since startup"""
+    return APIResponse(success=True, data=command_listener.query_stats(limit), meta={"pid": os.getpid()})
+
+
+@admin_router.get("/slow-queries", response_model=APIResponse)
+async def get_slow_queries(current_user: dict = Depends(require_role("admin"))):
+    """Recent commands slower than SLOW_QUERY_MS, newest first"""
+    queries = command_listener.slow_queries()
+    return APIResponse(success=True, data=queries, meta={"threshold_ms": command_listener.slow_query_ms, "pid": os.getpid()})
+
+
+@admin_router.post("/slow-queries/{slow_id}/explain", response_model=APIResponse)
+async def explain_slow(
+    slow_id: int,
+    verbosity: str = Query("queryPlanner", pattern="^(queryPlanner|executionStats)$"),
+    current_user: dict = Depends(require_role("admin"))
+):
+    """
+    Run explain() for a recorded slow command. executionStats re-executes
+    the query, so prefer queryPlanner on a busy server. Slow query ids are
+    per worker: a request served by another worker answers 404.
+    """
+    try:
+        entry = await explain_slow_query(client, slow_id, verbosity)
+        if entry is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Slow query not found (it may have been rotated out)")
+        return APIResponse(success=True, data=entry)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ Explain slow query error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to explain query"
+        )
+
+
+@admin_router.get("/loop-blocks", response_model=APIResponse)
+async def get_loop_blocks(current_user: dict = Depends(require_role("admin"))):
+    """Recent callbacks that blocked the event loop, with the stack captured while blocked"""
+    events = loop_monitor.blocking_events()
+    return APIResponse(success=True, data=events, meta={"threshold_ms": loop_monitor.threshold * 1000, "pid": os.getpid()})
+
+
+@admin_router.get("/profiles", response_model=APIResponse)
+async def list_profiles(
+    limit: int = Query(50, ge=1, le=200),
+    current_user: dict = Depends(require_role("admin"))
+):
+    """Recent request profiles (send X-Profile: 1 on a request to record one), newest first"""
+    try:
+        profiles = await asyncio.to_thread(profile_store.list, limit)
+        return APIResponse(success=True, data=profiles)
+    except Exception as e:
+        logger.error(f"❌ List profiles error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to list profiles"
+        )
+
+
+@admin_router.get("/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    format: str = Query("json", pattern="^(json|folded)$"),
+    current_user: dict = Depends(require_role("admin"))
+):
+    """
+    A stored profile. format=folded returns the raw folded stacks for
+    flamegraph.pl or speedscope.
+    """
+    try:
+        profile = await asyncio.to_thread(profile_store.get, profile_id)
+        if profile is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+        if format == "folded":
+            return PlainTextResponse(profile["folded"] + "\n")
+        return APIResponse(success=True, data=profile)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Get profile error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to load profile"
+        )
+
+
+@admin_router.get("/migrations", response_model=APIResponse)
+async def get_migrations(current_user: dict = Depends(require_role("admin"))):
+    """Applied and pending schema migrations"""
+    try:
+        applied = await applied_migrations(db)
+        pending = [
+            {"version": m["version"], "name": m["name"]}
+            for m in pending_migrations(record["_id"] for record in applied)
+        ]
+        for record in applied:
+            record["version"] = record.pop("_id")
+        return APIResponse(
+            success=True,
+            data={"applied": applied, "pending": pending},
+            meta={"schema_version": SCHEMA_VERSION}
+        )
+    except Exception as e:
+        logger.error(f"❌ List migrations error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to list migrations"
+        )
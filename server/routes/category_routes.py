@@ -0,0 +1,45 @@
+"""
+Category routes - Category suggestions from the merchant memo
+"""
+from fastapi import APIRouter, Depends, Query, HTTPException, status
+from typing import List
+from models.payloads import APIResponse
+from services.category_service import CategoryService
+from utils.auth import get_current_user, require_role
+from utils.logger import logger
+import traceback
+
+category_router = APIRouter()
+
+
+@category_router.get("/suggest", response_model=APIResponse)
+async def suggest_categories(
+    description: List[str] = Query(..., min_length=1, max_length=200),
+    current_user: dict = Depends(get_current_user)
+):
+    """Suggest categories for one or more transaction descriptions"""
+    try:
+        suggestions = await CategoryService.suggest(current_user["id"], description)
+        return APIResponse(
+            success=True,
+            data={d: suggestions.get(d) for d in description},
+            meta={"resolved": len(suggestions), "requested": len(description)}
+        )
+    except Exception as e:
+        logger.error(f"❌ Category suggestion error: {str(e)}\n{traceback.format_exc()}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to suggest categories")
+
+
+@category_router.post("/rebuild", response_model=APIResponse)
+async def rebuild_category_index(current_user: dict = Depends(get_current_user)):
+    """Rebuild the current user's merchant memo from their transactions"""
+    stats = await CategoryService.rebuild_index(current_user["id"])
+    return APIResponse(success=True, data=stats)
+
+
+@category_router.post("/rebuild/all", response_model=APIResponse)
+async def rebuild_all_category_indexes(current_user: dict = Depends(require_role("admin"))):
+    """Rebuild every user's merchant memo and the global memo"""
+    logger.info(f"🏷️ Full merchant memo rebuild requested by {current_user.get('email')}")
+    stats = await CategoryService.rebuild_index()
+    return APIResponse(success=True, data=stats)
@@ -1,8 +1,11 @@
+import json
 from fastapi import APIRouter, Depends, HTTPException
-from utils.auth import get_current_user
-from models.payloads import ChatRequest, ChatResponse, UserInDB
-from services.chat_service import generate_chat_response
+from fastapi.responses import StreamingResponse
+from utils.auth import get_current_user, require_role
+from models.payloads import ChatRequest, ChatResponse, UserInDB, APIResponse
+from services.chat_service import generate_chat_response, stream_chat_response, chat_history_manager
 from utils.logger import logger
+from utils.metrics import operations_in_progress
 
 router = APIRouter()
 
@@ -12,11 +15,12 @@ async def chat_with_ai(
     current_user: UserInDB = Depends(get_current_user)
 ):
     try:
-        response_text = await generate_chat_response(
-            user_id=str(current_user["id"]),
-            message=request.message,
-            history=request.history
-        )
+        with operations_in_progress.track(operation="chat"):
+            response_text = await generate_chat_response(
+                user_id=str(current_user["id"]),
+                message=request.message,
+                history=request.history
+            )
         return ChatResponse(response=response_text)
     except Exception as e:
         logger.error(f"Chat Error: {e}")
@@ -25,3 +29,39 @@ async def chat_with_ai(
         traceback.print_exc()
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/stream")
+async def chat_with_ai_stream(
+    request: ChatRequest,
+    current_user: UserInDB = Depends(get_current_user)
+):
+    """
+    Same as POST /api/chat, streamed as server-sent events:
+    `token` events carry {"text": ...} chunks, then a final `done` (or `error`) event.
+    """
+    async def events():
+        try:
+            with operations_in_progress.track(operation="chat_stream"):
+                async for text in stream_chat_response(
+                    user_id=str(current_user["id"]),
+                    message=request.message,
+                    history=request.history
+                ):
+                    yield f"event: token\ndata: {json.dumps({'text': text})}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            logger.error(f"❌ Chat stream error: {e}")
+            yield f"event: error\ndata: {json.dumps({'detail': 'Failed to generate a response'})}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/stats", response_model=APIResponse)
+async def get_chat_stats(current_user: dict = Depends(require_role("admin"))):
+    """Prompt size statistics (estimated tokens) across all users since the server started (admin only)"""
+    return APIResponse(success=True, data=chat_history_manager.get_stats())
@@ -0,0 +1,90 @@
+"""
+Import job routes - Background statement analysis/import with progress
+"""
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, status
+from fastapi.responses import StreamingResponse
+from bson import ObjectId
+from models.payloads import APIResponse, ConfirmPayload
+from services.import_job_service import ImportJobService, FINAL_STAGES
+from utils.auth import get_current_user
+from utils.uploads import open_upload
+from utils.logger import logger
+import asyncio
+import json
+import traceback
+
+import_job_router = APIRouter()
+
+SSE_POLL_SECONDS = 1.0
+
+
+def _validate_job_id(job_id: str):
+    if not ObjectId.is_valid(job_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Import job not found")
+
+
+@import_job_router.post("", response_model=APIResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_import_job(file: UploadFile = File(...), current_user: dict = Depends(get_current_user)):
+    """Upload a bank statement and analyse it in the background"""
+    try:
+        content = open_upload(file)
+        job = await ImportJobService.create_analysis_job(current_user["id"], content, file.filename)
+        logger.info(f"🧵 Queued import job {job['id']} for {file.filename}")
+        return APIResponse(success=True, data=job)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Create import job error: {str(e)}\n{traceback.format_exc()}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to queue import job")
+
+
+@import_job_router.get("", response_model=APIResponse)
+async def list_import_jobs(current_user: dict = Depends(get_current_user)):
+    """List the user's recent import jobs"""
+    return APIResponse(success=True, data=await ImportJobService.list_jobs(current_user["id"]))
+
+
+@import_job_router.get("/{job_id}", response_model=APIResponse)
+async def get_import_job(job_id: str, include_transactions: bool = True, current_user: dict = Depends(get_current_user)):
+    """Poll job stage and progress; extracted transactions are included once ready for review"""
+    _validate_job_id(job_id)
+    job = await ImportJobService.get_job(current_user["id"], job_id, include_transactions)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Import job not found")
+    return APIResponse(success=True, data=job)
+
+
+@import_job_router.get("/{job_id}/events")
+async def stream_import_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    """Server-sent events with the job state, until it is ready for review, done or failed"""
+    _validate_job_id(job_id)
+    if not await ImportJobService.get_job(current_user["id"], job_id, include_transactions=False):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Import job not found")
+
+    async def events():
+        last_update = None
+        while True:
+            job = await ImportJobService.get_job(current_user["id"], job_id, include_transactions=False)
+            if not job:
+                return
+            if job["updated_at"] != last_update:
+                last_update = job["updated_at"]
+                yield f"event: progress\ndata: {json.dumps(job, default=str)}\n\n"
+            if job["stage"] in FINAL_STAGES:
+                return
+            await asyncio.sleep(SSE_POLL_SECONDS)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@import_job_router.post("/{job_id}/confirm", response_model=APIResponse, status_code=status.HTTP_202_ACCEPTED)
+async def confirm_import_job(job_id: str, payload: ConfirmPayload, current_user: dict = Depends(get_current_user)):
+    """Queue the reviewed transactions of a job for import"""
+    _validate_job_id(job_id)
+    job = await ImportJobService.queue_import(current_user["id"], job_id, payload.transactions)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Import job not found or not ready for review"
+        )
+    return APIResponse(success=True, data=job)
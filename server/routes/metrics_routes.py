@@ -0,0 +1,33 @@
+"""
+Metrics routes - Prometheus scrape endpoint
+
+Scrapers must send "Authorization: Bearer <METRICS_TOKEN>". Without a
+token the endpoint is only open when DEBUG=true (local development);
+otherwise it answers 401 until METRICS_TOKEN is configured.
+
+Environment:
+    METRICS_TOKEN  bearer token required by /metrics
+    DEBUG          "true" serves /metrics without a token when none is set (false)
+"""
+import os
+import secrets
+from fastapi import APIRouter, Header, HTTPException, status
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+from utils.metrics import metrics
+
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+DEBUG = os.getenv("DEBUG", "false").lower() == "true"
+
+metrics_router = APIRouter()
+
+
+@metrics_router.get("", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics(authorization: Optional[str] = Header(None)):
+    """Request, cache, MongoDB and queue metrics in the Prometheus text format"""
+    if METRICS_TOKEN:
+        if not secrets.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}"):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+    elif not DEBUG:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Set METRICS_TOKEN to enable metrics")
+    return PlainTextResponse(await metrics.render(), media_type="text/plain; version=0.0.4")
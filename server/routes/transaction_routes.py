@@ -11,12 +11,15 @@ from models.payloads import (
     TransactionFilter,
     PaginationParams,
     TransactionListResponse,
+    BulkTransactionRequest,
+    BulkTransactionDelete,
     APIResponse
 )
 from services.transaction_service import TransactionService
 from services.cache_service import cache_service
 from utils.auth import get_current_user
 from utils.logger import logger
+from utils.metrics import operations_in_progress
 from datetime import datetime
 from utils.date_helpers import get_date_range
 
@@ -46,11 +49,58 @@ async def create_transaction(
         logger.error(f"Traceback: {traceback.format_exc()}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"An unexpected error occurred"
+            detail="An unexpected error occurred"
         )
     finally:
         # Invalidate cache for this user
-        cache_service.invalidate_user_cache(current_user["id"])
+        await cache_service.invalidate_user_cache(current_user["id"])
+
+
+async def _run_bulk(current_user: dict, action: str, **operations) -> APIResponse:
+    """Apply one bulk batch and invalidate the user's cache once if anything changed"""
+    try:
+        logger.info(f"📦 Bulk {action} of {sum(len(v) for v in operations.values())} transactions for user: {current_user['email']}")
+        outcome = await TransactionService.bulk_mutate(current_user["id"], **operations)
+        summary = outcome["summary"]
+        if summary.get("created") or summary.get("updated") or summary.get("deleted"):
+            await cache_service.invalidate_user_cache(current_user["id"])
+        return APIResponse(success=True, data=outcome["results"], meta=summary)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Bulk {action} transactions error: {str(e)}")
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred"
+        )
+
+
+@transaction_router.post("/bulk", response_model=APIResponse)
+async def bulk_create_transactions(
+    payload: BulkTransactionRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """Create many transactions; each item is a TransactionCreate"""
+    return await _run_bulk(current_user, "create", creates=payload.items)
+
+
+@transaction_router.put("/bulk", response_model=APIResponse)
+async def bulk_update_transactions(
+    payload: BulkTransactionRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """Update many transactions; each item is a TransactionUpdate plus its `id`"""
+    return await _run_bulk(current_user, "update", updates=payload.items)
+
+
+@transaction_router.delete("/bulk", response_model=APIResponse)
+async def bulk_delete_transactions(
+    payload: BulkTransactionDelete,
+    current_user: dict = Depends(get_current_user)
+):
+    """Delete many transactions by id"""
+    return await _run_bulk(current_user, "delete", deletes=payload.ids)
 
 
 @transaction_router.get("", response_model=TransactionListResponse)
@@ -129,12 +179,13 @@ async def export_transactions(
             end_date=end_date
         )
         
-        content = await TransactionService.export_transactions(
-            current_user["id"],
-            filters,
-            format,
-            user=current_user
-        )
+        with operations_in_progress.track(operation="export"):
+            content = await TransactionService.export_transactions(
+                current_user["id"],
+                filters,
+                format,
+                user=current_user
+            )
         
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         
@@ -197,7 +248,7 @@ async def update_transaction(
         update_data
     )
     # Invalidate cache
-    cache_service.invalidate_user_cache(current_user["id"])
+    await cache_service.invalidate_user_cache(current_user["id"])
     return TransactionResponse(**transaction)
 
 
@@ -212,5 +263,5 @@ async def delete_transaction(
         transaction_id
     )
     # Invalidate cache
-    cache_service.invalidate_user_cache(current_user["id"])
+    await cache_service.invalidate_user_cache(current_user["id"])
     return APIResponse(success=True, data=result)
@@ -1,29 +1,17 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
-from pydantic import BaseModel
-from typing import List, Optional
+from models.payloads import ConfirmPayload
 from bson import ObjectId
-from datetime import datetime
-from database.database import db
 from services.ai_service import analyze_statement
+from services.import_service import ImportService
 from utils.auth import get_current_user
+from utils.uploads import open_upload
 from utils.logger import logger
+from utils.metrics import operations_in_progress
 import traceback
 
 upload_router = APIRouter()
 
 
-class TransactionItem(BaseModel):
-    date: str
-    description: str
-    amount: float
-    type: str  # 'credit' or 'debit'
-    category: str
-
-
-class ConfirmPayload(BaseModel):
-    transactions: List[TransactionItem]
-
-
 @upload_router.post("/analyze")
 async def upload_and_analyze(file: UploadFile = File(...), current_user: dict = Depends(get_current_user)):
     """
@@ -31,8 +19,10 @@ async def upload_and_analyze(file: UploadFile = File(...), current_user: dict =
     and return extracted transactions for user review (does NOT save to DB).
     """
     try:
-        content = await file.read()
-        extracted_data = await analyze_statement(content, file.filename)
+        # Stream from the spooled upload instead of copying it into memory
+        content = open_upload(file)
+        with operations_in_progress.track(operation="statement_analysis"):
+            extracted_data = await analyze_statement(content, file.filename, current_user.get("id"))
 
         return {
             "message": "Analysis successful. Please review the transactions.",
@@ -40,6 +30,8 @@ async def upload_and_analyze(file: UploadFile = File(...), current_user: dict =
             "transactions": extracted_data
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Error analyzing file: {e}")
         logger.error(traceback.format_exc())
@@ -50,6 +42,7 @@ async def upload_and_analyze(file: UploadFile = File(...), current_user: dict =
 async def confirm_transactions(payload: ConfirmPayload, current_user: dict = Depends(get_current_user)):
     """
     Accept user-reviewed transactions and insert them into the database.
+    Rows that were already imported (same fingerprint) are skipped.
     """
     try:
         user_id = current_user.get("user_id") or current_user.get("id") or str(current_user.get("_id"))
@@ -63,39 +56,15 @@ async def confirm_transactions(payload: ConfirmPayload, current_user: dict = Dep
         if not payload.transactions:
             return {"message": "No transactions to import.", "count": 0}
 
-        transactions_to_insert = []
-        now = datetime.now()
-        for item in payload.transactions:
-            # Parse date string to datetime (matching TransactionService schema)
-            try:
-                parsed_date = datetime.fromisoformat(item.date)
-            except ValueError:
-                parsed_date = datetime.strptime(item.date, "%Y-%m-%d")
-
-            transaction = {
-                "user_id": ObjectId(user_id),
-                "amount": abs(item.amount),
-                "type": item.type.lower(),
-                "category": item.category.strip(),
-                "description": item.description.strip(),
-                "payment_method": "Other",
-                "date": parsed_date,
-                "created_at": now,
-                "updated_at": now
-            }
-            transactions_to_insert.append(transaction)
-
-        logger.info(f"🔍 DEBUG: Sample transaction to insert: {transactions_to_insert[0]}")
-        result = await db.transactions.insert_many(transactions_to_insert)
-        logger.info(f"✅ Imported {len(result.inserted_ids)} transactions for user {user_id}. IDs: {result.inserted_ids[:3]}")
-        
-        # Invalidate cache
-        from services.cache_service import cache_service
-        cache_service.invalidate_user_cache(user_id)
+        result = await ImportService.confirm_transactions(user_id, payload.transactions)
 
         return {
             "message": "Transactions imported successfully!",
-            "count": len(result.inserted_ids)
+            "count": result["inserted"],
+            "inserted": result["inserted"],
+            "skipped": result["skipped"],
+            "failed": result["failed"],
+            "errors": result["errors"]
         }
 
     except Exception as e:
@@ -0,0 +1,289 @@
+"""
+API benchmark suite
+
+Starts the app in-process (ASGI transport, lifespan included) against a
+dedicated database, seeds one synthetic user per scale and measures
+throughput and latency percentiles for the hot paths:
+
+    /transactions          first page, deepest page, search
+    /dashboard/*           kpis, charts and widgets for every filter_type
+    /transactions/export   csv, xlsx, pdf
+    /api/upload/confirm    100 reviewed rows per request
+
+Run from server/:
+
+    python -m scripts.benchmark --scales 1k,100k --output bench.json
+    python -m scripts.benchmark --scales 1k --baseline bench.json
+
+Users are seeded with scripts/generate_transactions.py (realistic recurring
+and long-tailed spending) and reused by later runs, so only the first run at
+a scale pays for the inserts. By default every request gets a
+unique `_nocache` query parameter so the response cache never answers; use
+--warm-cache to measure cache hits instead. --mongo mock swaps in mongomock
+(if installed) to check the harness itself; its numbers mean nothing.
+
+With --baseline, exits 1 if any scenario's p99 or throughput regressed by more
+than --max-regression.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from scripts.generate_transactions import TransactionGenerator, write_transactions
+
+SCALES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+SCALES_ORDER = list(SCALES)
+FILTER_TYPES = ["all", "6days", "week", "month", "6months", "year", "custom"]
+EXPORT_FORMATS = ["csv", "xlsx", "pdf"]
+PAGE_SIZE = 50
+CONFIRM_ROWS = 100
+SEED_BATCH_SIZE = 10_000
+SEED_CONCURRENCY = 4
+SEED_DAYS = 730
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of already sorted values"""
+    if not values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(values)))
+    return values[rank - 1]
+
+
+def summarize(latencies: List[float], errors: int, wall_seconds: float) -> Dict[str, Any]:
+    ordered = sorted(latencies)
+
+    def ms(value):
+        return round(value * 1000, 2) if value is not None else None
+
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / wall_seconds, 2) if wall_seconds > 0 else None,
+        "mean_ms": ms(sum(ordered) / len(ordered)) if ordered else None,
+        "p50_ms": ms(percentile(ordered, 50)),
+        "p90_ms": ms(percentile(ordered, 90)),
+        "p99_ms": ms(percentile(ordered, 99)),
+        "max_ms": ms(ordered[-1]) if ordered else None,
+    }
+
+
+def compare(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]], max_regression: float) -> Tuple[List[str], List[str]]:
+    """Report lines and the scenarios whose p99 or throughput regressed beyond max_regression"""
+    previous = {(r["scale"], r["scenario"]): r for r in baseline}
+    lines, regressions = [], []
+    for result in results:
+        base = previous.get((result["scale"], result["scenario"]))
+        if not base or not base.get("p99_ms") or not result.get("p99_ms"):
+            continue
+        p99_change = result["p99_ms"] / base["p99_ms"] - 1
+        rps_change = result["throughput_rps"] / base["throughput_rps"] - 1 if base.get("throughput_rps") else 0
+        name = f"{result['scale']}/{result['scenario']}"
+        lines.append(f"{name:<48} p99 {base['p99_ms']:>9.1f} -> {result['p99_ms']:>9.1f} ms ({p99_change:+.0%})  rps {rps_change:+.0%}")
+        if p99_change > max_regression or rps_change < -max_regression:
+            regressions.append(name)
+    return lines, regressions
+
+
+async def ensure_user(db, scale: str, total: int, seed: int) -> str:
+    """The benchmark user for a scale, seeding its transactions on first use"""
+    email = f"bench-{scale}@bench.local"
+    user = await db["auth_users"].find_one({"email": email})
+    if user and user.get("bench_seeded") == total:
+        return str(user["_id"])
+    if user:
+        await db.transactions.delete_many({"user_id": user["_id"]})
+        user_id = user["_id"]
+    else:
+        now = datetime.now()
+        result = await db["auth_users"].insert_one({
+            "full_name": f"Benchmark {scale}", "username": f"bench_{scale}", "email": email,
+            "password_hash": "!", "phone": None, "profile_image": None, "role": "user",
+            "currency_preference": "USD", "theme_preference": "light", "is_deleted": False,
+            "created_at": now, "updated_at": now,
+        })
+        user_id = result.inserted_id
+
+    print(f"🌱 Seeding {total:,} transactions for {email}...")
+    started = time.perf_counter()
+    generator = TransactionGenerator(seed, SCALES_ORDER.index(scale), date.today(), SEED_DAYS)
+    await write_transactions(db, user_id, generator, total, SEED_BATCH_SIZE, SEED_CONCURRENCY)
+    await db["auth_users"].update_one({"_id": user_id}, {"$set": {"bench_seeded": total}})
+    print(f"✅ Seeded in {time.perf_counter() - started:.1f}s")
+    return str(user_id)
+
+
+def build_scenarios(total: int, run_id: str) -> List[Dict[str, Any]]:
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    custom_range = {"start_date": (today - timedelta(days=90)).isoformat(), "end_date": today.isoformat()}
+    deepest_page = max(1, math.ceil(total / PAGE_SIZE))
+
+    scenarios = [
+        {"name": "transactions_first_page", "path": "/transactions", "params": {"page": 1, "limit": PAGE_SIZE}},
+        {"name": "transactions_deep_page", "path": "/transactions", "params": {"page": deepest_page, "limit": PAGE_SIZE}},
+        {"name": "transactions_search", "path": "/transactions", "params": {"search": "swiggy", "limit": PAGE_SIZE}},
+    ]
+    for endpoint in ("kpis", "charts", "widgets"):
+        for filter_type in FILTER_TYPES:
+            if endpoint == "widgets" and filter_type == "custom":
+                continue  # /dashboard/widgets takes no start_date/end_date
+            params = {"filter_type": filter_type, **(custom_range if filter_type == "custom" else {})}
+            scenarios.append({"name": f"dashboard_{endpoint}_{filter_type}", "path": f"/dashboard/{endpoint}", "params": params})
+    for export_format in EXPORT_FORMATS:
+        scenarios.append({"name": f"export_{export_format}", "path": "/transactions/export", "params": {"format": export_format}, "heavy": True})
+
+    def confirm_body(i: int) -> Dict[str, Any]:
+        return {"transactions": [
+            {"date": today.strftime("%Y-%m-%d"), "description": f"BENCH CONFIRM {run_id} {i} {row}",
+             "amount": 100 + row, "type": "debit", "category": "Other"}
+            for row in range(CONFIRM_ROWS)
+        ]}
+
+    scenarios.append({"name": "upload_confirm", "method": "POST", "path": "/api/upload/confirm", "body": confirm_body, "cacheable": False})
+    return scenarios
+
+
+async def run_scenario(client, scenario: Dict[str, Any], headers: Dict[str, str], iterations: int,
+                       concurrency: int, warmup: int, cold: bool, run_id: str) -> Dict[str, Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+    body_factory: Optional[Callable[[int], Any]] = scenario.get("body")
+
+    async def request(i: int, measure: bool):
+        nonlocal errors
+        params = dict(scenario.get("params", {}))
+        if cold and scenario.get("cacheable", True):
+            params["_nocache"] = f"{run_id}-{i}"
+        body = body_factory(i) if body_factory else None
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.request(scenario.get("method", "GET"), scenario["path"], params=params, json=body, headers=headers)
+            elapsed = time.perf_counter() - started
+        if not measure:
+            return
+        if response.status_code >= 400:
+            errors += 1
+        else:
+            latencies.append(elapsed)
+
+    for i in range(warmup):
+        await request(-1 - i, measure=False)
+    started = time.perf_counter()
+    await asyncio.gather(*(request(i, measure=True) for i in range(iterations)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+async def main(args) -> int:
+    os.environ["DATABASE_NAME"] = args.database
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    if args.mongo == "mock":
+        import motor.motor_asyncio
+        from mongomock_motor import AsyncMongoMockClient
+        motor.motor_asyncio.AsyncIOMotorClient = lambda *a, **kw: AsyncMongoMockClient()
+    elif args.mongodb_url:
+        os.environ["MONGODB_URL"] = args.mongodb_url
+
+    import httpx
+    from app import app
+    from database.database import db, client as mongo_client
+    from utils.auth import create_access_token
+    from utils.loop_monitor import event_loop_blocked_total
+
+    run_id = datetime.now().strftime("%Y%m%d%H%M%S")
+    results: List[Dict[str, Any]] = []
+    scales = [s.strip().lower() for s in args.scales.split(",") if s.strip()]
+
+    async with app.router.lifespan_context(app):
+        server_version = None
+        if args.mongo != "mock":
+            server_version = (await mongo_client.server_info()).get("version")
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as http:
+            for scale in scales:
+                total = SCALES[scale]
+                user_id = await ensure_user(db, scale, total, args.seed)
+                token = create_access_token({"sub": user_id}, expires_delta=timedelta(hours=12))
+                headers = {"Authorization": f"Bearer {token}"}
+                for scenario in build_scenarios(total, run_id):
+                    if args.only and not any(part in scenario["name"] for part in args.only.split(",")):
+                        continue
+                    iterations = max(3, args.iterations // 10) if scenario.get("heavy") else args.iterations
+                    blocked_before = event_loop_blocked_total.value()
+                    summary = await run_scenario(http, scenario, headers, iterations, args.concurrency,
+                                                 args.warmup, not args.warm_cache, run_id)
+                    summary.update({
+                        "scale": scale, "scenario": scenario["name"], "iterations": iterations,
+                        "loop_blocks": int(event_loop_blocked_total.value() - blocked_before),
+                    })
+                    results.append(summary)
+                    print(f"{scale:>5} {scenario['name']:<34} {summary['throughput_rps'] or 0:>8.1f} rps  "
+                          f"p50 {summary['p50_ms'] or 0:>8.1f} ms  p99 {summary['p99_ms'] or 0:>8.1f} ms  "
+                          f"errors {summary['errors']}")
+                # Rows added by upload_confirm would skew the next run
+                await db.transactions.delete_many({"description": {"$regex": "^BENCH CONFIRM "}})
+
+    report = {
+        "meta": {
+            "run_id": run_id, "commit": git_commit(), "python": platform.python_version(),
+            "platform": platform.platform(), "mongo": args.mongo, "mongo_version": server_version,
+            "concurrency": args.concurrency, "iterations": args.iterations, "warm_cache": args.warm_cache,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"📄 Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        lines, regressions = compare(results, baseline, args.max_regression)
+        print("\n".join(lines))
+        if regressions:
+            print(f"❌ {len(regressions)} scenario(s) regressed more than {args.max_regression:.0%}: {', '.join(regressions)}")
+            return 1
+        print("✅ No regressions against baseline")
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Expense Tracker API hot paths")
+    parser.add_argument("--scales", default="1k", help=f"comma-separated: {', '.join(SCALES)}")
+    parser.add_argument("--iterations", type=int, default=50, help="measured requests per scenario (exports use a tenth)")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--warm-cache", action="store_true", help="let the response cache answer repeated requests")
+    parser.add_argument("--only", help="comma-separated scenario name fragments to run")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mongo", choices=["mongod", "mock"], default="mongod")
+    parser.add_argument("--mongodb-url", default=os.getenv("BENCH_MONGODB_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--database", default=os.getenv("BENCH_DATABASE_NAME", "expense_tracker_bench"))
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", help="earlier results JSON to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args(argv)
+    unknown = [s for s in args.scales.split(",") if s.strip() and s.strip().lower() not in SCALES]
+    if unknown:
+        parser.error(f"unknown scale(s): {', '.join(unknown)}")
+    return args
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
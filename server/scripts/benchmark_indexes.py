@@ -0,0 +1,182 @@
+"""
+Before/after benchmark for the transactions index sets
+
+Runs the same workload against a fresh database per index set ("legacy", the
+set before the workload-driven indexes, and "current", TRANSACTION_INDEXES in
+scripts/create_indexes.py) and prints them side by side:
+
+    writes  bulk seeding throughput, then single insert / amount update /
+            delete latency (the API writes one transaction at a time)
+    reads   every scripts/check_query_plans.py case, median of --repeat runs,
+            with the keys and documents the plan examined
+    size    total index size of the collection
+
+Run from server/ against a disposable mongod:
+
+    python -m scripts.benchmark_indexes --mongodb-url mongodb://localhost:27017
+    python -m scripts.benchmark_indexes --transactions 100000 --json index_bench.json
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from typing import Any, Dict, List
+
+from bson import ObjectId
+
+from scripts.benchmark import percentile
+from scripts.check_query_plans import (
+    PLAN_DAYS, PLAN_END_DATE, PLAN_SEED, PLAN_TRANSACTIONS, PLAN_USERS, CommandCapture, explain_cases,
+    plan_cases, prepare_plan_database,
+)
+from scripts.create_indexes import TRANSACTION_INDEXES
+from scripts.generate_transactions import TransactionGenerator
+
+BENCH_DATABASE = "expense_tracker_index_bench"
+WRITE_SAMPLES = 500
+READ_REPEAT = 5
+
+LEGACY_TRANSACTION_INDEXES = [
+    ([("user_id", 1), ("date", -1)], {}),
+    ([("category", 1)], {}),
+    ([("type", 1)], {}),
+    ([("user_id", 1), ("category", 1)], {}),
+    ([("user_id", 1), ("type", 1)], {}),
+    ([("user_id", 1), ("fingerprint", 1)], {"unique": True, "partialFilterExpression": {"fingerprint": {"$exists": True}}}),
+]
+
+INDEX_SETS = {"legacy": LEGACY_TRANSACTION_INDEXES, "current": TRANSACTION_INDEXES}
+
+
+def latency_ms(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {"p50_ms": round(percentile(ordered, 50) * 1000, 3), "p99_ms": round(percentile(ordered, 99) * 1000, 3)}
+
+
+async def measure_single_writes(db, user_id: str, samples: int) -> Dict[str, Dict[str, float]]:
+    """insert_one, then $set amount and delete_one on the inserted documents"""
+    generator = TransactionGenerator(PLAN_SEED, 99, PLAN_END_DATE, PLAN_DAYS)
+    rows = generator.discretionary(samples)
+    timings: Dict[str, List[float]] = {"insert": [], "update_amount": [], "delete": []}
+    ids = []
+    for row in rows:
+        started = time.perf_counter()
+        result = await db.transactions.insert_one({"user_id": ObjectId(user_id), **row})
+        timings["insert"].append(time.perf_counter() - started)
+        ids.append(result.inserted_id)
+    for _id, row in zip(ids, rows):
+        started = time.perf_counter()
+        await db.transactions.update_one({"_id": _id}, {"$set": {"amount": row["amount"] + 1}})
+        timings["update_amount"].append(time.perf_counter() - started)
+    for _id in ids:
+        started = time.perf_counter()
+        await db.transactions.delete_one({"_id": _id})
+        timings["delete"].append(time.perf_counter() - started)
+    return {name: latency_ms(values) for name, values in timings.items()}
+
+
+async def measure_reads(ctx: Dict[str, Any], repeat: int) -> Dict[str, float]:
+    """Median wall time per plan case (transaction_queries.db must point at the bench db)"""
+    medians = {}
+    for case in plan_cases(ctx):
+        runs = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            await case["run"]()
+            runs.append(time.perf_counter() - started)
+        medians[case["name"]] = round(statistics.median(runs) * 1000, 2)
+    return medians
+
+
+async def benchmark_index_set(mongodb_url: str, name: str, users: int, transactions: int,
+                              write_samples: int, repeat: int) -> Dict[str, Any]:
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from database.queries import transaction_queries
+
+    capture = CommandCapture()
+    client = AsyncIOMotorClient(mongodb_url, event_listeners=[capture])
+    database = f"{BENCH_DATABASE}_{name}"
+    db = client[database]
+    await client.drop_database(database)
+    try:
+        ctx = await prepare_plan_database(db, users, transactions, INDEX_SETS[name])
+        writes = await measure_single_writes(db, ctx["user_id"], write_samples)
+        plans = {result["name"]: result for result in await explain_cases(db, capture, ctx)}
+        production_db = transaction_queries.db
+        transaction_queries.db = db
+        try:
+            reads = await measure_reads(ctx, repeat)
+        finally:
+            transaction_queries.db = production_db
+        stats = await db.transactions.aggregate([{"$collStats": {"storageStats": {}}}]).to_list(1)
+        storage = stats[0]["storageStats"] if stats else {}
+    finally:
+        await client.drop_database(database)
+        client.close()
+
+    total_docs = users * transactions
+    return {
+        "index_set": name,
+        "indexes": sorted(storage.get("indexSizes", {})),
+        "index_bytes": storage.get("totalIndexSize"),
+        "seed_rows_per_s": round(total_docs / ctx["seed_seconds"]),
+        "writes": writes,
+        "reads": {
+            case: {
+                "median_ms": reads[case],
+                "keys_examined": sum(c.get("keys_examined") or 0 for c in plans[case]["commands"]),
+                "docs_examined": sum(c.get("docs_examined") or 0 for c in plans[case]["commands"]),
+                "problems": plans[case]["problems"],
+            }
+            for case in reads
+        },
+    }
+
+
+def print_comparison(before: Dict[str, Any], after: Dict[str, Any]):
+    def change(old, new):
+        return f"{(new - old) / old * 100:+.0f}%" if old else "-"
+
+    print(f"{'':<30}{before['index_set']:>14}{after['index_set']:>14}{'change':>9}")
+    print(f"{'index size (KB)':<30}{before['index_bytes'] // 1024:>14}{after['index_bytes'] // 1024:>14}"
+          f"{change(before['index_bytes'], after['index_bytes']):>9}")
+    print(f"{'bulk seed (rows/s)':<30}{before['seed_rows_per_s']:>14}{after['seed_rows_per_s']:>14}"
+          f"{change(before['seed_rows_per_s'], after['seed_rows_per_s']):>9}")
+    for op in before["writes"]:
+        old, new = before["writes"][op]["p50_ms"], after["writes"][op]["p50_ms"]
+        print(f"{op + ' p50 (ms)':<30}{old:>14}{new:>14}{change(old, new):>9}")
+    print()
+    print(f"{'read (median ms / docs)':<30}{before['index_set']:>14}{after['index_set']:>14}{'change':>9}")
+    for case, old in before["reads"].items():
+        new = after["reads"][case]
+        flag = "❌" if new["problems"] else "✅"
+        print(f"{flag} {case:<28}{old['median_ms']:>8} /{old['docs_examined']:>5}"
+              f"{new['median_ms']:>8} /{new['docs_examined']:>5}{change(old['median_ms'], new['median_ms']):>9}")
+
+
+async def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongodb-url", default="mongodb://localhost:27017")
+    parser.add_argument("--users", type=int, default=PLAN_USERS)
+    parser.add_argument("--transactions", type=int, default=PLAN_TRANSACTIONS, help="per user")
+    parser.add_argument("--write-samples", type=int, default=WRITE_SAMPLES)
+    parser.add_argument("--repeat", type=int, default=READ_REPEAT)
+    parser.add_argument("--json", help="write both runs to this file")
+    args = parser.parse_args(argv)
+
+    runs = []
+    for name in INDEX_SETS:
+        print(f"⏱️ Benchmarking {name} index set...")
+        runs.append(await benchmark_index_set(args.mongodb_url, name, args.users, args.transactions,
+                                              args.write_samples, args.repeat))
+    print_comparison(*runs)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(runs, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
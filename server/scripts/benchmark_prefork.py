@@ -0,0 +1,176 @@
+"""
+Startup time and memory: pre-fork master (serve.py) versus N independent
+uvicorn processes
+
+    independent  N x `python -m uvicorn app:app`, one port each; ready when
+                 every port answers
+    prefork      `python serve.py --workers N`; ready when the master logs
+                 that all workers are up. Run with and without
+                 PREFORK_PRELOAD: preloading imports pandas, pdfplumber and
+                 Gemini in the master, which the other modes load only when
+                 a request needs them
+
+Memory is summed over each process tree once it is ready: RSS (counts
+shared pages once per process) and PSS (shared pages split between the
+processes sharing them, from /proc/<pid>/smaps_rollup), so PSS is the
+honest total. Linux only.
+
+Run from server/ (the app connects to MONGODB_URL during startup, so point
+it at a reachable database for realistic numbers):
+
+    python -m scripts.benchmark_prefork --workers 4
+    python -m scripts.benchmark_prefork --workers 1 2 4 8 --json prefork.json
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Any, Dict, List
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASE_PORT = 8900
+READY_TIMEOUT = 120
+READY_LINE = "workers ready"
+
+
+def descendants(pid: int) -> List[int]:
+    """pid and all of its descendants, from /proc/*/stat"""
+    parents = {}
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    # The command name may contain spaces; ppid follows the closing parenthesis
+                    parents[int(entry)] = int(f.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+    tree, frontier = [pid], [pid]
+    while frontier:
+        children = [child for child, parent in parents.items() if parent in frontier]
+        tree.extend(children)
+        frontier = children
+    return tree
+
+
+def memory_kb(pid: int) -> Dict[str, int]:
+    totals = {"rss_kb": 0, "pss_kb": 0}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Rss:"):
+                    totals["rss_kb"] = int(line.split()[1])
+                elif line.startswith("Pss:"):
+                    totals["pss_kb"] = int(line.split()[1])
+    except OSError:
+        pass
+    return totals
+
+
+def tree_memory(pids: List[int]) -> Dict[str, Any]:
+    processes = [pid for root in pids for pid in descendants(root)]
+    usage = [memory_kb(pid) for pid in processes]
+    return {
+        "processes": len(processes),
+        "rss_mb": round(sum(u["rss_kb"] for u in usage) / 1024, 1),
+        "pss_mb": round(sum(u["pss_kb"] for u in usage) / 1024, 1),
+    }
+
+
+def answers(port: int) -> bool:
+    try:
+        urllib.request.urlopen(f"http://127.0.0.1:{port}/openapi.json", timeout=1).close()
+        return True
+    except urllib.error.HTTPError:
+        return True
+    except OSError:
+        return False
+
+
+def stop(processes: List[subprocess.Popen]):
+    for process in processes:
+        if process.poll() is None:
+            process.send_signal(signal.SIGTERM)
+    for process in processes:
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def run_independent(workers: int, port: int) -> Dict[str, Any]:
+    started = time.perf_counter()
+    processes = [
+        subprocess.Popen([sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port + i)],
+                         cwd=SERVER_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        for i in range(workers)
+    ]
+    try:
+        pending = set(range(workers))
+        while pending:
+            if time.perf_counter() - started > READY_TIMEOUT:
+                raise TimeoutError(f"{len(pending)} uvicorn processes not ready")
+            pending = {i for i in pending if not answers(port + i)}
+            time.sleep(0.02)
+        startup_s = time.perf_counter() - started
+        return {"mode": "independent", "workers": workers, "startup_s": round(startup_s, 2),
+                **tree_memory([p.pid for p in processes])}
+    finally:
+        stop(processes)
+
+
+def run_prefork(workers: int, port: int, preload: bool = True) -> Dict[str, Any]:
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "serve.py", "--workers", str(workers), "--host", "127.0.0.1", "--port", str(port)],
+        cwd=SERVER_DIR, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+        env={**os.environ, "PREFORK_PRELOAD": str(preload).lower()}
+    )
+    ready = threading.Event()
+
+    def watch():
+        for line in process.stdout:
+            if READY_LINE in line:
+                ready.set()
+
+    threading.Thread(target=watch, daemon=True).start()
+    try:
+        if not ready.wait(READY_TIMEOUT):
+            raise TimeoutError("pre-fork workers not ready")
+        startup_s = time.perf_counter() - started
+        if not answers(port):
+            raise RuntimeError("pre-fork master is not answering")
+        return {"mode": "prefork" if preload else "prefork-lazy", "workers": workers, "startup_s": round(startup_s, 2),
+                **tree_memory([process.pid])}
+    finally:
+        stop([process])
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[4])
+    parser.add_argument("--port", type=int, default=BASE_PORT, help="first port to use")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args(argv)
+
+    results = []
+    print(f"{'mode':<12} {'workers':>7} {'startup s':>10} {'procs':>6} {'RSS MB':>8} {'PSS MB':>8}")
+    for workers in args.workers:
+        for run in (run_independent, lambda w, p: run_prefork(w, p, preload=False), run_prefork):
+            result = run(workers, args.port)
+            results.append(result)
+            print(f"{result['mode']:<12} {workers:>7} {result['startup_s']:>10} {result['processes']:>6} "
+                  f"{result['rss_mb']:>8} {result['pss_mb']:>8}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,304 @@
+"""
+Query plan checks for the transactions workload
+
+Seeds a throwaway database with synthetic users (scripts/generate_transactions.py),
+creates the production indexes (scripts/create_indexes.py) and runs every
+aggregation pipeline builder and transaction_queries function against it.
+Each command those functions send is captured and re-run with
+explain("executionStats"). The check passes when the plan:
+
+    - uses an index (no COLLSCAN)
+    - does not sort in memory when the query sorts and limits
+    - examines at most MAX_DOCS_RATIO documents and MAX_KEYS_RATIO keys
+      per document an ideal plan must read (the matches, capped by
+      skip + limit)
+
+Run from server/ against a disposable mongod:
+
+    python -m scripts.check_query_plans --mongodb-url mongodb://localhost:27017
+    python -m scripts.check_query_plans --json plans.json
+
+Exits 1 when any check fails. tests/test_query_plans.py runs the same checks
+when TEST_MONGODB_URL is set.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import date, datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import monitoring
+
+from scripts.generate_transactions import TransactionGenerator, write_transactions
+
+PLAN_DATABASE = "expense_tracker_plans"
+PLAN_USERS = 3
+PLAN_TRANSACTIONS = 20_000
+PLAN_SEED = 45
+PLAN_END_DATE = date(2024, 12, 31)
+PLAN_DAYS = 730
+MAX_DOCS_RATIO = 2.0
+MAX_KEYS_RATIO = 3.0
+
+EXPLAINABLE_COMMANDS = {"find", "aggregate", "count", "distinct", "update", "delete", "findAndModify"}
+INDEX_ONLY_STAGES = ("IDHACK", "EXPRESS")
+
+MONTH = (datetime(2024, 12, 1), datetime(2024, 12, 31, 23, 59, 59))
+YEAR = (datetime(2024, 1, 1), datetime(2024, 12, 31, 23, 59, 59))
+
+
+class CommandCapture(monitoring.CommandListener):
+    """Records the read/write commands sent while `enabled` is set"""
+
+    def __init__(self):
+        self.enabled = False
+        self.commands: List[Dict[str, Any]] = []
+
+    def started(self, event):
+        if self.enabled and event.command_name in EXPLAINABLE_COMMANDS:
+            self.commands.append(dict(event.command))
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def command_target(command: Dict[str, Any]) -> Dict[str, Any]:
+    """The filter a command applies, the most documents it needs (skip + limit) and whether it sorts"""
+    name = next(iter(command))
+    if name == "find":
+        limit = command.get("limit") or None
+        return {
+            "filter": command.get("filter", {}),
+            "limit": (command.get("skip", 0) + limit) if limit else None,
+            "sorted": bool(command.get("sort")),
+        }
+    if name == "aggregate":
+        pipeline = command.get("pipeline", [])
+        match = pipeline[0]["$match"] if pipeline and "$match" in pipeline[0] else {}
+        rest = pipeline[1:] if match else pipeline
+        sorted_ = bool(rest) and "$sort" in rest[0]
+        limit_stage = rest[1] if sorted_ and len(rest) > 1 else (rest[0] if rest else {})
+        return {"filter": match, "limit": limit_stage.get("$limit"), "sorted": sorted_}
+    if name in ("update", "delete"):
+        statement = command.get("updates" if name == "update" else "deletes", [{}])[0]
+        single = not statement.get("multi") if name == "update" else statement.get("limit") == 1
+        return {"filter": statement.get("q", {}), "limit": 1 if single else None, "sorted": False}
+    return {"filter": command.get("query", command.get("filter", {})), "limit": None, "sorted": False}
+
+
+def plan_problems(summary: Dict[str, Any], ideal: int, sorted_with_limit: bool,
+                  max_docs_ratio: Optional[float] = MAX_DOCS_RATIO,
+                  max_keys_ratio: Optional[float] = MAX_KEYS_RATIO) -> List[str]:
+    """Why a summarized explain (database.monitoring.summarize_explain) is not index-backed enough"""
+    problems = []
+    stages = summary["plan"].split(" -> ") if summary["plan"] else []
+    if summary["collection_scan"]:
+        problems.append("collection scan")
+    elif not summary["indexes"] and not any(stage.startswith(INDEX_ONLY_STAGES) for stage in stages):
+        problems.append(f"no index used ({summary['plan'] or 'empty plan'})")
+    if sorted_with_limit and "SORT" in stages:
+        problems.append("in-memory SORT before LIMIT")
+    budget = max(ideal, 1)
+    docs, keys = summary.get("docs_examined"), summary.get("keys_examined")
+    if max_docs_ratio is not None and docs is not None and docs > max_docs_ratio * budget + 1:
+        problems.append(f"examined {docs} documents for {ideal} needed")
+    if max_keys_ratio is not None and keys is not None and keys > max_keys_ratio * budget + 1:
+        problems.append(f"examined {keys} keys for {ideal} needed")
+    return problems
+
+
+def plan_cases(ctx: Dict[str, str]) -> List[Dict[str, Any]]:
+    """
+    One case per pipeline builder / query function call the app makes.
+    `ctx` holds the ids of seeded data and is read when a case runs.
+    """
+    from database.queries import transaction_queries as q
+    from utils import aggregation_pipelines as p
+
+    def user():
+        return ObjectId(ctx["user_id"])
+
+    def case(name: str, run: Callable[[], Awaitable[Any]], **limits) -> Dict[str, Any]:
+        return {"name": name, "run": run, "max_docs_ratio": MAX_DOCS_RATIO, "max_keys_ratio": MAX_KEYS_RATIO, **limits}
+
+    def pipeline(build: Callable[[], List[Dict[str, Any]]]) -> Callable[[], Awaitable[Any]]:
+        return lambda: q.aggregate_transactions_query(build())
+
+    return [
+        # utils/aggregation_pipelines.py
+        case("kpi_month", pipeline(lambda: p.build_kpi_pipeline(ctx["user_id"], *MONTH))),
+        case("category_debit_month", pipeline(lambda: p.build_category_pipeline(ctx["user_id"], *MONTH, "debit"))),
+        case("category_credit_month", pipeline(lambda: p.build_category_pipeline(ctx["user_id"], *MONTH, "credit"))),
+        case("category_all_month", pipeline(lambda: p.build_category_pipeline(ctx["user_id"], *MONTH))),
+        case("timeline_year", pipeline(lambda: p.build_timeline_pipeline(ctx["user_id"], *YEAR, "month"))),
+        case("payment_methods_month", pipeline(lambda: p.build_payment_method_pipeline(ctx["user_id"], *MONTH))),
+        case("monthly_savings_year", pipeline(lambda: p.build_monthly_savings_pipeline(ctx["user_id"], *YEAR))),
+        # Walking an amount-ordered index skips the keys outside the date range
+        case("highest_expense_month", pipeline(lambda: p.build_highest_expense_pipeline(ctx["user_id"], *MONTH)), max_keys_ratio=None),
+        case("recent_transactions", pipeline(lambda: p.build_recent_transactions_pipeline(ctx["user_id"], 10))),
+        case("budget_alerts_month", pipeline(lambda: p.build_budget_alerts_pipeline(ctx["user_id"], 2024, 12))),
+        case("date_range_totals_month", pipeline(lambda: p.build_date_range_totals_pipeline(ctx["user_id"], *MONTH))),
+        # Case-insensitive category regex is filtered after the date-bounded scan
+        case("date_range_totals_category", pipeline(lambda: p.build_date_range_totals_pipeline(ctx["user_id"], *YEAR, "groceries")), max_docs_ratio=None, max_keys_ratio=None),
+        case("merchant_totals_month", pipeline(lambda: p.build_merchant_totals_pipeline(ctx["user_id"], *MONTH))),
+        # Unanchored regex: bounded by the user's (date-ordered) documents, not by the matches
+        case("search_recent", pipeline(lambda: p.build_search_pipeline(ctx["user_id"], "swiggy")), max_docs_ratio=None, max_keys_ratio=None),
+        # database/queries/transaction_queries.py
+        case("list_first_page", lambda: q.list_transactions_query({"user_id": user()}, 0, 50, [("date", -1)])),
+        case("list_deep_page", lambda: q.list_transactions_query({"user_id": user()}, 10_000, 50, [("date", -1)])),
+        case("list_by_amount", lambda: q.list_transactions_query({"user_id": user()}, 0, 50, [("amount", -1)])),
+        case("list_by_category", lambda: q.list_transactions_query({"user_id": user()}, 0, 50, [("category", 1)])),
+        case("list_by_type", lambda: q.list_transactions_query({"user_id": user()}, 0, 50, [("type", 1)])),
+        case("list_credits_month", lambda: q.list_transactions_query(
+            {"user_id": user(), "type": "credit", "date": {"$gte": MONTH[0], "$lte": MONTH[1]}}, 0, 50, [("date", -1)])),
+        case("count_user", lambda: q.count_transactions_query({"user_id": user()})),
+        case("count_credits_month", lambda: q.count_transactions_query(
+            {"user_id": user(), "type": "credit", "date": {"$gte": MONTH[0], "$lte": MONTH[1]}})),
+        case("export_all", lambda: q.get_all_transactions_query({"user_id": user()})),
+        case("filtered_totals_month", lambda: q.get_filtered_totals_query({"user_id": user(), "date": {"$gte": MONTH[0], "$lte": MONTH[1]}})),
+        case("total_balance", lambda: q.get_total_balance_query(ctx["user_id"])),
+        case("get_by_id", lambda: q.get_transaction_by_id_query(ctx["user_id"], ctx["transaction_id"])),
+        case("existing_ids", lambda: q.get_existing_transaction_ids_query(ctx["user_id"], [ObjectId(ctx["transaction_id"]), ObjectId()])),
+        case("update_by_id", lambda: q.update_transaction_query(ctx["user_id"], ctx["transaction_id"], {"updated_at": datetime(2025, 1, 1)})),
+        case("delete_missing_id", lambda: q.delete_transaction_query(ctx["user_id"], str(ObjectId()))),
+    ]
+
+
+CASE_NAMES = [c["name"] for c in plan_cases({})]
+
+
+async def seed(db, users: int, transactions: int) -> List[ObjectId]:
+    user_ids = []
+    for i in range(users):
+        user_id = ObjectId()
+        generator = TransactionGenerator(PLAN_SEED, i, PLAN_END_DATE, PLAN_DAYS)
+        await write_transactions(db, user_id, generator, transactions, 5000, 4)
+        user_ids.append(user_id)
+    return user_ids
+
+
+async def prepare_plan_database(db, users: int = PLAN_USERS, transactions: int = PLAN_TRANSACTIONS,
+                                transaction_indexes=None) -> Dict[str, Any]:
+    """
+    Index and seed an empty database. `transaction_indexes` replaces the
+    production index set (create_indexes) with (keys, options) pairs on
+    transactions only. Returns the case context plus the seeding time.
+    """
+    from scripts.create_indexes import create_indexes
+
+    if transaction_indexes is None:
+        await create_indexes(db)
+    else:
+        for keys, options in transaction_indexes:
+            await db.transactions.create_index(keys, **options)
+    started = time.perf_counter()
+    user_ids = await seed(db, users, transactions)
+    seed_seconds = time.perf_counter() - started
+    sample = await db.transactions.find_one({"user_id": user_ids[0]}, {"_id": 1})
+    return {"user_id": str(user_ids[0]), "transaction_id": str(sample["_id"]), "seed_seconds": seed_seconds}
+
+
+async def explain_cases(db, capture: CommandCapture, ctx: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Run every case against `db` and explain the commands it sent"""
+    from database.monitoring import explainable_command, summarize_explain
+    from database.queries import transaction_queries
+
+    results = []
+    production_db = transaction_queries.db
+    transaction_queries.db = db
+    try:
+        for case in plan_cases(ctx):
+            capture.commands.clear()
+            capture.enabled = True
+            started = time.perf_counter()
+            try:
+                await case["run"]()
+            finally:
+                capture.enabled = False
+            wall_ms = round((time.perf_counter() - started) * 1000, 2)
+
+            checks = []
+            for command in capture.commands:
+                target = command_target(command)
+                ideal = await db.transactions.count_documents(target["filter"])
+                if target["limit"] is not None:
+                    ideal = min(ideal, target["limit"])
+                explain = await db.command({"explain": explainable_command(command), "verbosity": "executionStats"})
+                summary = summarize_explain(explain)
+                problems = plan_problems(summary, ideal, target["sorted"] and target["limit"] is not None,
+                                         case["max_docs_ratio"], case["max_keys_ratio"])
+                checks.append({"command": next(iter(command)), "ideal": ideal, **summary, "problems": problems})
+            results.append({
+                "name": case["name"],
+                "wall_ms": wall_ms,
+                "commands": checks,
+                "problems": [problem for check in checks for problem in check["problems"]],
+            })
+    finally:
+        transaction_queries.db = production_db
+    return results
+
+
+async def run_plan_checks(mongodb_url: str, database: str = PLAN_DATABASE, users: int = PLAN_USERS,
+                          transactions: int = PLAN_TRANSACTIONS, keep: bool = False) -> List[Dict[str, Any]]:
+    """Seed, index, run every case and explain what it sent"""
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    capture = CommandCapture()
+    client = AsyncIOMotorClient(mongodb_url, event_listeners=[capture])
+    db = client[database]
+    await client.drop_database(database)
+    try:
+        ctx = await prepare_plan_database(db, users, transactions)
+        return await explain_cases(db, capture, ctx)
+    finally:
+        if not keep:
+            await client.drop_database(database)
+        client.close()
+
+
+def print_report(results: List[Dict[str, Any]]):
+    for result in results:
+        status = "✅" if not result["problems"] else "❌"
+        for check in result["commands"]:
+            print(f"{status} {result['name']:<28} {check['command']:<9} {check['plan'][:60]:<60} "
+                  f"keys {check['keys_examined']!s:>6} docs {check['docs_examined']!s:>6} ideal {check['ideal']:>6} "
+                  f"exec {check['execution_ms']!s:>4}ms wall {result['wall_ms']:>8.1f}ms")
+        for problem in result["problems"]:
+            print(f"     ↳ {problem}")
+
+
+async def main(args) -> int:
+    results = await run_plan_checks(args.mongodb_url, args.database, args.users, args.transactions, args.keep)
+    print_report(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, default=str)
+    failed = [r["name"] for r in results if r["problems"]]
+    if failed:
+        print(f"❌ {len(failed)} of {len(results)} queries are not index-backed: {', '.join(failed)}")
+        return 1
+    print(f"✅ All {len(results)} queries are index-backed")
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Explain every transactions query and check it is index-backed")
+    parser.add_argument("--mongodb-url", default=os.getenv("TEST_MONGODB_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--database", default=PLAN_DATABASE, help="dropped and re-created")
+    parser.add_argument("--users", type=int, default=PLAN_USERS)
+    parser.add_argument("--transactions", type=int, default=PLAN_TRANSACTIONS, help="per user")
+    parser.add_argument("--keep", action="store_true", help="keep the seeded database afterwards")
+    parser.add_argument("--json", help="also write the results to this file")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
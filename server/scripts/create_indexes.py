@@ -1,6 +1,8 @@
 """
 MongoDB index creation script
-Run this to create all necessary indexes for optimal query performance
+Run this to create all necessary indexes for optimal query performance.
+The app applies it as migration 1 (database/migrations.py); indexes added
+here later also need a new migration to reach existing databases.
 """
 import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
@@ -11,12 +13,40 @@ load_dotenv()
 
 MONGODB_URI = os.getenv("MONGODB_URL")
 DB_NAME = os.getenv("DATABASE_NAME", "farm")
+STATEMENT_CACHE_TTL_SECONDS = int(os.getenv("STATEMENT_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
 
+# Transactions: every query is scoped to one user, so user_id leads every
+# compound. Keys follow equality -> sort -> range (ESR) for the query shapes
+# exercised by scripts/check_query_plans.py.
+TRANSACTION_INDEXES = [
+    # Date ranges, newest-first lists, exports, search, dashboards without a type
+    ([("user_id", 1), ("date", -1)], {}),
+    # type + date filters (category/budget/merchant pipelines), sort by type
+    ([("user_id", 1), ("type", 1), ("date", -1)], {}),
+    # category filter + date range, sort by category
+    ([("user_id", 1), ("category", 1), ("date", -1)], {}),
+    # Sort by amount; a date range is filtered on the index, not the documents
+    ([("user_id", 1), ("amount", -1), ("date", -1)], {}),
+    # Highest expense: debits by amount within a date range
+    ([("user_id", 1), ("type", 1), ("amount", -1), ("date", -1)], {}),
+    # De-duplicates statement imports; manually created transactions have no fingerprint
+    ([("user_id", 1), ("fingerprint", 1)], {
+        "unique": True,
+        "partialFilterExpression": {"fingerprint": {"$exists": True}},
+    }),
+]
 
-async def create_indexes():
-    """Create all MongoDB indexes"""
-    client = AsyncIOMotorClient(MONGODB_URI)
-    db = client[DB_NAME]
+# Superseded by the compounds above (a prefix of one of them, or not scoped to
+# a user). scripts/migrate_transaction_indexes.py drops them.
+REDUNDANT_TRANSACTION_INDEXES = ["category_1", "type_1", "user_id_1_category_1", "user_id_1_type_1"]
+
+
+async def create_indexes(db=None):
+    """Create all MongoDB indexes (on `db`, or on DATABASE_NAME via MONGODB_URL)"""
+    client = None
+    if db is None:
+        client = AsyncIOMotorClient(MONGODB_URI)
+        db = client[DB_NAME]
     
     print("Creating indexes...")
     
@@ -31,11 +61,8 @@ async def create_indexes():
     
     # Transactions collection indexes
     print("  - transactions indexes...")
-    await db.transactions.create_index([("user_id", 1), ("date", -1)])
-    await db.transactions.create_index("category")
-    await db.transactions.create_index("type")
-    await db.transactions.create_index([("user_id", 1), ("category", 1)])
-    await db.transactions.create_index([("user_id", 1), ("type", 1)])
+    for keys, options in TRANSACTION_INDEXES:
+        await db.transactions.create_index(keys, **options)
     
     # Budgets collection indexes
     print("  - budgets indexes...")
@@ -46,10 +73,25 @@ async def create_indexes():
     print("  - widget_mappings indexes...")
     await db.widget_mappings.create_index("widget_name", unique=True)
     await db.widget_mappings.create_index([("is_active", 1), ("order", 1)])
+
+    # Merchant category memo (user_id None holds the global memo)
+    print("  - merchant_categories indexes...")
+    await db.merchant_categories.create_index([("merchant", 1), ("user_id", 1), ("category", 1)], unique=True)
+
+    # Background import jobs (finished jobs expire via expires_at)
+    print("  - import_jobs indexes...")
+    await db.import_jobs.create_index([("user_id", 1), ("created_at", -1)])
+    await db.import_jobs.create_index([("status", 1), ("created_at", 1)])
+    await db.import_jobs.create_index("expires_at", expireAfterSeconds=0)
+
+    # Statement analysis cache (entries expire after the configured TTL)
+    print("  - statement_analysis_cache indexes...")
+    await db.statement_analysis_cache.create_index("created_at", expireAfterSeconds=STATEMENT_CACHE_TTL_SECONDS)
     
     print("✅ All indexes created successfully!")
     
-    client.close()
+    if client is not None:
+        client.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,316 @@
+"""
+Synthetic transaction generator for load and scale testing
+
+Creates N users with M transactions each, shaped like real spending:
+monthly salary credits, rent and bills on fixed days, subscriptions, and
+long-tailed discretionary spending (Zipf-weighted categories, merchants and
+payment methods) with weekend and seasonal peaks. Output is deterministic for
+a given --seed and --end-date.
+
+Rows match TransactionCreate and are written with unordered bulk_write
+batches, --concurrency batches in flight at a time, so generation overlaps
+with the writes. Each synthetic user's previous transactions are replaced.
+--statements DIR also writes a bank-style CSV and PDF statement per user for
+exercising /api/upload/analyze.
+
+    python -m scripts.generate_transactions --users 10 --transactions 100000 --seed 7
+    python -m scripts.generate_transactions --users 2 --transactions 500 --statements ./statements
+"""
+import argparse
+import asyncio
+import csv
+import os
+import random
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MONGODB_URI = os.getenv("MONGODB_URL")
+DB_NAME = os.getenv("DATABASE_NAME", "farm")
+
+DEFAULT_PASSWORD = "Synthetic123!"
+
+# category: (weight, merchants, log-mean amount, log-sigma)
+DISCRETIONARY = {
+    "Groceries": (30, ["Big Basket", "DMart", "Blinkit", "Zepto", "Reliance Fresh", "Nature's Basket"], 6.6, 0.7),
+    "Dining": (24, ["Swiggy", "Zomato", "Starbucks", "Domino's", "Haldiram's", "Chaayos", "McDonald's"], 6.0, 0.6),
+    "Shopping": (14, ["Amazon", "Flipkart", "Myntra", "Decathlon", "Croma", "IKEA", "Nykaa"], 7.2, 1.0),
+    "Transport": (12, ["Uber", "Ola", "Rapido", "Indian Oil", "Shell", "Metro Card"], 5.6, 0.8),
+    "Entertainment": (6, ["BookMyShow", "PVR", "Steam", "Sony LIV"], 6.3, 0.7),
+    "Health": (5, ["Apollo Pharmacy", "1mg", "Practo", "Cult.fit"], 6.5, 0.9),
+    "Travel": (3, ["IndiGo", "MakeMyTrip", "IRCTC", "OYO", "Air India"], 8.6, 0.8),
+    "Transfer": (3, ["UPI Transfer", "IMPS Transfer", "NEFT Transfer"], 7.0, 1.1),
+    "Other": (3, ["ATM Withdrawal", "Service Charge", "Donation", "Gift Shop"], 6.4, 1.0),
+}
+PAYMENT_METHODS = {
+    "default": (["UPI", "Card", "Cash", "Net Banking"], [55, 30, 10, 5]),
+    "Travel": (["Card", "UPI", "Net Banking"], [60, 25, 15]),
+    "Transfer": (["UPI", "Net Banking"], [70, 30]),
+    "Other": (["Cash", "Card", "UPI"], [50, 25, 25]),
+}
+SUBSCRIPTIONS = [("Netflix", 649), ("Spotify", 119), ("Amazon Prime", 299), ("YouTube Premium", 129), ("Disney+ Hotstar", 299), ("Cult.fit", 1499)]
+UTILITIES = [("Electricity Bill", 8, 7.4, 0.35), ("Airtel Broadband", 12, 6.9, 0.05), ("Jio Mobile", 15, 5.9, 0.05), ("Gas Cylinder", 20, 6.8, 0.1)]
+
+# Month -> spending multiplier (festive season in Oct-Dec, quiet Feb)
+SEASONALITY = {1: 0.95, 2: 0.85, 3: 0.95, 4: 1.0, 5: 1.05, 6: 1.0, 7: 0.95, 8: 1.0, 9: 1.05, 10: 1.25, 11: 1.3, 12: 1.35}
+WEEKEND_MULTIPLIER = 1.4
+
+
+def _zipf_weights(n: int, s: float = 1.1) -> List[float]:
+    return [1 / (rank ** s) for rank in range(1, n + 1)]
+
+
+class TransactionGenerator:
+    """Deterministic transactions for one synthetic user"""
+
+    def __init__(self, seed: int, user_index: int, end_date: date, days: int = 365):
+        self.rng = random.Random(f"{seed}:{user_index}")
+        self.end = end_date
+        self.start = end_date - timedelta(days=days - 1)
+        rng = self.rng
+        self.salary = round(rng.lognormvariate(11.0, 0.4), -2)
+        self.salary_day = rng.choice([1, 28])
+        self.employer = rng.choice(["Infosys", "TCS", "Acme Corp", "Globex", "Initech", "Wipro"])
+        self.rent = round(self.salary * rng.uniform(0.2, 0.35), -2)
+        self.rent_day = rng.randint(1, 5)
+        self.subscriptions = rng.sample(SUBSCRIPTIONS, rng.randint(1, 4))
+        # Each user favours a different order of merchants within a category
+        self.merchants = {category: rng.sample(merchants, len(merchants)) for category, (_, merchants, _, _) in DISCRETIONARY.items()}
+        self.categories = list(DISCRETIONARY)
+        self.category_weights = [DISCRETIONARY[c][0] * rng.uniform(0.6, 1.4) for c in self.categories]
+        self.days = [self.start + timedelta(days=i) for i in range(days)]
+        day_weights = [SEASONALITY[d.month] * (WEEKEND_MULTIPLIER if d.weekday() >= 5 else 1) for d in self.days]
+        self.day_cum_weights = []
+        total = 0.0
+        for weight in day_weights:
+            total += weight
+            self.day_cum_weights.append(total)
+
+    def _at(self, day: date, earliest: int = 7, latest: int = 23) -> datetime:
+        return datetime.combine(day, dt_time(self.rng.randint(earliest, latest - 1), self.rng.randint(0, 59), self.rng.randint(0, 59)))
+
+    def _monthly_days(self, day_of_month: int) -> Iterator[date]:
+        year, month = self.start.year, self.start.month
+        while True:
+            try:
+                day = date(year, month, day_of_month)
+            except ValueError:
+                day = date(year, month, 28)
+            if day > self.end:
+                return
+            if day >= self.start:
+                yield day
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+    def recurring(self) -> List[Dict[str, Any]]:
+        """Salary, rent, bills and subscriptions on their fixed days"""
+        rng = self.rng
+        rows = []
+        for day in self._monthly_days(self.salary_day):
+            rows.append(self._row(day, self.salary, "credit", "Salary", f"SALARY {self.employer} {day:%b %Y}".upper(), "Net Banking", hour=(9, 11)))
+        for day in self._monthly_days(self.rent_day):
+            rows.append(self._row(day, self.rent, "debit", "Rent", "RENT TRANSFER", "Net Banking", hour=(8, 12)))
+        for name, day_of_month, mu, sigma in UTILITIES:
+            for day in self._monthly_days(day_of_month):
+                rows.append(self._row(day, rng.lognormvariate(mu, sigma), "debit", "Utilities", name, "UPI"))
+        for name, price in self.subscriptions:
+            for day in self._monthly_days(rng.randint(1, 28)):
+                rows.append(self._row(day, price, "debit", "Entertainment" if name != "Cult.fit" else "Health", f"{name} subscription", "Card"))
+        return rows
+
+    def _row(self, day: date, amount: float, txn_type: str, category: str, description: str, payment_method: str,
+             hour: Tuple[int, int] = (7, 23)) -> Dict[str, Any]:
+        return {
+            "amount": max(1.0, round(amount, 2)),
+            "type": txn_type,
+            "category": category,
+            "description": description[:500],
+            "payment_method": payment_method,
+            "date": self._at(day, *hour),
+        }
+
+    def discretionary(self, count: int, since: Optional[date] = None) -> List[Dict[str, Any]]:
+        """Long-tailed everyday spending with weekend and seasonal peaks"""
+        rng = self.rng
+        days, cum_weights = self.days, self.day_cum_weights
+        if since is not None and since > self.start:
+            skip = min((since - self.start).days, len(days) - 1)
+            days = days[skip:]
+            cum_weights = [w - cum_weights[skip - 1] for w in cum_weights[skip:]]
+        days = rng.choices(days, cum_weights=cum_weights, k=count)
+        categories = rng.choices(self.categories, weights=self.category_weights, k=count)
+        rows = []
+        for day, category in zip(days, categories):
+            _, _, mu, sigma = DISCRETIONARY[category]
+            merchants = self.merchants[category]
+            merchant = rng.choices(merchants, weights=_zipf_weights(len(merchants)))[0]
+            methods, method_weights = PAYMENT_METHODS.get(category, PAYMENT_METHODS["default"])
+            method = rng.choices(methods, weights=method_weights)[0]
+            if method == "UPI":
+                description = f"UPI-{merchant.upper().replace(' ', '')}-{rng.randint(100000, 999999)}"
+            elif method == "Card":
+                description = f"POS {merchant.upper()}"
+            else:
+                description = merchant
+            # A few refunds and cashbacks among the debits
+            txn_type = "credit" if rng.random() < 0.02 else "debit"
+            rows.append(self._row(day, rng.lognormvariate(mu, sigma), txn_type, category, description, method))
+        return rows
+
+    def batches(self, count: int, batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+        """Exactly `count` transactions, recurring ones first, in batches"""
+        recurring = self.recurring()[:count]
+        for offset in range(0, len(recurring), batch_size):
+            yield recurring[offset:offset + batch_size]
+        remaining = count - len(recurring)
+        while remaining > 0:
+            size = min(batch_size, remaining)
+            yield self.discretionary(size)
+            remaining -= size
+
+    def statement(self, days: int, rows: int) -> List[Dict[str, Any]]:
+        """A separate sample of the last `days` days, sorted by date, for statement files"""
+        since = self.end - timedelta(days=days - 1)
+        recurring = [t for t in self.recurring() if t["date"].date() >= since]
+        return sorted(recurring + self.discretionary(max(0, rows - len(recurring)), since), key=lambda t: t["date"])
+
+
+def write_csv_statement(path: str, rows: List[Dict[str, Any]], opening_balance: float):
+    """HDFC-style layout (withdrawal/deposit columns, running balance) understood by parse_tabular_statement"""
+    balance = opening_balance
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Statement of account"])
+        writer.writerow(["Date", "Narration", "Chq./Ref.No.", "Value Dt", "Withdrawal Amt.", "Deposit Amt.", "Closing Balance"])
+        for i, t in enumerate(rows):
+            balance += t["amount"] if t["type"] == "credit" else -t["amount"]
+            day = t["date"].strftime("%d/%m/%y")
+            withdrawal = f"{t['amount']:,.2f}" if t["type"] == "debit" else ""
+            deposit = f"{t['amount']:,.2f}" if t["type"] == "credit" else ""
+            writer.writerow([day, t["description"], f"{i:07d}", day, withdrawal, deposit, f"{balance:,.2f}"])
+
+
+def write_pdf_statement(path: str, rows: List[Dict[str, Any]], opening_balance: float, holder: str):
+    """Text-based PDF statement (goes through the pdfplumber + AI extraction path)"""
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Table, TableStyle
+
+    balance = opening_balance
+    data = [["Date", "Description", "Debit", "Credit", "Balance"]]
+    for t in rows:
+        balance += t["amount"] if t["type"] == "credit" else -t["amount"]
+        data.append([
+            t["date"].strftime("%d-%m-%Y"), t["description"][:40],
+            f"{t['amount']:,.2f}" if t["type"] == "debit" else "",
+            f"{t['amount']:,.2f}" if t["type"] == "credit" else "",
+            f"{balance:,.2f}",
+        ])
+    table = Table(data, repeatRows=1)
+    table.setStyle(TableStyle([
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("GRID", (0, 0), (-1, -1), 0.25, colors.grey),
+        ("FONTSIZE", (0, 0), (-1, -1), 8),
+    ]))
+    styles = getSampleStyleSheet()
+    SimpleDocTemplate(path, pagesize=A4).build([Paragraph(f"Account statement - {holder}", styles["Title"]), table])
+
+
+async def write_transactions(db, user_id, generator: TransactionGenerator, count: int, batch_size: int,
+                             concurrency: int) -> int:
+    """Stream a user's transactions into Mongo, `concurrency` bulk writes in flight"""
+    from pymongo import InsertOne
+
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = []
+    now = datetime.now()
+
+    async def flush(docs):
+        try:
+            await db.transactions.bulk_write([InsertOne(doc) for doc in docs], ordered=False)
+        finally:
+            semaphore.release()
+
+    for batch in generator.batches(count, batch_size):
+        docs = [{"user_id": user_id, **t, "created_at": now, "updated_at": now} for t in batch]
+        await semaphore.acquire()
+        tasks.append(asyncio.create_task(flush(docs)))
+    await asyncio.gather(*tasks)
+    return count
+
+
+async def ensure_synthetic_user(db, email: str, full_name: str, password_hash: str):
+    """Create (or reuse) a synthetic user and clear its transactions"""
+    user = await db["auth_users"].find_one({"email": email})
+    if user:
+        await db.transactions.delete_many({"user_id": user["_id"]})
+        return user["_id"]
+    now = datetime.now()
+    result = await db["auth_users"].insert_one({
+        "full_name": full_name, "username": email.split("@")[0], "email": email,
+        "password_hash": password_hash, "phone": None, "profile_image": None, "role": "user",
+        "currency_preference": "INR", "theme_preference": "light", "is_deleted": False,
+        "created_at": now, "updated_at": now,
+    })
+    return result.inserted_id
+
+
+async def generate(args):
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from passlib.context import CryptContext
+
+    client = AsyncIOMotorClient(args.mongodb_url or MONGODB_URI)
+    db = client[args.database or DB_NAME]
+    # Same scheme as utils.auth, so the synthetic users can log in
+    password_hash = CryptContext(schemes=["bcrypt_sha256"]).hash(args.password)
+    end_date = args.end_date or date.today()
+    if args.statements:
+        os.makedirs(args.statements, exist_ok=True)
+
+    started = time.perf_counter()
+    written = 0
+    for i in range(args.users):
+        email = f"synthetic-{args.seed}-{i}@example.com"
+        generator = TransactionGenerator(args.seed, i, end_date, args.days)
+        user_id = await ensure_synthetic_user(db, email, f"Synthetic User {i}", password_hash)
+        written += await write_transactions(db, user_id, generator, args.transactions, args.batch_size, args.concurrency)
+        rate = written / (time.perf_counter() - started)
+        print(f"✅ {email}: {args.transactions:,} transactions ({rate:,.0f} rows/s overall)")
+
+        if args.statements:
+            rows = generator.statement(args.statement_days, args.statement_rows)
+            base = os.path.join(args.statements, f"synthetic-{args.seed}-{i}")
+            write_csv_statement(base + ".csv", rows, generator.salary)
+            write_pdf_statement(base + ".pdf", rows, generator.salary, f"Synthetic User {i}")
+            print(f"📄 Statements written to {base}.csv / .pdf")
+
+    elapsed = time.perf_counter() - started
+    print(f"🏁 {written:,} transactions for {args.users} users in {elapsed:.1f}s ({written / elapsed:,.0f} rows/s)")
+    client.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic users and transactions")
+    parser.add_argument("--users", type=int, default=1)
+    parser.add_argument("--transactions", type=int, default=1000, help="transactions per user")
+    parser.add_argument("--days", type=int, default=365, help="history length ending at --end-date")
+    parser.add_argument("--end-date", type=date.fromisoformat, help="last day of history (today); fix it for reproducible data")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=4, help="bulk writes in flight")
+    parser.add_argument("--password", default=DEFAULT_PASSWORD)
+    parser.add_argument("--mongodb-url", help="defaults to MONGODB_URL")
+    parser.add_argument("--database", help="defaults to DATABASE_NAME")
+    parser.add_argument("--statements", metavar="DIR", help="also write a CSV and PDF statement per user")
+    parser.add_argument("--statement-days", type=int, default=30)
+    parser.add_argument("--statement-rows", type=int, default=120)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(generate(parse_args()))
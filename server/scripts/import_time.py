@@ -0,0 +1,108 @@
+"""
+Import-time report and startup budget for the API
+
+Imports `app` in a fresh interpreter with `python -X importtime` (best of
+--runs), prints the modules with the highest cumulative import time and
+fails when:
+
+    - importing app takes longer than the budget (IMPORT_BUDGET_MS)
+    - any of LAZY_MODULES was imported; they load on first use
+      (utils/lazy_import.py) and must stay off the startup path
+
+Run from server/:
+
+    python -m scripts.import_time
+    python -m scripts.import_time --top 30 --budget-ms 800
+
+tests/test_import_time.py runs the same check.
+
+Environment:
+    IMPORT_BUDGET_MS  budget for `import app` in milliseconds (1500)
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional
+
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1500"))
+IMPORT_TARGET = "app"
+IMPORT_RUNS = 3
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LAZY_MODULES = ("pandas", "pdfplumber", "google.generativeai", "reportlab", "openpyxl")
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)\s*$")
+
+
+def parse_importtime(output: str) -> List[Dict[str, Any]]:
+    """Rows of `-X importtime` output: module, self_us, cumulative_us, depth"""
+    rows = []
+    for line in output.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append({"module": module, "self_us": int(self_us), "cumulative_us": int(cumulative_us),
+                         "depth": len(indent) // 2})
+    return rows
+
+
+def measure_import(target: str = IMPORT_TARGET, runs: int = IMPORT_RUNS) -> Dict[str, Any]:
+    """The fastest of `runs` fresh-interpreter imports of `target`"""
+    best = None
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+            cwd=SERVER_DIR, capture_output=True, text=True
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(f"import {target} failed:\n{completed.stderr[-2000:]}")
+        rows = parse_importtime(completed.stderr)
+        top = next((row for row in rows if row["module"] == target and row["depth"] == 0), None)
+        total_ms = top["cumulative_us"] / 1000 if top else sum(r["self_us"] for r in rows) / 1000
+        if best is None or total_ms < best["total_ms"]:
+            best = {"target": target, "total_ms": round(total_ms, 1), "modules": rows}
+    return best
+
+
+def import_problems(report: Dict[str, Any], budget_ms: Optional[float] = IMPORT_BUDGET_MS,
+                    lazy_modules=LAZY_MODULES) -> List[str]:
+    problems = []
+    if budget_ms is not None and report["total_ms"] > budget_ms:
+        problems.append(f"import {report['target']} took {report['total_ms']:.0f}ms (budget {budget_ms:.0f}ms)")
+    imported = {row["module"] for row in report["modules"]}
+    for name in lazy_modules:
+        if name in imported:
+            problems.append(f"{name} is imported at startup")
+    return problems
+
+
+def print_report(report: Dict[str, Any], top: int):
+    print(f"import {report['target']}: {report['total_ms']:.0f}ms, {len(report['modules'])} modules")
+    rows = sorted(report["modules"], key=lambda row: row["cumulative_us"], reverse=True)[:top]
+    print(f"{'cumulative ms':>14} {'self ms':>8}  module")
+    for row in rows:
+        print(f"{row['cumulative_us'] / 1000:>14.1f} {row['self_us'] / 1000:>8.1f}  {'  ' * row['depth']}{row['module']}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", default=IMPORT_TARGET, help="module to import")
+    parser.add_argument("--runs", type=int, default=IMPORT_RUNS)
+    parser.add_argument("--top", type=int, default=20, help="modules to list")
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    args = parser.parse_args(argv)
+
+    report = measure_import(args.target, args.runs)
+    print_report(report, args.top)
+    problems = import_problems(report, args.budget_ms)
+    for problem in problems:
+        print(f"❌ {problem}")
+    if not problems:
+        print(f"✅ Within the {args.budget_ms:.0f}ms budget, no eager heavy imports")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
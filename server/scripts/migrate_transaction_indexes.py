@@ -0,0 +1,118 @@
+"""
+Move the transactions collection to the workload-driven index set
+
+The target set is TRANSACTION_INDEXES in scripts/create_indexes.py. The
+migration never leaves a query without an index:
+
+    1. build every target index that is missing (createIndexes returns once
+       the build has finished)
+    2. check that all target indexes are listed
+    3. only then drop the redundant ones (REDUNDANT_TRANSACTION_INDEXES)
+
+With --hide, step 3 hides the redundant indexes instead: the planner stops
+using them but they are still maintained, so --unhide is an instant rollback
+while the new plans are watched. Run again without --hide to drop them.
+
+Run from server/:
+
+    python -m scripts.migrate_transaction_indexes --dry-run
+    python -m scripts.migrate_transaction_indexes --hide
+    python -m scripts.migrate_transaction_indexes
+
+Re-running is safe; indexes that already match are left alone.
+
+Environment:
+    MONGODB_URL    MongoDB connection string
+    DATABASE_NAME  database to migrate (farm)
+"""
+import argparse
+import asyncio
+import os
+import time
+from typing import Any, Dict, List
+
+from dotenv import load_dotenv
+from pymongo import IndexModel
+
+from scripts.create_indexes import REDUNDANT_TRANSACTION_INDEXES, TRANSACTION_INDEXES
+
+load_dotenv()
+
+MONGODB_URI = os.getenv("MONGODB_URL")
+DB_NAME = os.getenv("DATABASE_NAME", "farm")
+
+
+def index_models(indexes=TRANSACTION_INDEXES) -> List[IndexModel]:
+    return [IndexModel(keys, **options) for keys, options in indexes]
+
+
+def index_plan(existing: Dict[str, Dict[str, Any]], indexes=TRANSACTION_INDEXES,
+               redundant=REDUNDANT_TRANSACTION_INDEXES) -> Dict[str, List[str]]:
+    """
+    What to build, drop, hide and unhide given `existing` (name -> index info,
+    as returned by index_information()). A redundant index is only dropped
+    when it is not also a target.
+    """
+    targets = [model.document["name"] for model in index_models(indexes)]
+    present = [name for name in redundant if name in existing and name not in targets]
+    return {
+        "build": [name for name in targets if name not in existing],
+        "drop": present,
+        "hide": [name for name in present if not existing[name].get("hidden")],
+        "unhide": [name for name in present if existing[name].get("hidden")],
+    }
+
+
+async def migrate_indexes(db, hide: bool = False, unhide: bool = False, dry_run: bool = False) -> Dict[str, List[str]]:
+    """Build missing target indexes, then drop (or hide / unhide) the redundant ones"""
+    collection = db.transactions
+    plan = index_plan(await collection.index_information())
+    if dry_run:
+        return plan
+
+    if unhide:
+        for name in plan["unhide"]:
+            await db.command({"collMod": "transactions", "index": {"name": name, "hidden": False}})
+            print(f"↩️ Unhid {name}")
+        return plan
+
+    models = [model for model in index_models() if model.document["name"] in plan["build"]]
+    for model in models:
+        started = time.perf_counter()
+        await collection.create_indexes([model])
+        print(f"✅ Built {model.document['name']} in {time.perf_counter() - started:.1f}s")
+
+    missing = index_plan(await collection.index_information())["build"]
+    if missing:
+        raise RuntimeError(f"Target indexes missing after build, not dropping anything: {missing}")
+
+    for name in plan["hide" if hide else "drop"]:
+        if hide:
+            await db.command({"collMod": "transactions", "index": {"name": name, "hidden": True}})
+            print(f"🙈 Hid {name}")
+        else:
+            await collection.drop_index(name)
+            print(f"🗑️ Dropped {name}")
+    return plan
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--dry-run", action="store_true", help="print the plan without changing anything")
+    group.add_argument("--hide", action="store_true", help="hide redundant indexes instead of dropping them")
+    group.add_argument("--unhide", action="store_true", help="roll back --hide")
+    args = parser.parse_args()
+
+    from motor.motor_asyncio import AsyncIOMotorClient
+    client = AsyncIOMotorClient(MONGODB_URI)
+    try:
+        plan = await migrate_indexes(client[DB_NAME], hide=args.hide, unhide=args.unhide, dry_run=args.dry_run)
+    finally:
+        client.close()
+    for step, names in plan.items():
+        print(f"  {step:<7} {', '.join(names) or '-'}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
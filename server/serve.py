@@ -0,0 +1,281 @@
+"""
+Pre-fork launcher: one master process, N uvicorn workers sharing its memory
+
+The master imports the app once, preloads the libraries the app otherwise
+imports on first use (utils/lazy_import.py), builds the OpenAPI schema and
+checks the schema version (database/migrations.py), then binds the socket
+and forks the workers. Workers share those pages copy-on-write (gc.freeze()
+keeps the collector from writing to, and so copying, them) and their
+lifespan skips the schema check. When the database is behind, the check
+is left to the workers, one of which applies the migrations in the
+background as usual.
+
+A worker exits after MAX_REQUESTS (plus up to MAX_REQUESTS_JITTER, so they
+do not all restart together) and the master forks a replacement; a worker
+that dies is replaced the same way. SIGTERM / SIGINT stop the workers
+gracefully, SIGHUP recycles all of them.
+
+    python serve.py --workers 4 --port 8000
+
+In-memory caches stay per worker: entries written after the fork are not
+shared, and a write purges only the cache of the worker that handled it.
+Chat context and chat tool results are keyed by the user's data version,
+which lives in MongoDB, so they follow writes made through any worker;
+@cached route responses in other workers can lag until their TTL expires
+(60s for transaction lists). The same goes for everything the app records in memory: /metrics
+and the admin diagnostics (/api/admin/query-stats, /slow-queries,
+/loop-blocks, whose responses carry the worker's pid in meta) describe the
+one worker that happened to serve the request, not the whole server.
+Prometheus scraping through the shared port therefore samples a random
+worker each time; for accurate totals run one worker per container (or per
+port) and let Prometheus aggregate them.
+
+Environment:
+    WEB_CONCURRENCY      workers (CPU count)
+    HOST / PORT          listen address (0.0.0.0 / 8000)
+    MAX_REQUESTS         recycle a worker after this many requests, 0 = never (0)
+    MAX_REQUESTS_JITTER  random extra requests per worker (0)
+    GRACEFUL_TIMEOUT     seconds workers get to finish on shutdown (30)
+    PREFORK_PRELOAD      "false" leaves pandas, pdfplumber and Gemini to load on first use (true)
+"""
+import argparse
+import asyncio
+import gc
+import os
+import random
+import select
+import signal
+import socket
+import sys
+import time
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+MAX_REQUESTS = int(os.getenv("MAX_REQUESTS", "0"))
+MAX_REQUESTS_JITTER = int(os.getenv("MAX_REQUESTS_JITTER", "0"))
+GRACEFUL_TIMEOUT = float(os.getenv("GRACEFUL_TIMEOUT", "30"))
+PREFORK_PRELOAD = os.getenv("PREFORK_PRELOAD", "true").lower() == "true"
+BACKLOG = 2048
+
+
+def worker_max_requests(max_requests: int, jitter: int, rng=random) -> Optional[int]:
+    """Requests before a worker recycles itself (None: never)"""
+    if max_requests <= 0:
+        return None
+    return max_requests + (rng.randint(0, jitter) if jitter > 0 else 0)
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(BACKLOG)
+    sock.set_inheritable(True)
+    return sock
+
+
+def preload_app(app):
+    """One-time work in the master, inherited by every worker"""
+    from utils.logger import logger
+
+    if PREFORK_PRELOAD:
+        from services import ai_service, chat_service
+        for module in (ai_service.genai, ai_service.pd, ai_service.pdfplumber, chat_service.genai):
+            module._load()
+    app.openapi()
+
+    # The master's own client: the app's global one must not be used before fork
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from database.database import MONGODB_URI, DB_NAME
+    from database.migrations import SCHEMA_VERSION, verify_schema
+
+    async def check_schema():
+        client = AsyncIOMotorClient(MONGODB_URI)
+        try:
+            return await verify_schema(client[DB_NAME])
+        finally:
+            client.close()
+
+    try:
+        app.state.schema_verified = asyncio.run(check_schema()) >= SCHEMA_VERSION
+    except Exception as e:
+        logger.error(f"❌ Schema check failed in the master, workers will retry: {str(e)}")
+
+
+class Master:
+    """Forks and supervises uvicorn workers serving `app` on one shared socket"""
+
+    def __init__(self, app, workers: int = WEB_CONCURRENCY, host: str = HOST, port: int = PORT,
+                 max_requests: int = MAX_REQUESTS, max_requests_jitter: int = MAX_REQUESTS_JITTER,
+                 graceful_timeout: float = GRACEFUL_TIMEOUT, sock: Optional[socket.socket] = None):
+        self.app = app
+        self.workers = workers
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.graceful_timeout = graceful_timeout
+        self.sock = sock or bind_socket(host, port)
+        self.children: Dict[int, float] = {}  # pid -> fork time
+        self.booted = 0
+        self.stopping = False
+        self.recycle = False
+
+    def run(self) -> int:
+        from utils.logger import logger
+
+        started = time.perf_counter()
+        self.ready_r, self.ready_w = os.pipe()
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGHUP, self._handle_hup)
+
+        # Everything allocated so far is shared; keep the GC from touching it in the workers
+        gc.collect()
+        gc.freeze()
+        logger.info(f"🚀 Master {os.getpid()} forking {self.workers} workers on {self.sock.getsockname()[:2]}")
+        for _ in range(self.workers):
+            self._spawn()
+
+        while not self.stopping:
+            self._read_ready(started)
+            self._reap()
+            if self.recycle:
+                self.recycle = False
+                logger.info("🔄 Recycling all workers")
+                for pid in list(self.children):
+                    self._signal(pid, signal.SIGTERM)
+            while not self.stopping and len(self.children) < self.workers:
+                self._spawn()
+        return self._shutdown()
+
+    def _spawn(self):
+        max_requests = worker_max_requests(self.max_requests, self.max_requests_jitter)
+        pid = os.fork()
+        if pid:
+            self.children[pid] = time.perf_counter()
+            return
+        code = 0
+        try:
+            os.close(self.ready_r)
+            for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+                signal.signal(sig, signal.SIG_DFL)
+            asyncio.run(self._serve(max_requests))
+        except BaseException:
+            import traceback
+            traceback.print_exc()
+            code = 1
+        finally:
+            os._exit(code)
+
+    async def _serve(self, max_requests: Optional[int]):
+        import uvicorn
+
+        config = uvicorn.Config(self.app, lifespan="on", limit_max_requests=max_requests, log_config=None,
+                                timeout_graceful_shutdown=self.graceful_timeout)
+        server = uvicorn.Server(config)
+        task = asyncio.create_task(server.serve(sockets=[self.sock]))
+        while not server.started and not task.done():
+            await asyncio.sleep(0.01)
+        if server.started:
+            os.write(self.ready_w, f"{os.getpid()}\n".encode())
+        await task
+
+    def _read_ready(self, started: float):
+        from utils.logger import logger
+
+        try:
+            readable, _, _ = select.select([self.ready_r], [], [], 0.5)
+        except InterruptedError:
+            return
+        if not readable:
+            return
+        for line in os.read(self.ready_r, 4096).decode().split():
+            pid = int(line)
+            if pid in self.children:
+                boot_ms = (time.perf_counter() - self.children[pid]) * 1000
+                self.booted += 1
+                if self.booted == self.workers:
+                    logger.info(f"✅ {self.workers} workers ready in {(time.perf_counter() - started) * 1000:.0f}ms")
+                elif self.booted > self.workers:
+                    logger.info(f"✅ Worker {pid} ready in {boot_ms:.0f}ms")
+
+    def _reap(self) -> int:
+        from utils.logger import logger
+
+        reaped = 0
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.children.clear()
+                break
+            if pid == 0:
+                break
+            self.children.pop(pid, None)
+            reaped += 1
+            code = os.waitstatus_to_exitcode(status)
+            if not self.stopping:
+                logger.info(f"♻️ Worker {pid} exited ({code}), replacing it")
+        return reaped
+
+    def _signal(self, pid: int, sig):
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            pass
+
+    def _shutdown(self) -> int:
+        from utils.logger import logger
+
+        logger.info(f"👋 Stopping {len(self.children)} workers...")
+        for pid in list(self.children):
+            self._signal(pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.graceful_timeout
+        while self.children and time.monotonic() < deadline:
+            if not self._reap():
+                time.sleep(0.05)
+        for pid in list(self.children):
+            logger.warning(f"⚠️ Worker {pid} did not stop in {self.graceful_timeout:.0f}s, killing it")
+            self._signal(pid, signal.SIGKILL)
+        while self.children:
+            self._reap()
+            time.sleep(0.05)
+        self.sock.close()
+        return 0
+
+    def _handle_stop(self, signum, frame):
+        self.stopping = True
+
+    def _handle_hup(self, signum, frame):
+        self.recycle = True
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the API with a pre-fork master")
+    parser.add_argument("--workers", type=int, default=WEB_CONCURRENCY)
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--max-requests", type=int, default=MAX_REQUESTS)
+    parser.add_argument("--max-requests-jitter", type=int, default=MAX_REQUESTS_JITTER)
+    parser.add_argument("--graceful-timeout", type=float, default=GRACEFUL_TIMEOUT)
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    from app import app
+
+    preload_app(app)
+    master = Master(app, args.workers, args.host, args.port, args.max_requests, args.max_requests_jitter,
+                    args.graceful_timeout)
+    return master.run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,65 +1,275 @@
 import os
+import re
+import csv
 import json
-import google.generativeai as genai
-import pandas as pd
-import pdfplumber
+import time
+import asyncio
 from datetime import datetime
-from typing import List, Dict, Any
-from io import BytesIO
+from typing import List, Dict, Any, Optional, Tuple, BinaryIO, Union, Callable, Awaitable
+from collections import Counter
+from io import BytesIO, TextIOWrapper
 from dotenv import load_dotenv
 from utils.logger import logger
+from utils.lazy_import import LazyModule
+from services.category_service import CategoryService
+from services.statement_cache_service import statement_cache_key, get_cached_analysis, set_cached_analysis
 
 load_dotenv()
 
 # Configure Gemini
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
 
 
-def extract_text_from_pdf(file_bytes: bytes) -> str:
+def _configure_genai(module):
+    if GEMINI_API_KEY:
+        module.configure(api_key=GEMINI_API_KEY)
+
+
+# Imported on first use: only statement uploads need them
+genai = LazyModule("google.generativeai", on_import=_configure_genai)
+pd = LazyModule("pandas")
+pdfplumber = LazyModule("pdfplumber")
+
+GEMINI_MODEL = 'gemini-flash-latest'
+# Bump whenever the prompts or the local parser change so cached analyses are not reused
+ANALYSIS_VERSION = "2"
+
+CATEGORIES = ['Groceries', 'Rent', 'Salary', 'Utilities', 'Entertainment', 'Dining', 'Shopping', 'Transfer', 'Other']
+
+# Header aliases (normalised: lowercase, alphanumerics only) for each column role
+COLUMN_ALIASES = {
+    "date": ["date", "txndate", "transactiondate", "trandate", "postingdate", "posteddate", "bookingdate", "valuedate", "valuedt"],
+    "description": ["description", "narration", "particulars", "details", "transactiondetails", "transactionremarks",
+                    "remarks", "memo", "payee", "merchant", "name"],
+    "debit": ["debit", "debits", "dr", "withdrawal", "withdrawals", "withdrawalamt", "withdrawalamount",
+              "withdrawalamountinr", "debitamount", "moneyout", "paidout"],
+    "credit": ["credit", "credits", "cr", "deposit", "deposits", "depositamt", "depositamount",
+               "depositamountinr", "creditamount", "moneyin", "paidin"],
+    "amount": ["amount", "amountinr", "transactionamount", "txnamount", "amt", "value"],
+    "type": ["type", "drcr", "crdr", "debitcredit", "transactiontype", "txntype"],
+    "category": ["category"],
+}
+
+# Exact header layouts of common bank exports, matched before falling back to aliases
+KNOWN_BANK_LAYOUTS = {
+    "hdfc": {"date": "date", "description": "narration", "debit": "withdrawalamt", "credit": "depositamt"},
+    "sbi": {"date": "txndate", "description": "description", "debit": "debit", "credit": "credit"},
+    "icici": {"date": "transactiondate", "description": "transactionremarks",
+              "debit": "withdrawalamountinr", "credit": "depositamountinr"},
+    "axis": {"date": "trandate", "description": "particulars", "debit": "dr", "credit": "cr"},
+    "kotak": {"date": "transactiondate", "description": "description", "amount": "amount", "type": "drcr"},
+}
+
+HEADER_SCAN_ROWS = 25
+MIN_PARSED_RATIO = 0.8
+
+# Chunked AI extraction settings
+CHUNK_SIZE_CHARS = int(os.getenv("AI_CHUNK_SIZE_CHARS", "12000"))
+CHUNK_OVERLAP_LINES = int(os.getenv("AI_CHUNK_OVERLAP_LINES", "3"))
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "4"))
+
+
+StatementFile = Union[bytes, BinaryIO]
+ProgressCallback = Callable[..., Awaitable[None]]
+
+
+def _as_stream(file: StatementFile) -> BinaryIO:
+    """Accept raw bytes or a seekable binary handle (e.g. a spooled upload)"""
+    stream = BytesIO(file) if isinstance(file, (bytes, bytearray)) else file
+    stream.seek(0)
+    return stream
+
+
+def extract_text_from_pdf(file: StatementFile) -> str:
     """Extract text from a PDF file."""
     text = ""
-    with pdfplumber.open(BytesIO(file_bytes)) as pdf:
+    with pdfplumber.open(_as_stream(file)) as pdf:
         for page in pdf.pages:
             page_text = page.extract_text()
             if page_text:
                 text += page_text + "\n"
+            page.close()  # release per-page layout caches on long statements
     return text
 
 
-def extract_text_from_excel(file_bytes: bytes) -> str:
-    """Extract text from an Excel/CSV file."""
+def _read_csv_rows(stream: BinaryIO, encoding: str) -> List[List[str]]:
+    stream.seek(0)
+    wrapper = TextIOWrapper(stream, encoding=encoding, newline="")
     try:
-        df = pd.read_excel(BytesIO(file_bytes))
+        return [row for row in csv.reader(wrapper) if any(cell.strip() for cell in row)]
+    finally:
+        wrapper.detach()  # leave the underlying upload open
+
+
+def read_tabular_file(file: StatementFile, filename: str) -> "pd.DataFrame":
+    """Read an Excel/CSV file into a header-less DataFrame of raw cell strings."""
+    stream = _as_stream(file)
+    if filename.lower().endswith('.csv'):
+        try:
+            rows = _read_csv_rows(stream, "utf-8-sig")
+        except UnicodeDecodeError:
+            rows = _read_csv_rows(stream, "latin-1")
+        # csv.reader tolerates ragged preamble rows that pandas' C parser rejects
+        width = max((len(row) for row in rows), default=0)
+        return pd.DataFrame([row + [""] * (width - len(row)) for row in rows], dtype=object)
+
+    try:
+        return pd.read_excel(stream, header=None, dtype=str)
     except Exception:
-        df = pd.read_csv(BytesIO(file_bytes))
-    return df.to_string()
+        stream.seek(0)
+        return pd.read_csv(stream, header=None, dtype=str)
+
+
+def extract_text_from_excel(file: StatementFile, filename: str = "statement.xlsx") -> str:
+    """Extract text from an Excel/CSV file."""
+    return read_tabular_file(file, filename).fillna("").to_string(index=False, header=False)
+
+
+def _normalise_header(value: Any) -> str:
+    return re.sub(r"[^a-z0-9]", "", str(value).lower()) if pd.notna(value) else ""
+
+
+def _detect_columns(headers: List[str]) -> Optional[Dict[str, int]]:
+    """Map column roles to column positions, or None if the row is not a usable header."""
+    for layout in KNOWN_BANK_LAYOUTS.values():
+        if all(h in headers for h in layout.values()):
+            return {role: headers.index(h) for role, h in layout.items()}
+
+    columns = {}
+    for role, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in headers and headers.index(alias) not in columns.values():
+                columns[role] = headers.index(alias)
+                break
+
+    has_amount = "amount" in columns or ("debit" in columns and "credit" in columns)
+    if "date" not in columns or "description" not in columns or not has_amount:
+        return None
+    return columns
+
+
+def _to_amount(series: "pd.Series") -> "pd.Series":
+    """Vectorised parse of '1,234.50', '(12.00)', '₹ 99 Dr' style values; blanks become NaN."""
+    text = series.astype("string").str.strip()
+    negative = text.str.startswith("(") & text.str.endswith(")")
+    negative = negative | text.str.contains(r"(?i)\bdr\.?$", regex=True)
+    cleaned = text.str.replace(r"(?i)\b(cr|dr)\b\.?|[^0-9.\-]", "", regex=True)
+    values = pd.to_numeric(cleaned, errors="coerce")
+    return values.where(~negative.fillna(False).astype(bool), -values.abs())
 
 
-async def analyze_statement(file_content: bytes, filename: str) -> List[Dict[str, Any]]:
+def _to_date(series: "pd.Series") -> "pd.Series":
+    """Parse dates, picking day-first vs month-first by whichever parses more rows."""
+    text = series.astype("string").str.strip()
+    # ISO values (incl. Excel datetimes) are unambiguous and must not go through dayfirst
+    iso = text.str.match(r"^\d{4}-\d{1,2}-\d{1,2}").fillna(False).astype(bool)
+    iso_dates = pd.to_datetime(text.where(iso), errors="coerce", format="ISO8601")
+    others = text.where(~iso)
+    day_first = pd.to_datetime(others, errors="coerce", dayfirst=True, format="mixed")
+    month_first = pd.to_datetime(others, errors="coerce", dayfirst=False, format="mixed")
+    chosen = month_first if month_first.notna().sum() > day_first.notna().sum() else day_first
+    return iso_dates.fillna(chosen)
+
+
+def parse_tabular_statement(raw: "pd.DataFrame") -> Optional[List[Dict[str, Any]]]:
     """
-    Analyzes the uploaded bank statement file using Gemini AI
-    to extract transaction details.
+    Deterministically parse a tabular bank statement without the LLM.
+    Returns TransactionItem-shaped dicts, or None when the layout is ambiguous.
     """
-    if not GEMINI_API_KEY:
-        raise Exception("GEMINI_API_KEY is not set.")
+    columns = None
+    for header_row in range(min(HEADER_SCAN_ROWS, len(raw))):
+        columns = _detect_columns([_normalise_header(v) for v in raw.iloc[header_row]])
+        if columns:
+            break
+    if not columns:
+        return None
 
-    # 1. Extract Text based on file type
-    if filename.lower().endswith('.pdf'):
-        text_data = extract_text_from_pdf(file_content)
-    elif filename.lower().endswith(('.xlsx', '.xls', '.csv')):
-        text_data = extract_text_from_excel(file_content)
+    body = raw.iloc[header_row + 1:]
+    dates = _to_date(body[body.columns[columns["date"]]])
+    descriptions = body[body.columns[columns["description"]]].astype("string").fillna("").str.strip()
+
+    if "debit" in columns and "credit" in columns:
+        debit = _to_amount(body[body.columns[columns["debit"]]]).abs().fillna(0)
+        credit = _to_amount(body[body.columns[columns["credit"]]]).abs().fillna(0)
+        amounts = credit - debit
     else:
-        raise ValueError("Unsupported file format. Please upload PDF, Excel, or CSV.")
+        amounts = _to_amount(body[body.columns[columns["amount"]]])
+        if "type" in columns:
+            marker = body[body.columns[columns["type"]]].astype("string").str.strip().str.lower()
+            is_debit = marker.str.startswith(("d", "w")).fillna(False).astype(bool)
+            amounts = amounts.abs().where(~is_debit, -amounts.abs())
 
-    logger.info(f"📄 Extracted {len(text_data)} characters from {filename}")
+    valid = dates.notna() & amounts.notna() & (amounts != 0)
+    # Rows with a date but no amount are usually totals/footers; rows with neither are noise
+    candidate_rows = dates.notna().sum()
+    if candidate_rows == 0 or valid.sum() / candidate_rows < MIN_PARSED_RATIO:
+        return None
 
-    if not text_data.strip():
-        raise ValueError("Could not extract any text from the uploaded file.")
+    if "category" in columns:
+        categories = body[body.columns[columns["category"]]].astype("string").fillna("").str.strip()
+    else:
+        categories = pd.Series("", index=body.index, dtype="string")
+
+    frame = pd.DataFrame({
+        "date": dates.dt.strftime("%Y-%m-%d"),
+        "description": descriptions,
+        "amount": amounts.abs().round(2),
+        "type": amounts.gt(0).map({True: "credit", False: "debit"}),
+        "category": categories,
+    })[valid]
+    return frame.to_dict(orient="records")
+
+
+def _clean_json_response(response_text: str) -> str:
+    """Remove markdown code fences the model sometimes wraps JSON in."""
+    response_text = response_text.strip()
+    if response_text.startswith("```json"):
+        response_text = response_text[7:]
+    if response_text.startswith("```"):
+        response_text = response_text[3:]
+    if response_text.endswith("```"):
+        response_text = response_text[:-3]
+    return response_text.strip()
+
+
+async def categorize_descriptions(descriptions: List[str]) -> Dict[str, str]:
+    """
+    Ask Gemini for the category of each distinct description. Returns the
+    valid answers only (unknown categories become 'Other'); empty without an
+    API key or when the reply can't be used.
+    """
+    pending = sorted(set(descriptions))
+    if not pending or not GEMINI_API_KEY:
+        return {}
 
-    # 2. Prompt Engineering
     prompt = f"""
+    Categorise each bank transaction description into exactly one of: {", ".join(CATEGORIES)}.
+    Return ONLY a valid JSON object mapping each description to its category. Do not include markdown formatting.
+
+    Descriptions:
+    {json.dumps(pending)}
+    """
+    try:
+        model = genai.GenerativeModel(GEMINI_MODEL)
+        response = await model.generate_content_async(prompt)
+        mapping = json.loads(_clean_json_response(response.text))
+        if not isinstance(mapping, dict):
+            raise ValueError(f"expected a JSON object, got {type(mapping).__name__}")
+        logger.info(f"🏷️ Categorised {len(mapping)} distinct descriptions with AI")
+    except Exception as e:
+        logger.error(f"❌ Categorisation failed, defaulting to 'Other': {str(e)}")
+        return {}
+
+    wanted = set(pending)
+    return {
+        description: category if category in CATEGORIES else "Other"
+        for description, category in mapping.items() if description in wanted
+    }
+
+
+def build_extraction_prompt(text_data: str) -> str:
+    """Prompt asking the model to extract every transaction from a piece of statement text."""
+    return f"""
     You are an intelligent financial assistant. I will provide you with text extracted from a bank statement or transaction file.
     Your task is to identify and extract all financial transactions from this text.
 
@@ -71,41 +281,243 @@ async def analyze_statement(file_content: bytes, filename: str) -> List[Dict[str
     - category: Make an educated guess for the category based on the description (e.g., 'Groceries', 'Rent', 'Salary', 'Utilities', 'Entertainment', 'Dining', 'Shopping', 'Transfer', 'Other').
 
     Return the output ONLY as a valid JSON array of objects. Do not include markdown formatting (like ```json).
-    
+
     Example Output:
     [{{"date": "2023-10-15", "description": "Starbucks Coffee", "amount": 5.50, "type": "debit", "category": "Dining"}},
      {{"date": "2023-10-16", "description": "Salary Deposit", "amount": 3000.00, "type": "credit", "category": "Salary"}}]
 
     Here is the text content:
-    {text_data[:20000]}
+    {text_data}
     """
 
+
+def split_into_chunks(text: str, max_chars: int = CHUNK_SIZE_CHARS, overlap_lines: int = CHUNK_OVERLAP_LINES) -> List[str]:
+    """
+    Split text on line boundaries into chunks of at most ~max_chars. Each chunk
+    repeats the last `overlap_lines` lines of the previous one so a transaction
+    wrapped across a boundary is seen whole by at least one chunk.
+    """
+    lines = [line for line in text.splitlines() if line.strip()]
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    fresh = 0  # lines in `current` that are not overlap carried from the previous chunk
+
+    for line in lines:
+        if fresh and size + len(line) + 1 > max_chars:
+            chunks.append("\n".join(current))
+            current = current[-overlap_lines:] if overlap_lines else []
+            size = sum(len(l) + 1 for l in current)
+            fresh = 0
+        current.append(line)
+        size += len(line) + 1
+        fresh += 1
+
+    if fresh:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def _transaction_key(t: Dict[str, Any]) -> tuple:
+    description = re.sub(r"\s+", " ", str(t.get("description", ""))).strip().lower()
     try:
-        # 3. Call Gemini
-        model = genai.GenerativeModel('gemini-flash-latest')
-        response = model.generate_content(prompt)
-
-        response_text = response.text.strip()
-        logger.info(f"🤖 RAW AI RESPONSE: {response_text[:500]}...")
-
-        # 4. Clean up response - remove markdown code fences if present
-        if response_text.startswith("```json"):
-            response_text = response_text[7:]
-        if response_text.startswith("```"):
-            response_text = response_text[3:]
-        if response_text.endswith("```"):
-            response_text = response_text[:-3]
-        response_text = response_text.strip()
-
-        # 5. Parse JSON
-        transactions = json.loads(response_text)
-        logger.info(f"✅ Parsed {len(transactions)} transactions from AI response")
-        return transactions
+        amount = round(abs(float(t.get("amount", 0))), 2)
+    except (TypeError, ValueError):
+        amount = t.get("amount")
+    return (str(t.get("date", "")), description, amount, str(t.get("type", "")).lower())
 
+
+def merge_chunk_results(chunk_results: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Concatenate per-chunk transactions, dropping rows the previous chunk already
+    produced (the overlap). Genuine repeats inside one chunk are kept.
+    """
+    merged: List[Dict[str, Any]] = []
+    previous: Counter = Counter()
+    for transactions in chunk_results:
+        seen = previous.copy()
+        for t in transactions:
+            key = _transaction_key(t)
+            if seen[key] > 0:
+                seen[key] -= 1
+                continue
+            merged.append(t)
+        previous = Counter(_transaction_key(t) for t in transactions)
+    return merged
+
+
+async def _extract_chunk(model, chunk: str, index: int, total: int, semaphore: asyncio.Semaphore) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    async with semaphore:
+        started = time.perf_counter()
+        response = await model.generate_content_async(build_extraction_prompt(chunk))
+        latency_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    response_text = _clean_json_response(response.text)
+    try:
+        transactions = json.loads(response_text)
     except json.JSONDecodeError as e:
-        logger.error(f"❌ JSON Decode Error: {e}")
-        logger.error(f"❌ Invalid JSON content: {response_text}")
+        logger.error(f"❌ JSON Decode Error in chunk {index + 1}/{total}: {e}")
+        logger.error(f"❌ Invalid JSON content: {response_text[:500]}")
         raise ValueError("Failed to parse transactions using AI. The model response was not valid JSON.")
+    if not isinstance(transactions, list) or not all(isinstance(t, dict) for t in transactions):
+        logger.error(f"❌ Chunk {index + 1}/{total} is not a JSON array of objects: {response_text[:500]}")
+        raise ValueError("Failed to parse transactions using AI. The model returned invalid data.")
+
+    logger.info(f"🧩 Chunk {index + 1}/{total}: {len(transactions)} transactions in {latency_ms}ms")
+    return transactions, {"chunk": index, "characters": len(chunk), "transactions": len(transactions), "latency_ms": latency_ms}
+
+
+async def extract_transactions_with_ai(
+    text_data: str,
+    model=None,
+    max_concurrency: int = AI_MAX_CONCURRENCY,
+    chunk_size: int = CHUNK_SIZE_CHARS,
+    on_progress: Optional[ProgressCallback] = None
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Extract transactions from statement text by sending overlapping chunks to
+    the model concurrently (at most `max_concurrency` in flight).
+    Returns (transactions, per-chunk stats). `model` only needs an async
+    `generate_content_async(prompt)` returning an object with `.text`.
+    """
+    model = model or genai.GenerativeModel(GEMINI_MODEL)
+    chunks = split_into_chunks(text_data, chunk_size)
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    completed = 0
+
+    async def run_chunk(chunk: str, index: int):
+        nonlocal completed
+        result = await _extract_chunk(model, chunk, index, len(chunks), semaphore)
+        completed += 1
+        if on_progress:
+            await on_progress("analysing", chunks_done=completed, chunks_total=len(chunks))
+        return result
+
+    if on_progress:
+        await on_progress("analysing", chunks_done=0, chunks_total=len(chunks))
+
+    try:
+        results = await asyncio.gather(*(run_chunk(chunk, i) for i, chunk in enumerate(chunks)))
+    except ValueError:
+        raise
     except Exception as e:
         logger.error(f"❌ Gemini API Error: {str(e)}")
         raise
+
+    transactions = merge_chunk_results([r[0] for r in results])
+    stats = [r[1] for r in results]
+    logger.info(f"✅ Parsed {len(transactions)} transactions from {len(chunks)} chunks "
+                f"(slowest chunk {max((s['latency_ms'] for s in stats), default=0)}ms)")
+    return transactions, stats
+
+
+async def analyze_statement(
+    file_content: StatementFile,
+    filename: str,
+    user_id: Optional[str] = None,
+    on_progress: Optional[ProgressCallback] = None
+) -> List[Dict[str, Any]]:
+    """
+    Analyzes the uploaded bank statement file to extract transaction details.
+
+    Categories come from, in order: the file's own category column, the
+    user's merchant memo, then the model, which is only asked about the
+    descriptions neither of the others resolves. The cache is keyed by file
+    content and shared by every user, so it holds the analysis before any
+    memo is applied; the model's guesses are kept apart in `ai_category`
+    and accumulate there, so re-uploading a statement doesn't call the model
+    again.
+    """
+    cache_key = statement_cache_key(file_content, filename, f"{ANALYSIS_VERSION}:{GEMINI_MODEL}")
+    analysis = None
+    try:
+        analysis = await get_cached_analysis(cache_key)
+        if analysis is not None:
+            logger.info(f"⚡ Statement analysis cache HIT for {filename} ({len(analysis)} transactions)")
+    except Exception as e:
+        logger.warning(f"⚠️ Statement analysis cache unavailable: {str(e)}")
+    changed = analysis is None
+    if analysis is None:
+        analysis = await _analyze_statement(file_content, filename, on_progress)
+
+    # This user's copy; the memo never touches the cached rows
+    transactions = [dict(t) for t in analysis]
+    await _apply_category_memo(user_id, transactions)
+
+    unresolved = [t["description"] for t in transactions if not t.get("category") and not t.get("ai_category")]
+    if unresolved:
+        mapping = await categorize_descriptions(unresolved)
+        for rows in (analysis, transactions):
+            for t in rows:
+                if not t.get("category") and t["description"] in mapping:
+                    t["ai_category"] = mapping[t["description"]]
+        changed = changed or bool(mapping)
+
+    # Without an API key categories are placeholders; don't pin them in the cache
+    if GEMINI_API_KEY and changed:
+        try:
+            await set_cached_analysis(cache_key, analysis)
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to cache statement analysis: {str(e)}")
+
+    for t in transactions:
+        ai_category = t.pop("ai_category", None)
+        if not t.get("category"):
+            t["category"] = ai_category or "Other"
+    return transactions
+
+
+async def _apply_category_memo(user_id: Optional[str], transactions: List[Dict[str, Any]]) -> int:
+    """Fill missing categories from the merchant memo; memo failures never fail the analysis"""
+    try:
+        applied = await CategoryService.apply_suggestions(user_id, transactions)
+        if applied:
+            logger.info(f"🏷️ Categorised {applied} transactions from merchant memo")
+        return applied
+    except Exception as e:
+        logger.warning(f"⚠️ Merchant memo unavailable: {str(e)}")
+        return 0
+
+
+async def _analyze_statement(
+    file_content: StatementFile,
+    filename: str,
+    on_progress: Optional[ProgressCallback] = None
+) -> List[Dict[str, Any]]:
+    """
+    Well-formed CSV/Excel exports are parsed locally; Gemini is used only to
+    categorise them, or to extract transactions from PDFs and ambiguous sheets.
+    """
+    if on_progress:
+        await on_progress("extracting")
+
+    # 1. Extract Text based on file type (CPU-bound, kept off the event loop)
+    if filename.lower().endswith('.pdf'):
+        text_data = await asyncio.to_thread(extract_text_from_pdf, file_content)
+    elif filename.lower().endswith(('.xlsx', '.xls', '.csv')):
+        raw = await asyncio.to_thread(read_tabular_file, file_content, filename)
+        parsed = await asyncio.to_thread(parse_tabular_statement, raw)
+        if parsed is not None:
+            logger.info(f"⚡ Parsed {len(parsed)} transactions from {filename} without AI extraction")
+            if on_progress:
+                await on_progress("analysing", rows=len(parsed))
+            # Categorised per user by analyze_statement
+            return parsed
+        text_data = raw.fillna("").to_string(index=False, header=False)
+    else:
+        raise ValueError("Unsupported file format. Please upload PDF, Excel, or CSV.")
+
+    if not GEMINI_API_KEY:
+        raise Exception("GEMINI_API_KEY is not set.")
+
+    logger.info(f"📄 Extracted {len(text_data)} characters from {filename}")
+
+    if not text_data.strip():
+        raise ValueError("Could not extract any text from the uploaded file.")
+
+    # 2. Chunked extraction with Gemini
+    transactions, _ = await extract_transactions_with_ai(text_data, on_progress=on_progress)
+    # The extraction prompt's categories are guesses: the user's memo takes precedence
+    for t in transactions:
+        t["ai_category"] = t.pop("category", None) or ""
+    return transactions
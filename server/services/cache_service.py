@@ -1,6 +1,12 @@
 import time
 from typing import Dict, Any, Optional
+from database.queries.user_queries import get_data_version_query, bump_data_version_query
 from utils.logger import logger
+from utils.metrics import metrics
+
+cache_requests_total = metrics.counter("cache_requests_total", "In-memory cache lookups by result (hit, miss)", ("result",))
+cache_evictions_total = metrics.counter("cache_evictions_total", "In-memory cache entries removed by reason (expired, invalidated, cleared)", ("reason",))
+cache_items = metrics.gauge("cache_items", "Entries currently held in the in-memory cache")
 
 class CacheService:
     _instance = None
@@ -18,10 +24,13 @@ class CacheService:
             item = self._cache[key]
             if item["expires"] > time.time():
                 # logger.debug(f"cache HIT: {key}")
+                cache_requests_total.inc(result="hit")
                 return item["value"]
             else:
                 # logger.debug(f"cache EXPIRED: {key}")
                 del self._cache[key]
+                cache_evictions_total.inc(reason="expired")
+        cache_requests_total.inc(result="miss")
         return None
 
     def set(self, key: str, value: Any, ttl_seconds: int = 300):
@@ -36,6 +45,7 @@ class CacheService:
         """Clear all cache"""
         count = len(self._cache)
         self._cache = {}
+        cache_evictions_total.inc(count, reason="cleared")
         logger.info(f"🧹 Cache cleared ({count} items removed)")
         return count
 
@@ -44,15 +54,28 @@ class CacheService:
         keys_to_remove = [k for k in self._cache.keys() if k.startswith(prefix)]
         for k in keys_to_remove:
             del self._cache[k]
+        cache_evictions_total.inc(len(keys_to_remove), reason="invalidated")
         
         if keys_to_remove:
             logger.info(f"🧹 Invalidated {len(keys_to_remove)} keys with prefix '{prefix}'")
         return len(keys_to_remove)
 
-    def invalidate_user_cache(self, user_id: str):
-        """Invalidate all cache for a specific user"""
+    async def invalidate_user_cache(self, user_id: str):
+        """
+        Invalidate this process's cache for a user and bump their data version.
+        Other worker processes can't be reached, so the version lives in MongoDB
+        (user_data_versions): keys built with it go stale in every worker at once.
+        """
+        try:
+            await bump_data_version_query(str(user_id))
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to bump data version for user {user_id}: {str(e)}")
         return self.invalidate_starting_with(f"user:{user_id}:")
 
+    async def get_user_version(self, user_id: str) -> int:
+        """Counter bumped on every write to the user's data, shared by all workers; use it in derived cache keys"""
+        return await get_data_version_query(str(user_id))
+
     def get_stats(self):
         """Get cache statistics"""
         return {
@@ -62,3 +85,10 @@ class CacheService:
 
 # Global instance
 cache_service = CacheService()
+
+
+async def _collect_cache_metrics():
+    cache_items.set(len(cache_service._cache))
+
+
+metrics.add_collector(_collect_cache_metrics)
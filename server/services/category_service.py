@@ -0,0 +1,134 @@
+"""
+Category service - Merchant to category memo used to pre-categorise transactions
+"""
+import re
+from collections import Counter, defaultdict
+from bson import ObjectId
+from typing import List, Dict, Any, Optional
+from database.queries.category_queries import (
+    increment_merchant_counts_query,
+    get_merchant_counts_query,
+    replace_merchant_counts_query,
+    get_description_category_counts_query
+)
+
+# Words that describe the payment rail rather than the merchant
+MERCHANT_NOISE_WORDS = {
+    "upi", "neft", "imps", "rtgs", "pos", "ach", "nach", "ecom", "ecs", "purchase", "payment", "pymt",
+    "txn", "ref", "debit", "credit", "card", "visa", "mastercard", "rupay", "to", "from", "by", "via", "at"
+}
+MERCHANT_TOKENS = 3
+
+MIN_USER_CONFIDENCE = 0.6
+MIN_GLOBAL_CONFIDENCE = 0.75
+MIN_GLOBAL_COUNT = 3
+
+
+class CategoryService:
+    """Per-user and global merchant -> category frequency index"""
+
+    @staticmethod
+    def normalize_merchant(description: Optional[str]) -> str:
+        """'UPI-SWIGGY-ORDER-88213/okaxis' -> 'swiggy order okaxis'"""
+        text = re.sub(r"[^a-z ]", " ", (description or "").lower())
+        tokens = [
+            t for t in text.split()
+            if len(t) > 1 and t not in MERCHANT_NOISE_WORDS and t.strip("x")  # 'xxxx' is a masked card number
+        ]
+        return " ".join(tokens[:MERCHANT_TOKENS])
+
+    @staticmethod
+    async def learn(user_id: str, transactions: List[Dict[str, Any]]) -> None:
+        """Record confirmed categories for the user and the global memo"""
+        counts = Counter()
+        for t in transactions:
+            merchant = CategoryService.normalize_merchant(t.get("description"))
+            category = (t.get("category") or "").strip()
+            if merchant and category:
+                counts[(merchant, category)] += 1
+
+        owner = ObjectId(user_id)
+        await increment_merchant_counts_query(
+            [(owner, m, c, n) for (m, c), n in counts.items()] +
+            [(None, m, c, n) for (m, c), n in counts.items()]
+        )
+
+    @staticmethod
+    async def suggest(user_id: str, descriptions: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Suggest categories for descriptions. The user's own history wins; the
+        global memo is only used when it is frequent and unambiguous enough.
+        Unresolved descriptions are absent from the result.
+        """
+        merchants = {d: CategoryService.normalize_merchant(d) for d in descriptions}
+        wanted = sorted({m for m in merchants.values() if m})
+        if not wanted:
+            return {}
+
+        user_counts = defaultdict(Counter)
+        global_counts = defaultdict(Counter)
+        for doc in await get_merchant_counts_query(user_id, wanted):
+            target = global_counts if doc["user_id"] is None else user_counts
+            target[doc["merchant"]][doc["category"]] += doc["count"]
+
+        resolved = {}
+        for merchant in wanted:
+            suggestion = CategoryService._pick(user_counts[merchant], "user", MIN_USER_CONFIDENCE, 1)
+            if not suggestion:
+                suggestion = CategoryService._pick(global_counts[merchant], "global", MIN_GLOBAL_CONFIDENCE, MIN_GLOBAL_COUNT)
+            if suggestion:
+                resolved[merchant] = suggestion
+
+        return {d: resolved[m] for d, m in merchants.items() if m in resolved}
+
+    @staticmethod
+    def _pick(counts: Counter, source: str, min_confidence: float, min_count: int) -> Optional[Dict[str, Any]]:
+        total = sum(counts.values())
+        if total < min_count:
+            return None
+        category, count = counts.most_common(1)[0]
+        confidence = count / total
+        if confidence < min_confidence:
+            return None
+        return {"category": category, "confidence": round(confidence, 2), "count": total, "source": source}
+
+    @staticmethod
+    async def apply_suggestions(user_id: Optional[str], transactions: List[Dict[str, Any]], overwrite: bool = False) -> int:
+        """Fill (or overwrite) transaction categories from the memo; returns how many were set"""
+        if not user_id:
+            return 0
+        targets = [t for t in transactions if overwrite or not t.get("category")]
+        suggestions = await CategoryService.suggest(user_id, [t.get("description", "") for t in targets])
+        applied = 0
+        for t in targets:
+            suggestion = suggestions.get(t.get("description", ""))
+            if suggestion:
+                t["category"] = suggestion["category"]
+                applied += 1
+        return applied
+
+    @staticmethod
+    async def rebuild_index(user_id: Optional[str] = None) -> Dict[str, int]:
+        """
+        Recompute the memo from stored transactions, for one user or
+        (user_id None) for every user plus the global memo.
+        """
+        match = {"user_id": ObjectId(user_id)} if user_id else {}
+        rows = await get_description_category_counts_query(match)
+
+        counts = Counter()
+        for row in rows:
+            merchant = CategoryService.normalize_merchant(row["_id"].get("description"))
+            category = (row["_id"].get("category") or "").strip()
+            if merchant and category:
+                counts[(row["_id"]["user_id"], merchant, category)] += row["count"]
+
+        entries = [(owner, m, c, n) for (owner, m, c), n in counts.items()]
+        if not user_id:
+            global_counts = Counter()
+            for (_, m, c), n in counts.items():
+                global_counts[(m, c)] += n
+            entries += [(None, m, c, n) for (m, c), n in global_counts.items()]
+
+        await replace_merchant_counts_query(ObjectId(user_id) if user_id else None, entries)
+        return {"merchants": len({(o, m) for o, m, _, _ in entries}), "entries": len(entries)}
@@ -1,15 +1,27 @@
-import google.generativeai as genai
 import os
 import json
-from services.dashboard_service import DashboardService
-from services.transaction_service import TransactionService
-from models.payloads import TransactionFilter, PaginationParams
+import hashlib
+import math
+import time
+from datetime import datetime
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
+from services.cache_service import cache_service
+from services.chat_tool_service import ChatToolService, CHAT_TOOLS
+from database.queries.transaction_queries import get_total_balance_query
+from utils.lazy_import import LazyModule
 
 
 # Configure Gemini
 GENAI_API_KEY = os.getenv("GEMINI_API_KEY")
-if GENAI_API_KEY:
-    genai.configure(api_key=GENAI_API_KEY)
+
+
+def _configure_genai(module):
+    if GENAI_API_KEY:
+        module.configure(api_key=GENAI_API_KEY)
+
+
+# Imported on the first chat message, not at worker startup
+genai = LazyModule("google.generativeai", on_import=_configure_genai)
 
 # System Prompt
 SYSTEM_PROMPT = """
@@ -19,76 +31,305 @@ Your goal is to help users understand their financial data, including expenses,
 RULES:
 1. You must ONLY answer questions related to the user's finances, expenses, income, budget, or financial advice.
 2. If the user asks about anything else (e.g., "write a poem", "who is the president", "coding help"), you must politely refuse: "I can only assist you with financial queries related to your Expenses Tracker data."
-3. You have access to the user's current financial context (KPIs and recent transactions) in JSON format. Use this data to answer specific questions like "How much did I spend?" or "What is my balance?".
-4. Be concise, professional, and encouraging.
-5. Format currency in Indian Rupees (₹).
+3. You are given a short summary of the user's finances (today's date, available balance and this month's totals) in JSON format.
+4. For anything more specific (a category, merchant, period or individual transactions), call the provided tools to query the user's data. Never guess figures; resolve relative periods like "last month" against today's date.
+5. Be concise, professional, and encouraging.
+6. Format currency in Indian Rupees (₹).
 """
 
 from utils.logger import logger
 
-async def generate_chat_response(user_id: str, message: str, history: list = []):
-    logger.info(f"DEBUG: generate_chat_response called for user {user_id}")
-    if not GENAI_API_KEY:
-        logger.error("DEBUG: GENAI_API_KEY is missing")
-        return "AI Chat is not configured. Please set GEMINI_API_KEY in server environment."
+# Serialized context is reused across a conversation until the user's data changes
+CHAT_CONTEXT_TTL_SECONDS = int(os.getenv("CHAT_CONTEXT_TTL_SECONDS", "600"))
 
-    try:
-        # 1. Fetch Context
-        logger.info("DEBUG: Fetching KPIs...")
-        # Get KPIs (default to 'month' context)
-        kpis = await DashboardService.get_kpis(user_id, "month")
-        logger.info(f"DEBUG: KPIs fetched: {kpis.keys()}")
-        
-        # Get Recent Transactions (last 10)
-        logger.info("DEBUG: Fetching Transactions...")
-        filters = TransactionFilter()
-        pagination = PaginationParams(page=1, limit=10)
-        transactions_data = await TransactionService.list_transactions(user_id, filters, pagination)
-        transactions = transactions_data.get("transactions", [])
-        logger.info(f"DEBUG: Transactions fetched: {len(transactions)}")
-        
-        # Prepare Context String
-        context_data = {
-            "kpis": kpis,
-            "recent_transactions": [
-                {
-                    "date": t["date"], 
-                    "amount": t["amount"], 
-                    "type": t["type"], 
-                    "category": t["category"], 
-                    "description": t.get("description", "")
-                } for t in transactions
-            ]
+
+async def get_chat_context(user_id: str) -> str:
+    """
+    Small summary placed in every prompt: today's date, available balance
+    and this month's totals. Anything more specific is fetched by the model
+    through tools. Cached per user, data version and day.
+    """
+    version = await cache_service.get_user_version(user_id)
+    today = datetime.now().strftime('%Y-%m-%d')
+    key = f"user:{user_id}:chat_context:{version}:{today}"
+    context_str = cache_service.get(key)
+    if context_str is not None:
+        logger.debug(f"⚡ Chat context HIT for user {user_id}")
+        return context_str
+
+    month = await ChatToolService.run_tool(user_id, "get_date_range_totals", {})
+    context_data = {
+        "today": today,
+        "available_balance": await get_total_balance_query(user_id),
+        "this_month": {k: month[k] for k in ("start_date", "end_date", "total_credits", "total_debits", "count")}
+    }
+    context_str = json.dumps(context_data, default=str, separators=(",", ":"))
+    cache_service.set(key, context_str, CHAT_CONTEXT_TTL_SECONDS)
+    logger.debug(f"💾 Chat context SET for user {user_id} ({len(context_str)} chars)")
+    return context_str
+
+
+CHAT_MODEL = 'gemini-flash-latest'
+CHAT_NOT_CONFIGURED = "AI Chat is not configured. Please set GEMINI_API_KEY in server environment."
+CHAT_MAX_TOOL_ROUNDS = 4
+CHAT_TOOLS_EXHAUSTED = "Sorry, I couldn't finish looking that up. Please try a more specific question."
+
+# Prompt budget: system prompt + context + summary + recent turns + new message
+CHAT_PROMPT_TOKEN_BUDGET = int(os.getenv("CHAT_PROMPT_TOKEN_BUDGET", "6000"))
+CHAT_RECENT_MESSAGES = int(os.getenv("CHAT_RECENT_MESSAGES", "10"))
+CHAT_SUMMARY_MAX_TOKENS = int(os.getenv("CHAT_SUMMARY_MAX_TOKENS", "400"))
+CHAT_SUMMARY_TTL_SECONDS = 3600
+CHARS_PER_TOKEN = 4  # rough estimate for English text and JSON, good enough for budgeting
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text or "") / CHARS_PER_TOKEN)
+
+
+def _clip_to_tokens(text: str, tokens: int, keep_end: bool = False) -> str:
+    limit = tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    return "…" + text[-(limit - 1):] if keep_end else text[:limit - 1] + "…"
+
+
+class ChatHistoryManager:
+    """
+    Keeps the prompt within CHAT_PROMPT_TOKEN_BUDGET: the newest turns are sent
+    verbatim and older turns are folded into a rolling summary. Summaries are
+    cached by a hash chain over the folded messages, so each turn of a growing
+    conversation only summarises the messages folded since the previous one.
+    """
+
+    def __init__(self, budget: int = CHAT_PROMPT_TOKEN_BUDGET, recent_messages: int = CHAT_RECENT_MESSAGES):
+        self.budget = budget
+        self.recent_messages = recent_messages
+        self.stats = {
+            "requests": 0,
+            "prompt_tokens_total": 0,
+            "prompt_tokens_max": 0,
+            "prompt_tokens_last": 0,
+            "history_messages_total": 0,
+            "messages_summarized_total": 0,
+            "summaries_generated": 0,
+            "summary_cache_hits": 0,
+            "over_budget": 0
         }
-        
-        context_str = json.dumps(context_data, default=str)
-
-        # 2. Initialize Model
-        logger.info("DEBUG: Initializing Gemini Model...")
-        model = genai.GenerativeModel('gemini-flash-latest')
-        
-        # 3. Construct Chat History
-        # Start with System Prompt + Context
-        full_history = [
-            {"role": "user", "parts": [f"{SYSTEM_PROMPT}\n\nUSER CONTEXT:\n{context_str}"]},
-            {"role": "model", "parts": ["Understood. I am ready to assist with financial queries based on this data."]}
-        ]
-        
-        # Add User History (mapped to Gemini format)
-        for msg in history:
-            role = "user" if msg.get("role") == "user" else "model"
-            full_history.append({"role": role, "parts": [msg.get("content", "")]})
-        
-        # 4. Generate Response
-        logger.info("DEBUG: Sending message to Gemini...")
-        chat = model.start_chat(history=full_history)
-        response = chat.send_message(message)
-        logger.info("DEBUG: Gemini response received")
-        
-        return response.text
+
+    @staticmethod
+    def _prefix_hashes(user_id: str, messages: List[Dict[str, Any]]) -> List[str]:
+        """hashes[i] identifies messages[:i]"""
+        hashes = [hashlib.sha1(str(user_id).encode()).hexdigest()]
+        for msg in messages:
+            raw = f"{hashes[-1]}|{msg.get('role')}|{msg.get('content', '')}"
+            hashes.append(hashlib.sha1(raw.encode("utf-8")).hexdigest())
+        return hashes
+
+    async def _summarize(self, previous: str, messages: List[Dict[str, Any]], model=None) -> str:
+        transcript = "\n".join(
+            f"{'User' if m.get('role') == 'user' else 'Assistant'}: {m.get('content', '')}" for m in messages
+        )
+        if model is not None or GENAI_API_KEY:
+            try:
+                model = model or genai.GenerativeModel(CHAT_MODEL)
+                prompt = (
+                    "Update the running summary of a conversation between a user and their financial assistant. "
+                    f"Keep amounts, dates, categories and stated preferences. Answer in under {CHAT_SUMMARY_MAX_TOKENS * 3 // 4} words.\n\n"
+                    f"CURRENT SUMMARY:\n{previous or '(none)'}\n\nNEW MESSAGES:\n{transcript}"
+                )
+                response = await model.generate_content_async(prompt)
+                self.stats["summaries_generated"] += 1
+                return _clip_to_tokens(response.text.strip(), CHAT_SUMMARY_MAX_TOKENS)
+            except Exception as e:
+                logger.warning(f"⚠️ Chat summary failed, using extractive summary: {e}")
+
+        # Extractive fallback: the most recent part of summary + transcript
+        return _clip_to_tokens(f"{previous}\n{transcript}".strip(), CHAT_SUMMARY_MAX_TOKENS, keep_end=True)
+
+    async def _rolling_summary(self, user_id: str, folded: List[Dict[str, Any]], model=None) -> str:
+        hashes = self._prefix_hashes(user_id, folded)
+        target = f"chat_summary:{user_id}:{hashes[-1]}"
+        summary = cache_service.get(target)
+        if summary is not None:
+            self.stats["summary_cache_hits"] += 1
+            return summary
+
+        # Resume from the longest folded prefix that was already summarised
+        previous, start = "", 0
+        for i in range(len(folded) - 1, 0, -1):
+            cached = cache_service.get(f"chat_summary:{user_id}:{hashes[i]}")
+            if cached is not None:
+                previous, start = cached, i
+                self.stats["summary_cache_hits"] += 1
+                break
+
+        summary = await self._summarize(previous, folded[start:], model)
+        cache_service.set(target, summary, CHAT_SUMMARY_TTL_SECONDS)
+        return summary
+
+    async def compact(
+        self, user_id: str, history: List[Dict[str, Any]], fixed_tokens: int, model=None
+    ) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+        """
+        Split history into (summary of older turns, newest turns kept verbatim)
+        given the tokens already used by the system prompt, context and message.
+        """
+        available = self.budget - fixed_tokens
+        recent: List[Dict[str, Any]] = []
+        used = 0
+        for msg in reversed(history[-self.recent_messages:]):
+            cost = estimate_tokens(msg.get("content", ""))
+            if recent and used + cost > available - CHAT_SUMMARY_MAX_TOKENS:
+                break
+            recent.insert(0, msg)
+            used += cost
+
+        # The newest message is always kept; trim it if it alone is over budget
+        if recent and used > available:
+            newest = dict(recent[-1])
+            newest["content"] = _clip_to_tokens(newest.get("content", ""), max(available // 2, 64), keep_end=True)
+            recent[-1] = newest
+
+        folded = history[:len(history) - len(recent)]
+        summary = await self._rolling_summary(user_id, folded, model) if folded else None
+        self.stats["history_messages_total"] += len(history)
+        self.stats["messages_summarized_total"] += len(folded)
+        return summary, recent
+
+    def record(self, prompt_tokens: int):
+        self.stats["requests"] += 1
+        self.stats["prompt_tokens_total"] += prompt_tokens
+        self.stats["prompt_tokens_last"] = prompt_tokens
+        self.stats["prompt_tokens_max"] = max(self.stats["prompt_tokens_max"], prompt_tokens)
+        if prompt_tokens > self.budget:
+            self.stats["over_budget"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        requests = self.stats["requests"]
+        return {
+            **self.stats,
+            "budget": self.budget,
+            "prompt_tokens_avg": round(self.stats["prompt_tokens_total"] / requests, 1) if requests else 0
+        }
+
+
+# Global instance
+chat_history_manager = ChatHistoryManager()
+
+
+def build_chat_history(context_str: str, history: list, summary: Optional[str] = None) -> list:
+    """System prompt + context (+ summary of older turns), followed by the recent history in Gemini format"""
+    preamble = f"{SYSTEM_PROMPT}\n\nUSER CONTEXT:\n{context_str}"
+    if summary:
+        preamble += f"\n\nEARLIER CONVERSATION (summary):\n{summary}"
+
+    # Start with System Prompt + Context
+    full_history = [
+        {"role": "user", "parts": [preamble]},
+        {"role": "model", "parts": ["Understood. I am ready to assist with financial queries based on this data."]}
+    ]
+
+    # Add User History (mapped to Gemini format)
+    for msg in history:
+        role = "user" if msg.get("role") == "user" else "model"
+        full_history.append({"role": role, "parts": [msg.get("content", "")]})
+    return full_history
+
+
+async def _start_chat(user_id: str, message: str, history: list, model=None):
+    context_str = await get_chat_context(user_id)
+    fixed_tokens = estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(context_str) + estimate_tokens(message) + 32
+    summary, recent = await chat_history_manager.compact(user_id, history or [], fixed_tokens, model)
+    full_history = build_chat_history(context_str, recent, summary)
+
+    prompt_tokens = sum(estimate_tokens(part) for turn in full_history for part in turn["parts"]) + estimate_tokens(message)
+    chat_history_manager.record(prompt_tokens)
+    logger.info(
+        f"💬 Chat prompt for user {user_id}: prompt_tokens={prompt_tokens} "
+        f"history={len(history or [])} kept={len(recent)} summarized={len(history or []) - len(recent)}"
+    )
+
+    model = model or genai.GenerativeModel(CHAT_MODEL, tools=CHAT_TOOLS)
+    return model.start_chat(history=full_history)
+
+
+def _response_parts(response) -> list:
+    try:
+        return list(response.parts)
+    except (AttributeError, ValueError):
+        return []
+
+
+def _function_calls(parts: list) -> list:
+    return [part.function_call for part in parts if getattr(part, "function_call", None) and part.function_call.name]
+
+
+async def _run_function_calls(user_id: str, calls: list) -> list:
+    """Execute the model's tool calls and wrap the results as function_response parts"""
+    responses = []
+    for call in calls:
+        args = dict(call.args) if call.args else {}
+        result = await ChatToolService.run_tool(user_id, call.name, args)
+        responses.append(genai.protos.Part(
+            function_response=genai.protos.FunctionResponse(name=call.name, response={"result": result})
+        ))
+    return responses
+
+
+async def generate_chat_response(user_id: str, message: str, history: list = [], model=None):
+    logger.info(f"💬 Chat message from user {user_id}")
+    if not GENAI_API_KEY and model is None:
+        logger.error("❌ GEMINI_API_KEY is missing")
+        return CHAT_NOT_CONFIGURED
+
+    try:
+        chat = await _start_chat(user_id, message, history, model)
+        # Async API keeps the model call off the event loop
+        response = await chat.send_message_async(message)
+        for _ in range(CHAT_MAX_TOOL_ROUNDS):
+            calls = _function_calls(_response_parts(response))
+            if not calls:
+                return response.text
+            response = await chat.send_message_async(await _run_function_calls(user_id, calls))
+
+        return response.text if not _function_calls(_response_parts(response)) else CHAT_TOOLS_EXHAUSTED
     except Exception as e:
-        logger.error(f"DEBUG: User ID: {user_id}")
-        logger.error(f"DEBUG: Error in generate_chat_response: {e}")
+        logger.error(f"❌ Error in generate_chat_response for user {user_id}: {e}")
         import traceback
         logger.error(traceback.format_exc())
         raise e
+
+
+async def stream_chat_response(user_id: str, message: str, history: list = [], model=None) -> AsyncIterator[str]:
+    """
+    Yield reply text chunks as the model produces them. `model` can be any
+    object with a Gemini-style start_chat(); tests pass a local fake.
+    """
+    if not GENAI_API_KEY and model is None:
+        yield CHAT_NOT_CONFIGURED
+        return
+
+    started = time.perf_counter()
+    first_token_ms = None
+    chat = await _start_chat(user_id, message, history, model)
+    content = message
+    for _ in range(CHAT_MAX_TOOL_ROUNDS + 1):
+        calls = []
+        response = await chat.send_message_async(content, stream=True)
+        async for chunk in response:
+            for part in _response_parts(chunk):
+                if getattr(part, "function_call", None) and part.function_call.name:
+                    calls.append(part.function_call)
+                elif getattr(part, "text", ""):
+                    if first_token_ms is None:
+                        first_token_ms = int((time.perf_counter() - started) * 1000)
+                    yield part.text
+        if not calls:
+            break
+        # Tool rounds happen before any answer text, so the client just sees a later first token
+        content = await _run_function_calls(user_id, calls)
+    else:
+        yield CHAT_TOOLS_EXHAUSTED
+
+    total_ms = int((time.perf_counter() - started) * 1000)
+    logger.info(f"💬 Streamed chat reply for user {user_id} (first_token_ms={first_token_ms}, total_ms={total_ms})")
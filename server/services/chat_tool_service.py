@@ -0,0 +1,213 @@
+"""
+Chat tool service - Read-only queries the chat assistant can call (Gemini function calling)
+"""
+import hashlib
+import json
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, Tuple
+from database.queries.transaction_queries import aggregate_transactions_query
+from services.cache_service import cache_service
+from services.category_service import CategoryService
+from utils.aggregation_pipelines import (
+    build_category_pipeline,
+    build_date_range_totals_pipeline,
+    build_merchant_totals_pipeline,
+    build_search_pipeline
+)
+from utils.logger import logger
+
+CHAT_TOOL_TTL_SECONDS = int(os.getenv("CHAT_TOOL_TTL_SECONDS", "600"))
+MAX_TOOL_LIMIT = 50
+
+_DATE_PARAMS = {
+    "start_date": {"type": "string", "description": "Inclusive start date, YYYY-MM-DD. Defaults to the first day of the current month."},
+    "end_date": {"type": "string", "description": "Inclusive end date, YYYY-MM-DD. Defaults to today."}
+}
+
+CHAT_TOOL_DECLARATIONS = [
+    {
+        "name": "get_category_totals",
+        "description": "Total amount and number of transactions per category in a date range, largest first.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                **_DATE_PARAMS,
+                "type": {"type": "string", "enum": ["debit", "credit"], "description": "debit for spending (default), credit for income."}
+            }
+        }
+    },
+    {
+        "name": "get_date_range_totals",
+        "description": "Total income (credit), spending (debit) and net for a date range, optionally for a single category.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                **_DATE_PARAMS,
+                "category": {"type": "string", "description": "Category name, e.g. Dining. Omit for all categories."}
+            }
+        }
+    },
+    {
+        "name": "get_top_merchants",
+        "description": "Merchants the user spent the most at in a date range.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                **_DATE_PARAMS,
+                "limit": {"type": "integer", "description": "Number of merchants to return (default 10)."}
+            }
+        }
+    },
+    {
+        "name": "search_transactions",
+        "description": "Transactions whose description contains the given text, newest first. Use an empty query for the latest transactions.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "query": {"type": "string", "description": "Text to look for in the description, e.g. 'uber'."},
+                **_DATE_PARAMS,
+                "limit": {"type": "integer", "description": "Number of transactions to return (default 20)."}
+            },
+            "required": ["query"]
+        }
+    }
+]
+
+CHAT_TOOLS = [{"function_declarations": CHAT_TOOL_DECLARATIONS}]
+
+
+class ChatToolService:
+    """Executes chat tool calls against the user's transactions"""
+
+    @staticmethod
+    def _parse_day(value: Optional[str]) -> Optional[datetime]:
+        if not value:
+            return None
+        return datetime.strptime(str(value)[:10], "%Y-%m-%d")
+
+    @staticmethod
+    def _date_range(args: Dict[str, Any], default_to_month: bool = True) -> Tuple[Optional[datetime], Optional[datetime]]:
+        """Inclusive YYYY-MM-DD bounds; the end date covers the whole day"""
+        now = datetime.now()
+        start = ChatToolService._parse_day(args.get("start_date"))
+        end = ChatToolService._parse_day(args.get("end_date"))
+        if default_to_month:
+            start = start or now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+            end = end or now.replace(hour=0, minute=0, second=0, microsecond=0)
+        if end:
+            end = end + timedelta(days=1) - timedelta(microseconds=1)
+        return start, end
+
+    @staticmethod
+    def _limit(value: Any, default: int) -> int:
+        try:
+            return max(1, min(int(value), MAX_TOOL_LIMIT))
+        except (TypeError, ValueError):
+            return default
+
+    @staticmethod
+    def _period(start: Optional[datetime], end: Optional[datetime]) -> Dict[str, Optional[str]]:
+        return {
+            "start_date": start.strftime("%Y-%m-%d") if start else None,
+            "end_date": end.strftime("%Y-%m-%d") if end else None
+        }
+
+    @staticmethod
+    async def get_category_totals(user_id: str, args: Dict[str, Any]) -> Dict[str, Any]:
+        start, end = ChatToolService._date_range(args)
+        txn_type = args.get("type") if args.get("type") in ("debit", "credit") else "debit"
+        rows = await aggregate_transactions_query(build_category_pipeline(user_id, start, end, txn_type))
+        return {
+            **ChatToolService._period(start, end),
+            "type": txn_type,
+            "categories": [{"category": r["_id"], "total": round(r["total"], 2), "count": r["count"]} for r in rows]
+        }
+
+    @staticmethod
+    async def get_date_range_totals(user_id: str, args: Dict[str, Any]) -> Dict[str, Any]:
+        start, end = ChatToolService._date_range(args)
+        category = args.get("category") or None
+        rows = await aggregate_transactions_query(build_date_range_totals_pipeline(user_id, start, end, category))
+        totals = {"credit": 0.0, "debit": 0.0}
+        count = 0
+        for r in rows:
+            key = str(r["_id"]).lower()
+            if key in totals:
+                totals[key] = round(r["total"], 2)
+                count += r["count"]
+        return {
+            **ChatToolService._period(start, end),
+            "category": category,
+            "total_credits": totals["credit"],
+            "total_debits": totals["debit"],
+            "net": round(totals["credit"] - totals["debit"], 2),
+            "count": count
+        }
+
+    @staticmethod
+    async def get_top_merchants(user_id: str, args: Dict[str, Any]) -> Dict[str, Any]:
+        start, end = ChatToolService._date_range(args)
+        limit = ChatToolService._limit(args.get("limit"), 10)
+        rows = await aggregate_transactions_query(build_merchant_totals_pipeline(user_id, start, end))
+
+        # Group description variants ("SWIGGY 1234", "Swiggy order") by merchant
+        merchants = defaultdict(lambda: {"total": 0.0, "count": 0})
+        for r in rows:
+            name = CategoryService.normalize_merchant(r["_id"]) or (r["_id"] or "unknown").strip().lower()
+            merchants[name]["total"] += r["total"]
+            merchants[name]["count"] += r["count"]
+
+        top = sorted(merchants.items(), key=lambda item: item[1]["total"], reverse=True)[:limit]
+        return {
+            **ChatToolService._period(start, end),
+            "merchants": [{"merchant": m, "total": round(v["total"], 2), "count": v["count"]} for m, v in top]
+        }
+
+    @staticmethod
+    async def search_transactions(user_id: str, args: Dict[str, Any]) -> Dict[str, Any]:
+        start, end = ChatToolService._date_range(args, default_to_month=False)
+        limit = ChatToolService._limit(args.get("limit"), 20)
+        query = str(args.get("query") or "").strip()
+        rows = await aggregate_transactions_query(build_search_pipeline(user_id, query, start, end, limit))
+        for r in rows:
+            if isinstance(r.get("date"), datetime):
+                r["date"] = r["date"].strftime("%Y-%m-%d")
+        return {**ChatToolService._period(start, end), "query": query, "transactions": rows}
+
+    @staticmethod
+    async def run_tool(user_id: str, name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Execute a tool call, cached per user and data version. Bad arguments
+        are returned to the model as an error instead of raising.
+        """
+        handler = CHAT_TOOL_HANDLERS.get(name)
+        if not handler:
+            return {"error": f"Unknown tool '{name}'"}
+
+        version = await cache_service.get_user_version(user_id)
+        # Relative defaults (current month, today) resolve differently per day
+        args_key = json.dumps({**args, "_day": datetime.now().strftime("%Y-%m-%d")}, sort_keys=True, default=str)
+        key = f"user:{user_id}:chat_tool:{version}:{name}:{hashlib.md5(args_key.encode()).hexdigest()}"
+        cached_result = cache_service.get(key)
+        if cached_result is not None:
+            logger.debug(f"⚡ Chat tool HIT {name} for user {user_id}")
+            return cached_result
+
+        try:
+            result = await handler(user_id, args)
+        except ValueError as e:
+            return {"error": f"Invalid arguments: {e}"}
+
+        cache_service.set(key, result, CHAT_TOOL_TTL_SECONDS)
+        logger.info(f"🔧 Chat tool {name} for user {user_id}")
+        return result
+
+
+CHAT_TOOL_HANDLERS = {
+    "get_category_totals": ChatToolService.get_category_totals,
+    "get_date_range_totals": ChatToolService.get_date_range_totals,
+    "get_top_merchants": ChatToolService.get_top_merchants,
+    "search_transactions": ChatToolService.search_transactions,
+}
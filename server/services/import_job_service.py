@@ -0,0 +1,327 @@
+"""
+Import job service - Background statement analysis and import with progress
+
+Jobs live in the `import_jobs` collection and are processed by an in-process
+pool of worker tasks. A worker claims a job by taking a time-limited lease;
+a job whose lease expires (e.g. the worker process restarted) is picked up
+again, which is safe because analysis is cached and imports are idempotent.
+Every write is fenced by the lease owner; a worker whose write no longer
+matches has lost the job to another worker and abandons it.
+
+Stages: queued -> extracting -> analysing -> ready_for_review
+        -> importing -> done   (or failed)
+"""
+import asyncio
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from tempfile import SpooledTemporaryFile
+from typing import Dict, Any, Optional, List, BinaryIO
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+from pymongo import ReturnDocument
+from database.database import db
+from models.payloads import TransactionItem
+from services.ai_service import analyze_statement
+from services.import_service import ImportService
+from utils.logger import logger
+from utils.metrics import metrics, operations_in_progress
+
+IMPORT_JOB_WORKERS = int(os.getenv("IMPORT_JOB_WORKERS", "2"))
+IMPORT_JOB_LEASE_SECONDS = int(os.getenv("IMPORT_JOB_LEASE_SECONDS", "120"))
+IMPORT_JOB_POLL_SECONDS = float(os.getenv("IMPORT_JOB_POLL_SECONDS", "5"))
+IMPORT_JOB_MAX_ATTEMPTS = 3
+IMPORT_JOB_RETENTION_DAYS = 7
+UPLOAD_SPOOL_BYTES = 1024 * 1024
+
+FINAL_STAGES = {"ready_for_review", "done", "failed"}
+
+import_jobs_gauge = metrics.gauge("import_jobs", "Import jobs waiting for or held by a worker, by status", ("status",))
+
+_upload_bucket: Optional[AsyncIOMotorGridFSBucket] = None
+
+
+def upload_bucket() -> AsyncIOMotorGridFSBucket:
+    """GridFS bucket holding uploads until their analysis job finishes"""
+    global _upload_bucket
+    if _upload_bucket is None:
+        _upload_bucket = AsyncIOMotorGridFSBucket(db, bucket_name="import_uploads")
+    return _upload_bucket
+
+
+class LeaseLost(Exception):
+    """The job's lease expired and another worker claimed it"""
+
+
+class ImportJobService:
+    """Import job persistence"""
+
+    @staticmethod
+    def _format(job: Dict[str, Any], include_transactions: bool = True) -> Dict[str, Any]:
+        formatted = {
+            "id": str(job["_id"]),
+            "filename": job.get("filename"),
+            "kind": job.get("kind"),
+            "stage": job.get("stage"),
+            "progress": job.get("progress", {}),
+            "result": job.get("result"),
+            "error": job.get("error"),
+            "attempts": job.get("attempts", 0),
+            "created_at": job.get("created_at"),
+            "updated_at": job.get("updated_at"),
+        }
+        if include_transactions and job.get("stage") == "ready_for_review":
+            formatted["transactions"] = job.get("transactions", [])
+        return formatted
+
+    @staticmethod
+    async def create_analysis_job(user_id: str, file: BinaryIO, filename: str) -> Dict[str, Any]:
+        """Persist the upload in GridFS and queue it for analysis"""
+        file.seek(0)
+        file_id = await upload_bucket().upload_from_stream(filename, file, metadata={"user_id": ObjectId(user_id)})
+        now = datetime.now()
+        job = {
+            "user_id": ObjectId(user_id),
+            "filename": filename,
+            "file_id": file_id,
+            "kind": "analyze",
+            "status": "queued",
+            "stage": "queued",
+            "progress": {},
+            "attempts": 0,
+            "created_at": now,
+            "updated_at": now
+        }
+        result = await db.import_jobs.insert_one(job)
+        job["_id"] = result.inserted_id
+        import_job_worker.notify()
+        return ImportJobService._format(job)
+
+    @staticmethod
+    async def queue_import(user_id: str, job_id: str, transactions: List[TransactionItem]) -> Optional[Dict[str, Any]]:
+        """Queue reviewed transactions of a job that is ready for review"""
+        job = await db.import_jobs.find_one_and_update(
+            {"_id": ObjectId(job_id), "user_id": ObjectId(user_id), "stage": "ready_for_review"},
+            {"$set": {
+                "kind": "import",
+                "status": "queued",
+                "stage": "importing",
+                "transactions": [t.model_dump() for t in transactions],
+                "progress": {"rows_total": len(transactions), "rows_done": 0},
+                "attempts": 0,
+                "updated_at": datetime.now()
+            }, "$unset": {"expires_at": ""}},
+            return_document=ReturnDocument.AFTER
+        )
+        if job:
+            import_job_worker.notify()
+            return ImportJobService._format(job, include_transactions=False)
+        return None
+
+    @staticmethod
+    async def get_job(user_id: str, job_id: str, include_transactions: bool = True) -> Optional[Dict[str, Any]]:
+        projection = None if include_transactions else {"transactions": 0}
+        job = await db.import_jobs.find_one({"_id": ObjectId(job_id), "user_id": ObjectId(user_id)}, projection)
+        return ImportJobService._format(job, include_transactions) if job else None
+
+    @staticmethod
+    async def list_jobs(user_id: str, limit: int = 20) -> List[Dict[str, Any]]:
+        cursor = db.import_jobs.find({"user_id": ObjectId(user_id)}, {"transactions": 0}).sort("created_at", -1).limit(limit)
+        return [ImportJobService._format(job, False) for job in await cursor.to_list(length=limit)]
+
+    @staticmethod
+    async def queue_depth() -> int:
+        return await db.import_jobs.count_documents({"status": "queued"})
+
+    @staticmethod
+    async def running_count() -> int:
+        return await db.import_jobs.count_documents({"status": "running"})
+
+
+class ImportJobWorker:
+    """Bounded pool of asyncio tasks processing import jobs"""
+
+    def __init__(self, concurrency: int = IMPORT_JOB_WORKERS):
+        self.concurrency = concurrency
+        self.worker_id = self._new_worker_id()
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+
+    @staticmethod
+    def _new_worker_id() -> str:
+        # The pid alone is not enough: the global instance is created before serve.py forks
+        return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:12]}"
+
+    def notify(self):
+        """Wake idle workers after a job was queued in this process"""
+        self._wakeup.set()
+
+    async def start(self):
+        self._stopping = False
+        # Leases are fenced by this id, so every process (and restart) needs its own
+        self.worker_id = self._new_worker_id()
+        self._tasks = [asyncio.create_task(self._run(i)) for i in range(self.concurrency)]
+        logger.info(f"🧵 Started {self.concurrency} import job workers ({self.worker_id})")
+
+    async def stop(self):
+        self._stopping = True
+        self._wakeup.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run(self, index: int):
+        while not self._stopping:
+            try:
+                job = await self._claim()
+            except Exception as e:
+                logger.error(f"❌ Import worker {index} failed to claim a job: {str(e)}")
+                job = None
+
+            if not job:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=IMPORT_JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._process(job)
+
+    async def _claim(self) -> Optional[Dict[str, Any]]:
+        """Take the oldest queued job, or one whose previous lease expired"""
+        now = datetime.now()
+        return await db.import_jobs.find_one_and_update(
+            {"$or": [
+                {"status": "queued"},
+                {"status": "running", "lease_expires": {"$lt": now}}
+            ]},
+            {
+                "$set": {
+                    "status": "running",
+                    "lease_owner": self.worker_id,
+                    "lease_expires": now + timedelta(seconds=IMPORT_JOB_LEASE_SECONDS),
+                    "updated_at": now
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _update(self, job: Dict[str, Any], fields: Dict[str, Any]) -> bool:
+        """Write to the job and extend the lease; False once another worker has taken it over"""
+        now = datetime.now()
+        fields["updated_at"] = now
+        fields["lease_expires"] = now + timedelta(seconds=IMPORT_JOB_LEASE_SECONDS)
+        result = await db.import_jobs.update_one({"_id": job["_id"], "lease_owner": self.worker_id}, {"$set": fields})
+        return result.matched_count > 0
+
+    async def _update_owned(self, job: Dict[str, Any], fields: Dict[str, Any]):
+        if not await self._update(job, fields):
+            raise LeaseLost(f"Import job {job['_id']} was reclaimed by another worker")
+
+    async def _heartbeat(self, job: Dict[str, Any], work: asyncio.Task):
+        """Keep the lease while `work` runs; cancel it once the lease is lost"""
+        while True:
+            await asyncio.sleep(IMPORT_JOB_LEASE_SECONDS / 3)
+            try:
+                owned = await self._update(job, {})
+            except Exception as e:
+                # Retried on the next beat, well before the lease runs out
+                logger.warning(f"⚠️ Lease renewal for import job {job['_id']} failed: {str(e)}")
+                continue
+            if not owned:
+                logger.warning(f"⚠️ Lost the lease on import job {job['_id']}, abandoning it")
+                work.cancel()
+                return
+
+    async def _process(self, job: Dict[str, Any]):
+        try:
+            if job.get("attempts", 0) > IMPORT_JOB_MAX_ATTEMPTS:
+                await self._finish(job, "failed", {"error": "Job failed after repeated attempts"})
+                return
+
+            logger.info(f"🧵 Processing import job {job['_id']} ({job['kind']}, attempt {job['attempts']})")
+            work = asyncio.create_task(self._work(job))
+            heartbeat = asyncio.create_task(self._heartbeat(job, work))
+            try:
+                await work
+            except asyncio.CancelledError:
+                # Cancelled by the heartbeat: the job belongs to another worker now
+                if not heartbeat.done() or heartbeat.cancelled():
+                    raise
+            finally:
+                heartbeat.cancel()
+        except LeaseLost as e:
+            logger.warning(f"⚠️ {str(e)}, abandoning it")
+
+    async def _work(self, job: Dict[str, Any]):
+        try:
+            with operations_in_progress.track(operation=f"import_job_{job['kind']}"):
+                if job["kind"] == "analyze":
+                    await self._analyze(job)
+                else:
+                    await self._import(job)
+        except LeaseLost:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Import job {job['_id']} failed: {str(e)}")
+            await self._finish(job, "failed", {"error": str(e)})
+
+    async def _analyze(self, job: Dict[str, Any]):
+        async def on_progress(stage: str, **details):
+            await self._update_owned(job, {"stage": stage, "progress": details})
+
+        with SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES) as spool:
+            await upload_bucket().download_to_stream(job["file_id"], spool)
+            spool.seek(0)
+            transactions = await analyze_statement(spool, job["filename"], str(job["user_id"]), on_progress=on_progress)
+
+        await self._finish(job, "ready_for_review", {
+            "status": "waiting",
+            "transactions": transactions,
+            "progress": {"rows": len(transactions)}
+        })
+
+    async def _import(self, job: Dict[str, Any]):
+        items = [TransactionItem(**t) for t in job.get("transactions", [])]
+
+        async def on_progress(stage: str, **details):
+            await self._update_owned(job, {"stage": stage, "progress": {"rows_total": len(items), **details}})
+
+        result = await ImportService.confirm_transactions(str(job["user_id"]), items, on_progress=on_progress)
+        await self._finish(job, "done", {"result": result, "transactions": [], "progress": {"rows_total": len(items), "rows_done": len(items)}})
+
+    async def _finish(self, job: Dict[str, Any], stage: str, fields: Dict[str, Any]):
+        fields.setdefault("status", "done" if stage == "done" else ("failed" if stage == "failed" else "waiting"))
+        fields["stage"] = stage
+        # Abandoned reviews and finished jobs are removed by the TTL index
+        fields["expires_at"] = datetime.now() + timedelta(days=IMPORT_JOB_RETENTION_DAYS)
+        await self._update_owned(job, fields)
+        if stage != "failed" or job["kind"] == "analyze":
+            # The upload is no longer needed once it has been analysed (or analysis gave up)
+            await self._delete_upload(job)
+        logger.info(f"✅ Import job {job['_id']} -> {stage}")
+
+    async def _delete_upload(self, job: Dict[str, Any]):
+        if job.get("file_id"):
+            try:
+                await upload_bucket().delete(job["file_id"])
+            except Exception:
+                pass  # already removed by a previous attempt
+
+
+# Global instance
+import_job_worker = ImportJobWorker()
+
+
+async def _collect_import_job_metrics():
+    import_jobs_gauge.set(await ImportJobService.queue_depth(), status="queued")
+    import_jobs_gauge.set(await ImportJobService.running_count(), status="running")
+
+
+metrics.add_collector(_collect_import_job_metrics)
@@ -0,0 +1,147 @@
+"""
+Import service - Idempotent bulk import of reviewed statement transactions
+"""
+import hashlib
+import os
+import re
+from collections import Counter
+from datetime import datetime
+from bson import ObjectId
+from typing import List, Dict, Any, Iterable, Optional, Callable, Awaitable
+from database.queries.transaction_queries import bulk_insert_transactions_query
+from services.cache_service import cache_service
+from services.category_service import CategoryService
+from utils.logger import logger
+
+ProgressCallback = Callable[..., Awaitable[None]]
+
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+
+
+class ImportService:
+    """Bulk import engine used by /api/upload/confirm"""
+
+    @staticmethod
+    def normalize_description(description: Optional[str]) -> str:
+        return re.sub(r"\s+", " ", (description or "")).strip().lower()
+
+    @staticmethod
+    def fingerprint(user_id: str, date: datetime, amount: float, type: str, description: str, occurrence: int = 0) -> str:
+        """
+        Stable identity of an imported row. `occurrence` numbers identical rows
+        within one import so genuine repeats (two coffees on the same day) are
+        kept, while re-importing the same statement maps onto the same keys.
+        """
+        raw = "|".join([
+            str(user_id),
+            date.strftime("%Y-%m-%d"),
+            f"{abs(amount):.2f}",
+            type.lower(),
+            ImportService.normalize_description(description),
+            str(occurrence)
+        ])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _parse_date(value: str) -> datetime:
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return datetime.strptime(value, "%Y-%m-%d")
+
+    @staticmethod
+    async def import_transactions(
+        user_id: str,
+        items: Iterable[Any],
+        chunk_size: int = IMPORT_CHUNK_SIZE,
+        on_progress: Optional[ProgressCallback] = None,
+        inserted_rows: Optional[List[int]] = None
+    ) -> Dict[str, Any]:
+        """
+        Insert reviewed rows (TransactionItem-like objects) in unordered chunks.
+        Returns inserted/skipped/failed counts; rows that already exist are skipped.
+        `on_progress("importing", rows_done=..., ...)` is awaited after each chunk.
+        The position of every inserted row is appended to `inserted_rows`.
+        """
+        owner = ObjectId(user_id)
+        now = datetime.now()
+        occurrences = Counter()
+        summary = {"inserted": 0, "skipped": 0, "failed": 0, "errors": []}
+        chunk: List[Dict[str, Any]] = []
+        chunk_rows: List[int] = []
+
+        async def flush():
+            result = await bulk_insert_transactions_query(chunk)
+            summary["inserted"] += result["inserted"]
+            if inserted_rows is not None:
+                inserted_rows.extend(chunk_rows[index] for index in result["inserted_indexes"])
+            summary["skipped"] += result["skipped"]
+            summary["failed"] += result["failed"]
+            summary["errors"].extend(
+                {"row": chunk_rows[err["index"]], "error": err["error"]} for err in result["errors"]
+            )
+            rows_done = chunk_rows[-1] + 1
+            chunk.clear()
+            chunk_rows.clear()
+            if on_progress:
+                await on_progress("importing", rows_done=rows_done, inserted=summary["inserted"], skipped=summary["skipped"])
+
+        for row, item in enumerate(items):
+            try:
+                parsed_date = ImportService._parse_date(item.date)
+            except ValueError:
+                summary["failed"] += 1
+                summary["errors"].append({"row": row, "error": f"Invalid date '{item.date}'"})
+                continue
+
+            description = item.description.strip()
+            txn_type = item.type.lower()
+            base = (parsed_date.date(), round(abs(item.amount), 2), txn_type, ImportService.normalize_description(description))
+            occurrence = occurrences[base]
+            occurrences[base] += 1
+
+            chunk.append({
+                "user_id": owner,
+                "amount": abs(item.amount),
+                "type": txn_type,
+                "category": item.category.strip(),
+                "description": description,
+                "payment_method": "Other",
+                "date": parsed_date,
+                "fingerprint": ImportService.fingerprint(user_id, parsed_date, item.amount, txn_type, description, occurrence),
+                "created_at": now,
+                "updated_at": now
+            })
+            chunk_rows.append(row)
+
+            if len(chunk) >= chunk_size:
+                await flush()
+
+        if chunk:
+            await flush()
+
+        # Keep the response bounded on very large imports
+        summary["errors"] = summary["errors"][:100]
+        return summary
+
+    @staticmethod
+    async def confirm_transactions(user_id: str, items: List[Any], on_progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+        """Import reviewed rows, then invalidate the user's cache and learn their categories"""
+        inserted_rows: List[int] = []
+        result = await ImportService.import_transactions(user_id, items, on_progress=on_progress, inserted_rows=inserted_rows)
+        logger.info(
+            f"✅ Imported transactions for user {user_id}: {result['inserted']} inserted, "
+            f"{result['skipped']} duplicates skipped, {result['failed']} failed"
+        )
+
+        await cache_service.invalidate_user_cache(user_id)
+
+        # Learn the user's (possibly edited) categories for future uploads; rows
+        # skipped as duplicates were learned when they were first imported
+        try:
+            if inserted_rows:
+                await CategoryService.learn(user_id, [items[row].model_dump() for row in inserted_rows])
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to update merchant memo: {e}")
+
+        return result
@@ -0,0 +1,57 @@
+"""
+Content-addressed cache of bank statement analysis results
+"""
+import hashlib
+import os
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Optional, Union, BinaryIO
+from database.database import db
+from utils.logger import logger
+
+STATEMENT_CACHE_TTL_SECONDS = int(os.getenv("STATEMENT_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+STATEMENT_CACHE_MAX_ENTRIES = int(os.getenv("STATEMENT_CACHE_MAX_ENTRIES", "1000"))
+STATEMENT_CACHE_MAX_TRANSACTIONS = 20000  # keeps each entry well under Mongo's 16MB document limit
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def statement_cache_key(file_content: Union[bytes, BinaryIO], filename: str, version: str) -> str:
+    """SHA-256 of the file bytes, scoped by file type and the prompt/model version"""
+    extension = os.path.splitext(filename.lower())[1]
+    if isinstance(file_content, (bytes, bytearray)):
+        digest = hashlib.sha256(file_content).hexdigest()
+    else:
+        sha = hashlib.sha256()
+        file_content.seek(0)
+        for block in iter(lambda: file_content.read(HASH_CHUNK_BYTES), b""):
+            sha.update(block)
+        file_content.seek(0)
+        digest = sha.hexdigest()
+    return f"{version}:{extension}:{digest}"
+
+
+async def get_cached_analysis(key: str) -> Optional[List[Dict[str, Any]]]:
+    """Return cached transactions, ignoring entries the TTL monitor hasn't removed yet"""
+    doc = await db.statement_analysis_cache.find_one({
+        "_id": key,
+        "created_at": {"$gt": datetime.now(timezone.utc) - timedelta(seconds=STATEMENT_CACHE_TTL_SECONDS)}
+    })
+    return doc["transactions"] if doc else None
+
+
+async def set_cached_analysis(key: str, transactions: List[Dict[str, Any]]):
+    """Store analysis result and evict the oldest entries beyond the size bound"""
+    if len(transactions) > STATEMENT_CACHE_MAX_TRANSACTIONS:
+        return
+
+    # UTC: the TTL index compares created_at with the server's UTC clock
+    await db.statement_analysis_cache.replace_one(
+        {"_id": key},
+        {"transactions": transactions, "created_at": datetime.now(timezone.utc)},
+        upsert=True
+    )
+
+    excess = await db.statement_analysis_cache.estimated_document_count() - STATEMENT_CACHE_MAX_ENTRIES
+    if excess > 0:
+        oldest = await db.statement_analysis_cache.find({}, {"_id": 1}).sort("created_at", 1).limit(excess).to_list(length=excess)
+        await db.statement_analysis_cache.delete_many({"_id": {"$in": [d["_id"] for d in oldest]}})
+        logger.info(f"🧹 Evicted {len(oldest)} statement analysis cache entries")
@@ -21,10 +21,14 @@ from database.queries.transaction_queries import (
     count_transactions_query,
     get_all_transactions_query,
     get_filtered_totals_query,
-    get_total_balance_query
+    get_total_balance_query,
+    bulk_write_transactions_query,
+    get_existing_transaction_ids_query
 )
 
-from typing import List, Dict, Any
+from pydantic import ValidationError
+from pymongo import InsertOne, UpdateOne, DeleteOne
+from typing import List, Dict, Any, Optional
 import csv
 import io
 import math
@@ -113,6 +117,101 @@ class TransactionService:
         
         return {"message": "Transaction deleted successfully"}
     
+    @staticmethod
+    def _validation_message(error: ValidationError) -> str:
+        return "; ".join(
+            f"{'.'.join(str(loc) for loc in e['loc']) or 'item'}: {e['msg']}" for e in error.errors()
+        )
+
+    @staticmethod
+    def _object_id(value: Any) -> Optional[ObjectId]:
+        return ObjectId(value) if isinstance(value, str) and ObjectId.is_valid(value) else None
+
+    @staticmethod
+    async def bulk_mutate(
+        user_id: str,
+        creates: Optional[List[Dict[str, Any]]] = None,
+        updates: Optional[List[Dict[str, Any]]] = None,
+        deletes: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Validate each item, then apply every valid one in a single unordered
+        bulk_write. Returns one result per input item, in input order, with
+        status created / updated / deleted / invalid / not_found / failed.
+        """
+        owner = ObjectId(user_id)
+        now = datetime.now()
+        results: List[Dict[str, Any]] = []
+        operations = []
+        op_results: List[Dict[str, Any]] = []  # result entry for each queued operation
+
+        def add(result: Dict[str, Any], operation: Any = None):
+            results.append(result)
+            if operation is not None:
+                operations.append(operation)
+                op_results.append(result)
+
+        for index, item in enumerate(creates or []):
+            try:
+                payload = TransactionCreate.model_validate(item)
+            except ValidationError as e:
+                add({"index": index, "status": "invalid", "error": TransactionService._validation_message(e)})
+                continue
+            doc = {"_id": ObjectId(), "user_id": owner, **payload.model_dump(), "created_at": now, "updated_at": now}
+            add({"index": index, "id": str(doc["_id"]), "status": "created"}, InsertOne(doc))
+
+        # Resolve ownership of every referenced id with one query
+        update_ids = [TransactionService._object_id((item or {}).get("id")) if isinstance(item, dict) else None for item in (updates or [])]
+        delete_ids = [TransactionService._object_id(value) for value in (deletes or [])]
+        referenced = [oid for oid in update_ids + delete_ids if oid]
+        existing = await get_existing_transaction_ids_query(user_id, referenced) if referenced else set()
+
+        for index, (item, oid) in enumerate(zip(updates or [], update_ids)):
+            if oid is None:
+                add({"index": index, "status": "invalid", "error": "id: a valid transaction id is required"})
+                continue
+            fields = {k: v for k, v in item.items() if k != "id"}
+            try:
+                update_dict = TransactionUpdate.model_validate(fields).model_dump(exclude_unset=True)
+            except ValidationError as e:
+                add({"index": index, "id": str(oid), "status": "invalid", "error": TransactionService._validation_message(e)})
+                continue
+            if not update_dict:
+                add({"index": index, "id": str(oid), "status": "invalid", "error": "No fields to update"})
+                continue
+            if oid not in existing:
+                add({"index": index, "id": str(oid), "status": "not_found", "error": "Transaction not found"})
+                continue
+            update_dict["updated_at"] = now
+            add(
+                {"index": index, "id": str(oid), "status": "updated"},
+                UpdateOne({"_id": oid, "user_id": owner}, {"$set": update_dict})
+            )
+
+        seen_deletes = set()
+        for index, (value, oid) in enumerate(zip(deletes or [], delete_ids)):
+            if oid is None:
+                add({"index": index, "id": value, "status": "invalid", "error": "Invalid transaction id"})
+            elif oid in seen_deletes:
+                add({"index": index, "id": str(oid), "status": "invalid", "error": "Duplicate id in batch"})
+            elif oid not in existing:
+                add({"index": index, "id": str(oid), "status": "not_found", "error": "Transaction not found"})
+            else:
+                seen_deletes.add(oid)
+                add({"index": index, "id": str(oid), "status": "deleted"}, DeleteOne({"_id": oid, "user_id": owner}))
+
+        if operations:
+            outcome = await bulk_write_transactions_query(operations)
+            for op_index, message in outcome["errors"].items():
+                op_results[op_index]["status"] = "failed"
+                op_results[op_index]["error"] = message
+
+        summary = {}
+        for result in results:
+            summary[result["status"]] = summary.get(result["status"], 0) + 1
+
+        return {"results": results, "summary": summary}
+
     @staticmethod
     async def list_transactions(
         user_id: str,
@@ -0,0 +1,33 @@
+from scripts.benchmark import build_scenarios, compare, percentile, summarize
+
+
+def test_summary_percentiles_and_throughput():
+    latencies = [i / 1000 for i in range(1, 101)]  # 1..100 ms
+    summary = summarize(latencies, errors=2, wall_seconds=2.0)
+    assert summary["requests"] == 102
+    assert summary["throughput_rps"] == 50.0
+    assert summary["p50_ms"] == 50.0
+    assert summary["p99_ms"] == 99.0
+    assert percentile([], 99) is None
+
+
+def test_compare_flags_p99_and_throughput_regressions():
+    baseline = [
+        {"scale": "1k", "scenario": "kpis", "p99_ms": 100.0, "throughput_rps": 50.0},
+        {"scale": "1k", "scenario": "export_pdf", "p99_ms": 900.0, "throughput_rps": 2.0},
+    ]
+    results = [
+        {"scale": "1k", "scenario": "kpis", "p99_ms": 110.0, "throughput_rps": 48.0},
+        {"scale": "1k", "scenario": "export_pdf", "p99_ms": 1500.0, "throughput_rps": 1.2},
+        {"scale": "1k", "scenario": "new_scenario", "p99_ms": 5.0, "throughput_rps": 10.0},
+    ]
+    lines, regressions = compare(results, baseline, max_regression=0.2)
+    assert regressions == ["1k/export_pdf"]
+    assert len(lines) == 2
+
+
+def test_scenarios_cover_every_filter_and_the_deepest_page():
+    names = {s["name"] for s in build_scenarios(100_000, "run")}
+    assert {"dashboard_kpis_custom", "dashboard_charts_6months", "export_pdf", "upload_confirm"} <= names
+    deep = next(s for s in build_scenarios(100_000, "run") if s["name"] == "transactions_deep_page")
+    assert deep["params"]["page"] == 2000
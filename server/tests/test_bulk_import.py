@@ -0,0 +1,111 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from pymongo.errors import BulkWriteError
+
+import database.queries.transaction_queries as transaction_queries
+import services.import_service as import_service
+from models.payloads import TransactionItem
+from services.import_service import ImportService
+
+USER_ID = "65a000000000000000000001"
+
+
+class FakeTransactions:
+    """In-memory stand-in for the transactions collection with the (user_id, fingerprint) unique index."""
+
+    def __init__(self):
+        self.keys = set()
+        self.chunk_sizes = []
+
+    async def bulk_insert(self, docs):
+        self.chunk_sizes.append(len(docs))
+        inserted, skipped = [], 0
+        for index, doc in enumerate(docs):
+            key = (doc["user_id"], doc["fingerprint"])
+            if key in self.keys:
+                skipped += 1
+            else:
+                self.keys.add(key)
+                inserted.append(index)
+        return {"inserted": len(inserted), "inserted_indexes": inserted, "skipped": skipped, "failed": 0, "errors": []}
+
+
+def item(date, description, amount, type="debit"):
+    return TransactionItem(date=date, description=description, amount=amount, type=type, category="Other")
+
+
+def test_reimport_is_idempotent_but_keeps_genuine_repeats(monkeypatch):
+    store = FakeTransactions()
+    monkeypatch.setattr(import_service, "bulk_insert_transactions_query", store.bulk_insert)
+    statement = [
+        item("2024-05-01", "Coffee", 3.5),
+        item("2024-05-01", "  COFFEE ", 3.5),
+        item("2024-05-02", "Salary", 5000, "credit"),
+        item("not-a-date", "Broken", 1),
+    ]
+
+    first = asyncio.run(ImportService.import_transactions(USER_ID, statement))
+    overlap = asyncio.run(ImportService.import_transactions(USER_ID, statement[1:3] + [item("2024-05-03", "Rent", 900)]))
+
+    assert (first["inserted"], first["skipped"], first["failed"]) == (3, 0, 1)
+    assert first["errors"] == [{"row": 3, "error": "Invalid date 'not-a-date'"}]
+    assert (overlap["inserted"], overlap["skipped"]) == (1, 2)
+
+
+def test_large_import_is_written_in_fixed_size_chunks(monkeypatch):
+    store = FakeTransactions()
+    monkeypatch.setattr(import_service, "bulk_insert_transactions_query", store.bulk_insert)
+    rows = [item(f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}", f"Merchant {i}", i + 1) for i in range(50_000)]
+
+    started = time.perf_counter()
+    result = asyncio.run(ImportService.import_transactions(USER_ID, rows, chunk_size=1000))
+
+    assert result["inserted"] == 50_000
+    assert store.chunk_sizes == [1000] * 50
+    assert time.perf_counter() - started < 10
+
+
+def test_only_inserted_rows_are_learned_into_the_merchant_memo(monkeypatch):
+    store = FakeTransactions()
+    learned = []
+
+    async def fake_learn(user_id, transactions):
+        learned.append([t["description"] for t in transactions])
+
+    monkeypatch.setattr(import_service, "bulk_insert_transactions_query", store.bulk_insert)
+    async def fake_invalidate(user_id):
+        return 0
+
+    monkeypatch.setattr(import_service.cache_service, "invalidate_user_cache", fake_invalidate)
+    monkeypatch.setattr(import_service.CategoryService, "learn", staticmethod(fake_learn))
+
+    asyncio.run(ImportService.confirm_transactions(USER_ID, [item("2024-05-01", "Coffee", 3.5)]))
+    result = asyncio.run(ImportService.confirm_transactions(USER_ID, [
+        item("2024-05-01", "Coffee", 3.5),
+        item("not-a-date", "Broken", 1),
+        item("2024-05-03", "Rent", 900),
+    ]))
+    asyncio.run(ImportService.confirm_transactions(USER_ID, [item("2024-05-03", "Rent", 900)]))
+
+    assert (result["inserted"], result["skipped"], result["failed"]) == (1, 1, 1)
+    assert learned == [["Coffee"], ["Rent"]]
+
+
+def test_bulk_insert_reports_which_rows_were_written(monkeypatch):
+    class FailingCollection:
+        async def bulk_write(self, operations, ordered=True):
+            assert ordered is False
+            raise BulkWriteError({"nInserted": 2, "writeErrors": [
+                {"index": 1, "code": 11000, "errmsg": "E11000 duplicate key"},
+                {"index": 3, "code": 121, "errmsg": "Document failed validation"},
+            ]})
+
+    monkeypatch.setattr(transaction_queries, "db", SimpleNamespace(transactions=FailingCollection()))
+
+    result = asyncio.run(transaction_queries.bulk_insert_transactions_query([{"n": i} for i in range(4)]))
+
+    assert result["inserted_indexes"] == [0, 2]
+    assert (result["inserted"], result["skipped"], result["failed"]) == (2, 1, 1)
+    assert result["errors"] == [{"index": 3, "error": "Document failed validation"}]
@@ -0,0 +1,143 @@
+import asyncio
+
+from bson import ObjectId
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pymongo import DeleteOne, InsertOne, UpdateOne
+
+import routes.transaction_routes as transaction_routes
+import services.transaction_service as transaction_service
+from routes.transaction_routes import transaction_router
+from services.transaction_service import TransactionService
+from utils.auth import get_current_user
+
+USER_ID = "65a000000000000000000005"
+OTHER_USER_ID = "65a000000000000000000006"
+
+VALID = {"amount": 250, "type": "debit", "category": "Food", "payment_method": "UPI", "date": "2024-03-02T00:00:00"}
+
+
+class FakeTransactions:
+    """Transaction ownership plus a record of every bulk_write"""
+
+    def __init__(self, owned, write_errors=None):
+        self.owned = owned  # _id -> user_id
+        self.write_errors = write_errors or {}
+        self.batches = []
+
+    async def existing_ids(self, user_id, transaction_ids):
+        return {oid for oid in transaction_ids if self.owned.get(oid) == user_id}
+
+    async def bulk_write(self, operations):
+        self.batches.append(operations)
+        return {
+            "inserted": sum(isinstance(op, InsertOne) for op in operations),
+            "modified": sum(isinstance(op, UpdateOne) for op in operations),
+            "deleted": sum(isinstance(op, DeleteOne) for op in operations),
+            "errors": dict(self.write_errors)
+        }
+
+
+def fake_store(monkeypatch, owned=None, write_errors=None):
+    store = FakeTransactions(owned or {}, write_errors)
+    monkeypatch.setattr(transaction_service, "get_existing_transaction_ids_query", store.existing_ids)
+    monkeypatch.setattr(transaction_service, "bulk_write_transactions_query", store.bulk_write)
+    return store
+
+
+def test_valid_creates_are_written_in_one_batch_and_invalid_ones_reported(monkeypatch):
+    store = fake_store(monkeypatch)
+
+    outcome = asyncio.run(TransactionService.bulk_mutate(USER_ID, creates=[
+        VALID, {**VALID, "amount": -5}, {**VALID, "type": "refund"}, {**VALID, "category": "Rent"}
+    ]))
+
+    assert [r["status"] for r in outcome["results"]] == ["created", "invalid", "invalid", "created"]
+    assert "amount" in outcome["results"][1]["error"]
+    assert outcome["summary"] == {"created": 2, "invalid": 2}
+    assert len(store.batches) == 1 and len(store.batches[0]) == 2
+
+
+def test_ids_owned_by_another_user_or_missing_are_not_touched(monkeypatch):
+    mine, theirs, gone = ObjectId(), ObjectId(), ObjectId()
+    store = fake_store(monkeypatch, {mine: USER_ID, theirs: OTHER_USER_ID})
+
+    updated = asyncio.run(TransactionService.bulk_mutate(USER_ID, updates=[
+        {"id": str(mine), "category": "Dining"},
+        {"id": str(theirs), "category": "Dining"},
+        {"id": str(gone), "category": "Dining"},
+        {"category": "Dining"},
+        {"id": str(mine)},
+    ]))
+    deleted = asyncio.run(TransactionService.bulk_mutate(USER_ID, deletes=[
+        str(mine), str(theirs), "not-an-id", str(mine), str(gone)
+    ]))
+
+    assert [r["status"] for r in updated["results"]] == ["updated", "not_found", "not_found", "invalid", "invalid"]
+    assert [r["status"] for r in deleted["results"]] == ["deleted", "not_found", "invalid", "invalid", "not_found"]
+    assert deleted["results"][3]["error"] == "Duplicate id in batch"
+    written = [op for batch in store.batches for op in batch]
+    assert [(type(op).__name__, op._filter) for op in written] == [
+        ("UpdateOne", {"_id": mine, "user_id": ObjectId(USER_ID)}),
+        ("DeleteOne", {"_id": mine, "user_id": ObjectId(USER_ID)}),
+    ]
+    assert written[0]._doc["$set"]["category"] == "Dining"
+
+
+def test_write_errors_mark_only_their_item_failed(monkeypatch):
+    fake_store(monkeypatch, write_errors={1: "E11000 duplicate key"})
+
+    outcome = asyncio.run(TransactionService.bulk_mutate(USER_ID, creates=[VALID, {}, VALID, VALID]))
+
+    statuses = [(r["status"], r.get("error")) for r in outcome["results"]]
+    assert statuses[0] == ("created", None)
+    assert statuses[1][0] == "invalid"
+    assert statuses[2] == ("failed", "E11000 duplicate key")
+    assert statuses[3] == ("created", None)
+
+
+def make_client(monkeypatch, invalidations):
+    async def fake_invalidate(user_id):
+        invalidations.append(user_id)
+        return 0
+
+    monkeypatch.setattr(transaction_routes.cache_service, "invalidate_user_cache", fake_invalidate)
+    app = FastAPI()
+    app.include_router(transaction_router, prefix="/api/transactions")
+    app.dependency_overrides[get_current_user] = lambda: {"id": USER_ID, "email": "test@example.com"}
+    return TestClient(app)
+
+
+def test_bulk_routes_invalidate_the_cache_once_and_only_after_a_change(monkeypatch):
+    mine, theirs = ObjectId(), ObjectId()
+    fake_store(monkeypatch, {mine: USER_ID, theirs: OTHER_USER_ID})
+    invalidations = []
+    client = make_client(monkeypatch, invalidations)
+
+    created = client.post("/api/transactions/bulk", json={"items": [VALID, {**VALID, "amount": 0}, VALID]})
+    assert invalidations == [USER_ID]
+    updated = client.put("/api/transactions/bulk", json={"items": [{"id": str(theirs), "category": "Dining"}]})
+    assert invalidations == [USER_ID]
+    deleted = client.request("DELETE", "/api/transactions/bulk", json={"ids": [str(mine), str(theirs)]})
+
+    assert created.status_code == 200
+    assert created.json()["meta"] == {"created": 2, "invalid": 1}
+    assert [r["status"] for r in created.json()["data"]] == ["created", "invalid", "created"]
+    assert updated.json()["meta"] == {"not_found": 1}
+    assert deleted.json()["meta"] == {"deleted": 1, "not_found": 1}
+    assert invalidations == [USER_ID, USER_ID]
+
+
+def test_bulk_route_hides_unexpected_errors(monkeypatch):
+    async def broken(*args, **kwargs):
+        raise RuntimeError("connection reset")
+
+    monkeypatch.setattr(TransactionService, "bulk_mutate", staticmethod(broken))
+    invalidations = []
+    client = make_client(monkeypatch, invalidations)
+
+    response = client.post("/api/transactions/bulk", json={"items": [VALID]})
+
+    assert response.status_code == 500
+    assert response.json()["detail"] == "An unexpected error occurred"
+    assert invalidations == []
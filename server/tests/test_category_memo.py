@@ -0,0 +1,91 @@
+import asyncio
+import copy
+import json
+from types import SimpleNamespace
+
+import services.ai_service as ai_service
+import services.category_service as category_service
+from services.category_service import CategoryService
+
+USER_ID = "65a000000000000000000001"
+
+
+def test_normalize_merchant_strips_payment_rail_noise():
+    assert CategoryService.normalize_merchant("UPI-SWIGGY-ORDER-88213/okaxis") == "swiggy order okaxis"
+    assert CategoryService.normalize_merchant("POS 4411XXXX STARBUCKS #221") == "starbucks"
+    assert CategoryService.normalize_merchant("12/03 4412") == ""
+
+
+def test_user_memo_wins_and_unresolved_descriptions_are_left_for_the_model(monkeypatch):
+    async def fake_counts(user_id, merchants):
+        return [
+            {"user_id": USER_ID, "merchant": "swiggy", "category": "Groceries", "count": 2},
+            {"user_id": None, "merchant": "swiggy", "category": "Dining", "count": 40},
+            {"user_id": None, "merchant": "uber", "category": "Transport", "count": 9},
+            {"user_id": None, "merchant": "amazon", "category": "Shopping", "count": 5},
+            {"user_id": None, "merchant": "amazon", "category": "Groceries", "count": 5},
+        ]
+
+    monkeypatch.setattr(category_service, "get_merchant_counts_query", fake_counts)
+    rows = [
+        {"description": "SWIGGY", "category": ""},
+        {"description": "Uber", "category": ""},
+        {"description": "AMAZON", "category": ""},
+        {"description": "Rent", "category": "Rent"},
+    ]
+
+    applied = asyncio.run(CategoryService.apply_suggestions(USER_ID, rows))
+
+    assert applied == 2
+    assert rows[0]["category"] == "Groceries"
+    assert rows[1]["category"] == "Transport"
+    assert rows[2]["category"] == ""
+    assert rows[3]["category"] == "Rent"
+
+
+def test_model_is_only_asked_about_descriptions_the_memo_cannot_resolve(monkeypatch):
+    cache, prompts = {}, []
+
+    async def fake_get(key):
+        return copy.deepcopy(cache[key]) if key in cache else None
+
+    async def fake_set(key, transactions):
+        cache[key] = copy.deepcopy(transactions)
+
+    async def fake_apply(user_id, transactions, overwrite=False):
+        applied = 0
+        for t in transactions:
+            if user_id == USER_ID and t["description"] == "SWIGGY" and not t.get("category"):
+                t["category"] = "Groceries"
+                applied += 1
+        return applied
+
+    class FakeModel:
+        async def generate_content_async(self, prompt):
+            prompts.append(prompt)
+            return SimpleNamespace(text=json.dumps({"SWIGGY": "Dining", "UBER": "Transfer", "Payroll": "Other"}))
+
+    monkeypatch.setattr(ai_service, "GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr(ai_service, "genai", SimpleNamespace(GenerativeModel=lambda name: FakeModel()))
+    monkeypatch.setattr(ai_service, "get_cached_analysis", fake_get)
+    monkeypatch.setattr(ai_service, "set_cached_analysis", fake_set)
+    monkeypatch.setattr(CategoryService, "apply_suggestions", staticmethod(fake_apply))
+    statement = b"Date,Description,Amount,Category\n2024-03-02,SWIGGY,-250.00,\n2024-03-03,UBER,-90.00,\n2024-03-04,Payroll,3000.00,Salary\n"
+
+    def categories(user_id):
+        rows = asyncio.run(ai_service.analyze_statement(statement, "export.csv", user_id))
+        assert all("ai_category" not in t for t in rows)
+        return [t["category"] for t in rows]
+
+    assert categories(USER_ID) == ["Groceries", "Transfer", "Salary"]
+    assert '"UBER"' in prompts[0] and '"SWIGGY"' not in prompts[0] and '"Payroll"' not in prompts[0]
+
+    # Another user's upload of the same file hits the cache without the first user's memo
+    assert categories("65a000000000000000000002") == ["Dining", "Transfer", "Salary"]
+    assert '"SWIGGY"' in prompts[1] and '"UBER"' not in prompts[1]
+
+    assert categories(USER_ID) == ["Groceries", "Transfer", "Salary"]
+    assert len(prompts) == 2
+    cached = next(iter(cache.values()))
+    assert [t["category"] for t in cached] == ["", "", "Salary"]
+    assert [t.get("ai_category") for t in cached] == ["Dining", "Transfer", None]
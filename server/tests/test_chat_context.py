@@ -0,0 +1,77 @@
+import asyncio
+import json
+
+import pytest
+
+import services.chat_service as chat_service
+import services.chat_tool_service as chat_tool_service
+import services.cache_service as cache_service_module
+from services.cache_service import cache_service
+
+USER_ID = "65a000000000000000000002"
+
+
+@pytest.fixture(autouse=True)
+def shared_versions(monkeypatch):
+    """user_data_versions as seen by every worker"""
+    versions = {}
+
+    async def get_version(user_id):
+        return versions.get(user_id, 0)
+
+    async def bump_version(user_id):
+        versions[user_id] = versions.get(user_id, 0) + 1
+
+    monkeypatch.setattr(cache_service_module, "get_data_version_query", get_version)
+    monkeypatch.setattr(cache_service_module, "bump_data_version_query", bump_version)
+    return versions
+
+
+def test_chat_context_is_small_and_reused_until_the_users_data_changes(monkeypatch):
+    calls = {"aggregate": 0, "balance": 0}
+
+    async def fake_aggregate(pipeline):
+        calls["aggregate"] += 1
+        return [{"_id": "debit", "total": 250.0, "count": 1}]
+
+    async def fake_balance(user_id):
+        calls["balance"] += 1
+        return 1200.0
+
+    monkeypatch.setattr(chat_tool_service, "aggregate_transactions_query", fake_aggregate)
+    monkeypatch.setattr(chat_service, "get_total_balance_query", fake_balance)
+    asyncio.run(cache_service.invalidate_user_cache(USER_ID))
+
+    first = asyncio.run(chat_service.get_chat_context(USER_ID))
+    second = asyncio.run(chat_service.get_chat_context(USER_ID))
+
+    assert first == second
+    assert calls == {"aggregate": 1, "balance": 1}
+    context = json.loads(first)
+    assert context["available_balance"] == 1200.0
+    assert context["this_month"]["total_debits"] == 250.0
+    assert "recent_transactions" not in context
+
+    asyncio.run(cache_service.invalidate_user_cache(USER_ID))
+    asyncio.run(chat_service.get_chat_context(USER_ID))
+    assert calls == {"aggregate": 2, "balance": 2}
+
+
+def test_write_handled_by_another_worker_invalidates_the_chat_context(monkeypatch, shared_versions):
+    balances = iter([1200.0, 950.0])
+
+    async def fake_aggregate(pipeline):
+        return [{"_id": "debit", "total": 250.0, "count": 1}]
+
+    async def fake_balance(user_id):
+        return next(balances)
+
+    monkeypatch.setattr(chat_tool_service, "aggregate_transactions_query", fake_aggregate)
+    monkeypatch.setattr(chat_service, "get_total_balance_query", fake_balance)
+
+    before = json.loads(asyncio.run(chat_service.get_chat_context(USER_ID)))
+    # Another process bumped the shared version; nothing in this process's cache was touched
+    shared_versions[USER_ID] = shared_versions.get(USER_ID, 0) + 1
+    after = json.loads(asyncio.run(chat_service.get_chat_context(USER_ID)))
+
+    assert (before["available_balance"], after["available_balance"]) == (1200.0, 950.0)
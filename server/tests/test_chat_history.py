@@ -0,0 +1,65 @@
+import asyncio
+
+from services.chat_service import ChatHistoryManager, estimate_tokens
+
+USER_ID = "65a000000000000000000004"
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeSummarizer:
+    """Stands in for genai.GenerativeModel.generate_content_async; records what it was asked to fold."""
+
+    def __init__(self):
+        self.prompts = []
+
+    async def generate_content_async(self, prompt):
+        self.prompts.append(prompt)
+        return FakeResponse(f"summary #{len(self.prompts)}")
+
+
+def conversation(n):
+    return [
+        {"role": "user" if i % 2 == 0 else "model", "content": f"message {i} " + "x" * 400}
+        for i in range(n)
+    ]
+
+
+def test_history_is_compacted_within_budget_with_a_rolling_summary():
+    manager = ChatHistoryManager(budget=2000, recent_messages=10)
+    model = FakeSummarizer()
+    history = conversation(40)
+
+    summary, recent = asyncio.run(manager.compact(USER_ID, history, fixed_tokens=500, model=model))
+
+    assert summary == "summary #1"
+    assert recent == history[-len(recent):]
+    assert 0 < len(recent) <= 10
+    assert 500 + estimate_tokens(summary) + sum(estimate_tokens(m["content"]) for m in recent) <= 2000
+    assert "message 0 " in model.prompts[0]
+
+    # Next turn: only the newly folded messages are summarised, on top of the cached summary
+    longer = history + conversation(42)[40:]
+    summary, recent = asyncio.run(manager.compact(USER_ID, longer, fixed_tokens=500, model=model))
+
+    assert summary == "summary #2"
+    assert "summary #1" in model.prompts[1]
+    assert "message 0 " not in model.prompts[1]
+
+    # Same conversation again reuses the cached summary without calling the model
+    asyncio.run(manager.compact(USER_ID, longer, fixed_tokens=500, model=model))
+    assert len(model.prompts) == 2
+    assert manager.get_stats()["summary_cache_hits"] >= 2
+
+
+def test_short_history_is_kept_verbatim():
+    manager = ChatHistoryManager(budget=6000, recent_messages=10)
+    history = conversation(4)
+
+    summary, recent = asyncio.run(manager.compact(USER_ID, history, fixed_tokens=500, model=FakeSummarizer()))
+
+    assert summary is None
+    assert recent == history
@@ -0,0 +1,120 @@
+import asyncio
+import json
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import services.chat_service as chat_service
+from routes.chat_routes import router as chat_router
+from utils.auth import get_current_user
+
+USER_ID = "65a000000000000000000003"
+
+
+class FakePart:
+    def __init__(self, text):
+        self.text = text
+        self.function_call = None
+
+
+class FakeChunk:
+    def __init__(self, text):
+        self.text = text
+        self.parts = [FakePart(text)]
+
+
+class FakeStream:
+    def __init__(self, parts, delay):
+        self.parts = parts
+        self.delay = delay
+
+    async def __aiter__(self):
+        for i, part in enumerate(self.parts):
+            if i:
+                await asyncio.sleep(self.delay)
+            yield FakeChunk(part)
+
+
+class FakeChat:
+    def __init__(self, model, history):
+        self.model = model
+        self.history = history
+
+    async def send_message_async(self, message, stream=False):
+        self.model.messages.append(message)
+        if stream:
+            return FakeStream(self.model.parts, self.model.delay)
+        return FakeChunk("".join(self.model.parts))
+
+
+class FakeModel:
+    """Stands in for genai.GenerativeModel: streams fixed parts with a delay between them."""
+
+    def __init__(self, parts=("You spent ", "₹250 ", "on food."), delay=0.2):
+        self.parts = list(parts)
+        self.delay = delay
+        self.messages = []
+        self.histories = []
+
+    def start_chat(self, history):
+        self.histories.append(history)
+        return FakeChat(self, history)
+
+
+async def fake_context(user_id):
+    return '{"kpis":{}}'
+
+
+def test_stream_yields_first_token_before_the_reply_is_complete(monkeypatch):
+    monkeypatch.setattr(chat_service, "get_chat_context", fake_context)
+    model = FakeModel()
+
+    async def collect():
+        started = time.perf_counter()
+        arrivals = []
+        async for text in chat_service.stream_chat_response(USER_ID, "Food spend?", [{"role": "user", "content": "Hi"}], model=model):
+            arrivals.append((text, time.perf_counter() - started))
+        return arrivals
+
+    arrivals = asyncio.run(collect())
+
+    assert [text for text, _ in arrivals] == model.parts
+    assert arrivals[0][1] < 0.1
+    assert arrivals[-1][1] >= 0.4
+    assert model.messages == ["Food spend?"]
+    assert [h["role"] for h in model.histories[0]] == ["user", "model", "user"]
+
+
+def test_stream_route_emits_token_events_then_done(monkeypatch):
+    monkeypatch.setattr(chat_service, "get_chat_context", fake_context)
+    monkeypatch.setattr(chat_service, "GENAI_API_KEY", "test-key")
+    monkeypatch.setattr(chat_service.genai, "GenerativeModel", lambda name, **kwargs: FakeModel(delay=0))
+
+    app = FastAPI()
+    app.include_router(chat_router, prefix="/api/chat")
+    app.dependency_overrides[get_current_user] = lambda: {"id": USER_ID, "email": "test@example.com"}
+
+    with TestClient(app) as client:
+        response = client.post("/api/chat/stream", json={"message": "Food spend?"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [block.split("\n") for block in response.text.strip().split("\n\n")]
+    tokens = [json.loads(lines[1][len("data: "):])["text"] for lines in events if lines[0] == "event: token"]
+    assert "".join(tokens) == "You spent ₹250 on food."
+    assert events[-1][0] == "event: done"
+
+
+def test_chat_stats_are_admin_only():
+    app = FastAPI()
+    app.include_router(chat_router, prefix="/api/chat")
+
+    with TestClient(app) as client:
+        app.dependency_overrides[get_current_user] = lambda: {"id": USER_ID, "email": "test@example.com", "role": "user"}
+        forbidden = client.get("/api/chat/stats")
+        app.dependency_overrides[get_current_user] = lambda: {"id": USER_ID, "email": "admin@example.com", "role": "admin"}
+        allowed = client.get("/api/chat/stats")
+
+    assert forbidden.status_code == 403
+    assert allowed.status_code == 200 and allowed.json()["success"] is True
@@ -0,0 +1,107 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+import services.chat_service as chat_service
+import services.chat_tool_service as chat_tool_service
+import services.cache_service as cache_service_module
+from services.cache_service import cache_service
+from services.chat_tool_service import ChatToolService
+
+USER_ID = "65a000000000000000000005"
+
+
+@pytest.fixture(autouse=True)
+def shared_versions(monkeypatch):
+    """user_data_versions as seen by every worker"""
+    versions = {}
+
+    async def get_version(user_id):
+        return versions.get(user_id, 0)
+
+    async def bump_version(user_id):
+        versions[user_id] = versions.get(user_id, 0) + 1
+
+    monkeypatch.setattr(cache_service_module, "get_data_version_query", get_version)
+    monkeypatch.setattr(cache_service_module, "bump_data_version_query", bump_version)
+    return versions
+
+
+class FakeFunctionCall:
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+
+class FakePart:
+    def __init__(self, text="", function_call=None):
+        self.text = text
+        self.function_call = function_call
+
+
+class FakeResponse:
+    def __init__(self, parts):
+        self.parts = parts
+        self.text = "".join(p.text for p in parts)
+
+
+class FakeChat:
+    """Asks for Dining totals in March 2024, then answers with the function response it got back."""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send_message_async(self, content, stream=False):
+        self.sent.append(content)
+        if len(self.sent) == 1:
+            call = FakeFunctionCall("get_date_range_totals", {"start_date": "2024-03-01", "end_date": "2024-03-31", "category": "dining"})
+            return FakeResponse([FakePart(function_call=call)])
+        result = content[0].function_response.response["result"]
+        return FakeResponse([FakePart(text=f"You spent ₹{result['total_debits']:.0f} on Dining in March 2024.")])
+
+
+class FakeModel:
+    def __init__(self):
+        self.chat = FakeChat()
+
+    def start_chat(self, history):
+        return self.chat
+
+
+def test_model_tool_calls_are_executed_and_cached_per_data_version(monkeypatch):
+    pipelines = []
+
+    async def fake_aggregate(pipeline):
+        pipelines.append(pipeline)
+        return [{"_id": "debit", "total": 1840.5, "count": 6}]
+
+    async def fake_context(user_id):
+        return "{}"
+
+    monkeypatch.setattr(chat_tool_service, "aggregate_transactions_query", fake_aggregate)
+    monkeypatch.setattr(chat_service, "get_chat_context", fake_context)
+    asyncio.run(cache_service.invalidate_user_cache(USER_ID))
+
+    model = FakeModel()
+    reply = asyncio.run(chat_service.generate_chat_response(USER_ID, "How much on Dining in March 2024?", [], model=model))
+
+    assert reply == "You spent ₹1840 on Dining in March 2024."
+    match = pipelines[0][0]["$match"]
+    assert match["date"]["$gte"] == datetime(2024, 3, 1)
+    assert match["date"]["$lte"].date() == datetime(2024, 3, 31).date()
+    assert match["category"]["$options"] == "i"
+
+    # Same call again is served from cache until the user's data changes
+    args = {"start_date": "2024-03-01", "end_date": "2024-03-31", "category": "dining"}
+    asyncio.run(ChatToolService.run_tool(USER_ID, "get_date_range_totals", args))
+    assert len(pipelines) == 1
+    asyncio.run(cache_service.invalidate_user_cache(USER_ID))
+    asyncio.run(ChatToolService.run_tool(USER_ID, "get_date_range_totals", args))
+    assert len(pipelines) == 2
+
+
+def test_bad_tool_arguments_are_reported_to_the_model():
+    result = asyncio.run(ChatToolService.run_tool(USER_ID, "get_category_totals", {"start_date": "March"}))
+    assert "error" in result
+    assert "error" in asyncio.run(ChatToolService.run_tool(USER_ID, "drop_database", {}))
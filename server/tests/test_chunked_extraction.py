@@ -0,0 +1,80 @@
+import asyncio
+import json
+import re
+
+import pytest
+
+from services.ai_service import split_into_chunks, merge_chunk_results, extract_transactions_with_ai
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """Stands in for genai.GenerativeModel: turns 'YYYY-MM-DD desc amount' lines into JSON."""
+
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = 0
+
+    async def generate_content_async(self, prompt):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        content = prompt.split("Here is the text content:", 1)[1]
+        rows = [
+            {"date": m[1], "description": m[2], "amount": float(m[3]), "type": "debit", "category": "Other"}
+            for m in re.finditer(r"(\d{4}-\d{2}-\d{2}) (.+?) (\d+\.\d{2})", content)
+        ]
+        return FakeResponse("```json\n" + json.dumps(rows) + "\n```")
+
+
+def statement(n):
+    return "\n".join(f"2024-01-{i % 28 + 1:02d} Merchant {i} {i}.00" for i in range(1, n + 1))
+
+
+def test_chunks_respect_size_and_overlap():
+    chunks = split_into_chunks(statement(100), max_chars=300, overlap_lines=2)
+
+    assert len(chunks) > 1
+    assert all(len(c) <= 300 for c in chunks)
+    for prev, nxt in zip(chunks, chunks[1:]):
+        assert nxt.splitlines()[:2] == prev.splitlines()[-2:]
+
+
+def test_merge_drops_overlap_but_keeps_real_repeats():
+    coffee = {"date": "2024-01-01", "description": "Coffee", "amount": 3.0, "type": "debit"}
+    rent = {"date": "2024-01-02", "description": "Rent", "amount": 900.0, "type": "debit"}
+
+    merged = merge_chunk_results([[coffee, coffee, rent], [dict(rent, description=" rent ")], [coffee]])
+
+    assert merged == [coffee, coffee, rent, coffee]
+
+
+def test_extracts_long_statement_in_parallel_without_losing_rows():
+    model = FakeModel()
+
+    transactions, stats = asyncio.run(
+        extract_transactions_with_ai(statement(1500), model=model, max_concurrency=3, chunk_size=2000)
+    )
+
+    assert len(stats) == model.calls > 3
+    assert model.max_in_flight == 3
+    assert [t["description"] for t in transactions] == [f"Merchant {i}" for i in range(1, 1501)]
+    assert all(s["latency_ms"] >= 0 for s in stats)
+
+
+@pytest.mark.parametrize("reply", ['{"transactions": []}', '"none found"', "null", '[{"date": "2024-01-01"}, "oops"]'])
+def test_chunk_reply_that_is_not_a_list_of_objects_is_invalid_data(reply):
+    class WrongShapeModel:
+        async def generate_content_async(self, prompt):
+            return FakeResponse(reply)
+
+    with pytest.raises(ValueError, match="invalid data"):
+        asyncio.run(extract_transactions_with_ai(statement(3), model=WrongShapeModel()))
@@ -0,0 +1,51 @@
+from collections import Counter
+from datetime import date
+
+from models.payloads import TransactionCreate
+from scripts.generate_transactions import TransactionGenerator, write_csv_statement
+from services.ai_service import parse_tabular_statement, read_tabular_file
+
+END = date(2024, 12, 31)
+
+
+def generate(seed=7, user_index=0, count=2000):
+    generator = TransactionGenerator(seed, user_index, END, days=365)
+    return [t for batch in generator.batches(count, batch_size=500) for t in batch]
+
+
+def test_generation_is_deterministic_and_matches_the_schema():
+    rows = generate()
+    assert len(rows) == 2000
+    assert rows == generate()
+    assert rows != generate(user_index=1)
+    for row in rows[:200]:
+        TransactionCreate(**row)
+    assert all(date(2024, 1, 1) <= row["date"].date() <= END for row in rows)
+
+
+def test_spending_has_recurring_income_and_a_long_tail():
+    rows = generate()
+    salaries = [r for r in rows if r["category"] == "Salary"]
+    assert len(salaries) == 12 and len({r["amount"] for r in salaries}) == 1
+    assert sum(1 for r in rows if r["category"] == "Rent") == 12
+
+    merchants = Counter(r["description"].split("-")[1] if r["description"].startswith("UPI-") else r["description"]
+                        for r in rows if r["category"] == "Groceries")
+    top, *rest = merchants.most_common()
+    assert top[1] > 2 * rest[-1][1]
+
+    december = sum(1 for r in rows if r["date"].month == 12)
+    february = sum(1 for r in rows if r["date"].month == 2)
+    assert december > february
+
+
+def test_csv_statement_is_readable_by_the_statement_parser(tmp_path):
+    generator = TransactionGenerator(7, 0, END)
+    rows = generator.statement(days=30, rows=60)
+    path = tmp_path / "statement.csv"
+    write_csv_statement(str(path), rows, opening_balance=50_000)
+
+    parsed = parse_tabular_statement(read_tabular_file(path.read_bytes(), "statement.csv"))
+    assert len(parsed) == len(rows) == 60
+    assert parsed[0]["date"] >= "2024-12-02"
+    assert [p["type"] for p in parsed] == [r["type"] for r in rows]
@@ -0,0 +1,265 @@
+import asyncio
+import copy
+import json
+import os
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from bson import ObjectId
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import routes.import_job_routes as import_job_routes
+import services.import_job_service as import_job_service
+from routes.import_job_routes import import_job_router
+from services.import_job_service import IMPORT_JOB_MAX_ATTEMPTS, ImportJobService, ImportJobWorker
+from utils.auth import get_current_user
+
+USER_ID = "65a000000000000000000004"
+
+
+def matches(doc, filter):
+    for key, condition in filter.items():
+        if key == "$or":
+            if not any(matches(doc, option) for option in condition):
+                return False
+        elif isinstance(condition, dict) and "$lt" in condition:
+            if key not in doc or not doc[key] < condition["$lt"]:
+                return False
+        elif doc.get(key) != condition:
+            return False
+    return True
+
+
+class FakeJobsCollection:
+    """Just enough of import_jobs for claiming, leases and progress"""
+
+    def __init__(self):
+        self.jobs = []
+        self.fail_updates = 0
+
+    def add(self, **fields):
+        now = datetime.now()
+        job = {"_id": ObjectId(), "user_id": ObjectId(USER_ID), "filename": "statement.csv", "file_id": "file-1",
+               "kind": "analyze", "status": "queued", "stage": "queued", "progress": {}, "attempts": 0,
+               "created_at": now, "updated_at": now, **fields}
+        self.jobs.append(job)
+        return job
+
+    def apply(self, job, update):
+        job.update(copy.deepcopy(update.get("$set", {})))
+        for key, amount in update.get("$inc", {}).items():
+            job[key] = job.get(key, 0) + amount
+        for key in update.get("$unset", {}):
+            job.pop(key, None)
+
+    async def find_one_and_update(self, filter, update, sort=None, return_document=None):
+        candidates = sorted((job for job in self.jobs if matches(job, filter)), key=lambda job: job["created_at"])
+        if not candidates:
+            return None
+        self.apply(candidates[0], update)
+        return copy.deepcopy(candidates[0])
+
+    async def update_one(self, filter, update):
+        if self.fail_updates:
+            self.fail_updates -= 1
+            raise ConnectionError("primary stepped down")
+        matched = [job for job in self.jobs if matches(job, filter)][:1]
+        for job in matched:
+            self.apply(job, update)
+        return SimpleNamespace(matched_count=len(matched))
+
+    async def find_one(self, filter, projection=None):
+        found = next((job for job in self.jobs if matches(job, filter)), None)
+        return copy.deepcopy(found)
+
+
+class FakeBucket:
+    def __init__(self):
+        self.deleted = []
+
+    async def download_to_stream(self, file_id, stream):
+        stream.write(b"Date,Description,Amount\n2024-03-02,SWIGGY,-250.00\n")
+
+    async def delete(self, file_id):
+        self.deleted.append(file_id)
+
+
+def fake_store(monkeypatch):
+    jobs, bucket = FakeJobsCollection(), FakeBucket()
+    monkeypatch.setattr(import_job_service, "db", SimpleNamespace(import_jobs=jobs))
+    monkeypatch.setattr(import_job_service, "upload_bucket", lambda: bucket)
+    return jobs, bucket
+
+
+def expire(job):
+    job["lease_expires"] = datetime.now() - timedelta(seconds=1)
+
+
+def test_workers_never_share_a_lease_id(monkeypatch):
+    async def idle(self, index):
+        await asyncio.sleep(3600)
+
+    monkeypatch.setattr(ImportJobWorker, "_run", idle)
+    first, second = ImportJobWorker(1), ImportJobWorker(1)
+    created = first.worker_id
+
+    async def scenario():
+        await first.start()
+        await second.start()
+        ids = [first.worker_id, second.worker_id]
+        await first.stop()
+        await second.stop()
+        return ids
+
+    ids = asyncio.run(scenario())
+
+    assert ids[0] != ids[1]
+    assert ids[0] != created
+    assert all(f":{os.getpid()}:" in worker_id for worker_id in ids)
+
+
+def test_claim_takes_the_oldest_queued_job_once(monkeypatch):
+    jobs, _ = fake_store(monkeypatch)
+    older = jobs.add(created_at=datetime.now() - timedelta(minutes=1))
+    jobs.add()
+    first, second = ImportJobWorker(1), ImportJobWorker(1)
+
+    claimed = asyncio.run(first._claim())
+    other = asyncio.run(second._claim())
+    none_left = asyncio.run(first._claim())
+
+    assert claimed["_id"] == older["_id"]
+    assert (claimed["status"], claimed["lease_owner"], claimed["attempts"]) == ("running", first.worker_id, 1)
+    assert other["_id"] != older["_id"] and other["lease_owner"] == second.worker_id
+    assert none_left is None
+
+
+def test_expired_lease_is_reclaimed_and_fences_out_the_old_owner(monkeypatch):
+    jobs, _ = fake_store(monkeypatch)
+    job = jobs.add()
+    stalled, rescuer = ImportJobWorker(1), ImportJobWorker(1)
+    claimed = asyncio.run(stalled._claim())
+
+    assert asyncio.run(rescuer._claim()) is None
+    expire(job)
+    reclaimed = asyncio.run(rescuer._claim())
+
+    assert (reclaimed["lease_owner"], reclaimed["attempts"]) == (rescuer.worker_id, 2)
+    assert asyncio.run(stalled._update(claimed, {"stage": "analysing"})) is False
+    assert asyncio.run(rescuer._update(reclaimed, {"stage": "analysing"})) is True
+    assert job["stage"] == "analysing"
+
+
+def test_job_fails_after_too_many_attempts(monkeypatch):
+    jobs, bucket = fake_store(monkeypatch)
+    job = jobs.add(status="running", attempts=IMPORT_JOB_MAX_ATTEMPTS, lease_owner="crashed")
+    expire(job)
+    worker = ImportJobWorker(1)
+
+    async def never(*args, **kwargs):
+        raise AssertionError("a job over its attempt budget must not be analysed")
+
+    monkeypatch.setattr(import_job_service, "analyze_statement", never)
+    asyncio.run(worker._process(asyncio.run(worker._claim())))
+
+    assert (job["status"], job["stage"], job["attempts"]) == ("failed", "failed", IMPORT_JOB_MAX_ATTEMPTS + 1)
+    assert job["error"] == "Job failed after repeated attempts"
+    assert bucket.deleted == ["file-1"]
+
+
+def test_job_left_running_by_a_restarted_worker_resumes_with_progress(monkeypatch):
+    jobs, bucket = fake_store(monkeypatch)
+    job = jobs.add(status="running", stage="analysing", attempts=1, lease_owner="old-process")
+    expire(job)
+    stages = []
+
+    async def fake_analyze(file, filename, user_id, on_progress=None):
+        assert file.read().startswith(b"Date,Description")
+        await on_progress("extracting")
+        stages.append((job["stage"], dict(job["progress"])))
+        await on_progress("analysing", rows=1)
+        stages.append((job["stage"], dict(job["progress"])))
+        return [{"date": "2024-03-02", "description": "SWIGGY", "amount": 250.0, "type": "debit", "category": "Food"}]
+
+    monkeypatch.setattr(import_job_service, "analyze_statement", fake_analyze)
+    worker = ImportJobWorker(1)
+    asyncio.run(worker._process(asyncio.run(worker._claim())))
+
+    assert stages == [("extracting", {}), ("analysing", {"rows": 1})]
+    assert (job["status"], job["stage"], job["attempts"]) == ("waiting", "ready_for_review", 2)
+    assert job["progress"] == {"rows": 1} and len(job["transactions"]) == 1
+    assert bucket.deleted == ["file-1"]
+
+
+def test_worker_abandons_a_job_another_worker_reclaimed(monkeypatch):
+    jobs, bucket = fake_store(monkeypatch)
+    job = jobs.add()
+
+    async def fake_analyze(file, filename, user_id, on_progress=None):
+        # The lease ran out mid-analysis and another worker claimed the job
+        job["lease_owner"] = "rescuer"
+        await on_progress("analysing", rows=1)
+        raise AssertionError("progress after losing the lease must abort the job")
+
+    monkeypatch.setattr(import_job_service, "analyze_statement", fake_analyze)
+    worker = ImportJobWorker(1)
+    asyncio.run(worker._process(asyncio.run(worker._claim())))
+
+    assert (job["status"], job["stage"], job["lease_owner"]) == ("running", "queued", "rescuer")
+    assert "error" not in job
+    assert bucket.deleted == []
+
+
+def test_heartbeat_retries_failed_renewals_and_cancels_work_once_the_lease_is_lost(monkeypatch):
+    jobs, _ = fake_store(monkeypatch)
+    job = jobs.add()
+    monkeypatch.setattr(import_job_service, "IMPORT_JOB_LEASE_SECONDS", 0.03)
+    worker = ImportJobWorker(1)
+    claimed = asyncio.run(worker._claim())
+
+    async def scenario():
+        work = asyncio.create_task(asyncio.sleep(10))
+        jobs.fail_updates = 2
+        heartbeat = asyncio.create_task(worker._heartbeat(claimed, work))
+        await asyncio.sleep(0.1)
+        renewed = not heartbeat.done() and job["lease_expires"] > datetime.now()
+        job["lease_owner"] = "rescuer"
+        await asyncio.wait_for(heartbeat, timeout=1)
+        await asyncio.gather(work, return_exceptions=True)
+        return renewed, work.cancelled()
+
+    renewed, cancelled = asyncio.run(scenario())
+
+    assert jobs.fail_updates == 0
+    assert renewed and cancelled
+
+
+def test_events_route_streams_each_stage_until_the_job_is_final(monkeypatch):
+    job_id = str(ObjectId())
+    base = datetime(2024, 3, 2, 10, 0)
+    states = [("queued", 0), ("queued", 0), ("analysing", 1), ("analysing", 1), ("ready_for_review", 2)]
+    calls = []
+
+    async def fake_get_job(user_id, requested_id, include_transactions=True):
+        assert (user_id, requested_id, include_transactions) == (USER_ID, job_id, False)
+        stage, tick = states[min(len(calls), len(states) - 1)]
+        calls.append(stage)
+        return {"id": job_id, "stage": stage, "progress": {}, "updated_at": base + timedelta(seconds=tick)}
+
+    monkeypatch.setattr(ImportJobService, "get_job", staticmethod(fake_get_job))
+    monkeypatch.setattr(import_job_routes, "SSE_POLL_SECONDS", 0)
+    app = FastAPI()
+    app.include_router(import_job_router, prefix="/api/import-jobs")
+    app.dependency_overrides[get_current_user] = lambda: {"id": USER_ID, "email": "test@example.com"}
+
+    with TestClient(app) as client:
+        response = client.get(f"/api/import-jobs/{job_id}/events")
+        missing = client.get("/api/import-jobs/not-an-id/events")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [block.split("\n") for block in response.text.strip().split("\n\n")]
+    assert [lines[0] for lines in events] == ["event: progress"] * 3
+    assert [json.loads(lines[1][len("data: "):])["stage"] for lines in events] == ["queued", "analysing", "ready_for_review"]
+    assert missing.status_code == 404
@@ -0,0 +1,30 @@
+import sys
+
+from scripts.import_time import import_problems, measure_import, parse_importtime
+from utils.lazy_import import LazyModule
+
+
+def test_parse_importtime_reads_self_cumulative_and_depth():
+    output = "\n".join([
+        "import time: self [us] | cumulative | imported package",
+        "import time:       120 |        120 |     encodings.latin_1",
+        "import time:      2000 |     600000 | app",
+    ])
+    assert parse_importtime(output) == [
+        {"module": "encodings.latin_1", "self_us": 120, "cumulative_us": 120, "depth": 2},
+        {"module": "app", "self_us": 2000, "cumulative_us": 600000, "depth": 0},
+    ]
+
+
+def test_lazy_module_imports_on_first_attribute_access_and_runs_the_hook():
+    sys.modules.pop("colorsys", None)
+    configured = []
+    colorsys = LazyModule("colorsys", on_import=configured.append)
+    assert not colorsys.loaded and "colorsys" not in sys.modules
+    assert colorsys.rgb_to_hsv(1, 0, 0) == (0, 1, 1)
+    assert colorsys.loaded and [m.__name__ for m in configured] == ["colorsys"]
+
+
+def test_app_import_is_within_budget_and_defers_heavy_libraries():
+    report = measure_import("app", runs=2)
+    assert import_problems(report) == []
@@ -0,0 +1,29 @@
+import json
+import logging
+
+from utils.logger import JsonFormatter, SamplingFilter, parse_sample_rates
+
+
+def make_record(name, level, msg, **extra):
+    record = logging.LogRecord(name, level, __file__, 1, msg, None, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter_includes_extra_fields():
+    line = JsonFormatter().format(make_record("expense_tracker.requests", logging.INFO, "GET /health", status=200, duration_ms=1.5))
+    entry = json.loads(line)
+
+    assert entry["message"] == "GET /health"
+    assert entry["level"] == "INFO"
+    assert entry["status"] == 200
+    assert entry["duration_ms"] == 1.5
+
+
+def test_sampling_only_drops_low_severity_records_of_sampled_loggers():
+    sampler = SamplingFilter(parse_sample_rates("expense_tracker.requests=0, bad=x"))
+
+    assert not sampler.filter(make_record("expense_tracker.requests", logging.INFO, "hot"))
+    assert sampler.filter(make_record("expense_tracker.requests", logging.WARNING, "slow"))
+    assert sampler.filter(make_record("expense_tracker", logging.INFO, "other"))
+    assert parse_sample_rates("a=2,b=0.25") == {"a": 1.0, "b": 0.25}
@@ -0,0 +1,54 @@
+import asyncio
+import time
+
+from utils.loop_monitor import EventLoopMonitor, event_loop_lag_seconds
+
+
+def hash_password_synchronously():
+    time.sleep(0.2)
+
+
+def test_blocking_call_is_reported_with_its_stack():
+    lag_samples = event_loop_lag_seconds.count()
+
+    async def main():
+        async with EventLoopMonitor(interval_ms=10, threshold_ms=50) as monitor:
+            await asyncio.sleep(0.05)
+            hash_password_synchronously()
+            await asyncio.sleep(0.05)
+        return monitor
+
+    events = asyncio.run(main()).blocking_events()
+
+    assert len(events) == 1
+    assert "hash_password_synchronously" in events[0]["stack"][-1]
+    assert 150 <= events[0]["blocked_ms"] <= 400
+    assert event_loop_lag_seconds.count() > lag_samples
+
+
+def test_awaiting_does_not_count_as_blocking():
+    async def main():
+        async with EventLoopMonitor(interval_ms=10, threshold_ms=50) as monitor:
+            await asyncio.sleep(0.1)
+            await asyncio.to_thread(time.sleep, 0.1)
+        return monitor
+
+    assert asyncio.run(main()).blocking_events() == []
+
+
+def test_episode_is_completed_under_the_lock():
+    async def main():
+        async with EventLoopMonitor(interval_ms=10, threshold_ms=50) as monitor:
+            await asyncio.sleep(0.05)
+            hash_password_synchronously()
+            # Readers hold the lock: the watchdog must not finish the episode meanwhile
+            with monitor._lock:
+                await asyncio.sleep(0.1)
+                pending = [event.get("blocked_ms") for event in monitor._events]
+            await asyncio.sleep(0.05)
+        return monitor, pending
+
+    monitor, pending = asyncio.run(main())
+
+    assert pending == [None]
+    assert monitor.blocking_events()[0]["blocked_ms"] >= 150
@@ -0,0 +1,82 @@
+import asyncio
+
+from fastapi import APIRouter, FastAPI, Request
+from fastapi.testclient import TestClient
+
+import app as app_module
+import routes.metrics_routes as metrics_routes
+from utils.metrics import MetricsRegistry, metrics, route_template
+
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests", ("route", "status"))
+    latency = registry.histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+    depth = registry.gauge("queue_depth", "Queue depth")
+
+    async def collect():
+        depth.set(7)
+
+    registry.add_collector(collect)
+    requests.inc(route="/a/{id}", status=200)
+    requests.inc(route="/a/{id}", status=200)
+    for value in (0.05, 0.5, 3.0):
+        latency.observe(value, route="/a/{id}")
+
+    text = asyncio.run(registry.render())
+
+    assert '# TYPE requests_total counter' in text
+    assert 'requests_total{route="/a/{id}",status="200"} 2' in text
+    assert 'latency_seconds_bucket{route="/a/{id}",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="/a/{id}",le="1"} 2' in text
+    assert 'latency_seconds_bucket{route="/a/{id}",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{route="/a/{id}"} 3' in text
+    assert 'queue_depth 7' in text
+
+
+def test_route_template_uses_the_prefixed_path_template():
+    seen = []
+    router = APIRouter()
+
+    @router.get("/{transaction_id}")
+    async def get_item(transaction_id: str):
+        return {}
+
+    app = FastAPI()
+
+    @app.middleware("http")
+    async def record(request: Request, call_next):
+        response = await call_next(request)
+        seen.append(route_template(request.scope))
+        return response
+
+    app.include_router(router, prefix="/transactions")
+    client = TestClient(app)
+    client.get("/transactions/65a000000000000000000001")
+    client.get("/no/such/path")
+
+    assert seen == ["/transactions/{transaction_id}", "unmatched"]
+
+
+def test_request_latency_is_labelled_with_the_status():
+    TestClient(app_module.app).get("/no/such/path")
+
+    text = asyncio.run(metrics.render())
+    assert 'http_request_duration_seconds_count{method="GET",route="unmatched",status="404"}' in text
+
+
+def test_metrics_endpoint_requires_the_token_outside_development(monkeypatch):
+    app = FastAPI()
+    app.include_router(metrics_routes.metrics_router, prefix="/metrics")
+    client = TestClient(app)
+
+    monkeypatch.setattr(metrics_routes, "METRICS_TOKEN", None)
+    monkeypatch.setattr(metrics_routes, "DEBUG", False)
+    assert client.get("/metrics").status_code == 401
+    monkeypatch.setattr(metrics_routes, "DEBUG", True)
+    assert client.get("/metrics").status_code == 200
+
+    monkeypatch.setattr(metrics_routes, "METRICS_TOKEN", "s3cret")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer s3cret"}).status_code == 200
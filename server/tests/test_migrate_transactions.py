@@ -0,0 +1,37 @@
+from datetime import datetime
+
+from bson import ObjectId
+
+from migrate_transactions import NEEDS_FIX, fix_document, range_filter
+
+NOW = datetime(2025, 1, 1)
+
+
+def test_fix_document_converts_strings_and_fills_missing_fields():
+    user_id = ObjectId()
+    doc = {"_id": ObjectId(), "user_id": str(user_id), "date": "05-01-2024"}
+    updates, error = fix_document(doc, NOW)
+    assert error is None
+    assert updates == {
+        "user_id": user_id,
+        "date": datetime(2024, 1, 5),
+        "payment_method": "Other",
+        "created_at": datetime(2024, 1, 5),
+        "updated_at": NOW,
+    }
+
+    complete = {"_id": ObjectId(), "user_id": user_id, "date": NOW, "payment_method": "UPI", "created_at": NOW, "updated_at": NOW}
+    assert fix_document(complete, NOW) == ({}, None)
+
+
+def test_unfixable_documents_are_reported_not_updated():
+    assert fix_document({"_id": 1, "user_id": "not-an-id"}, NOW)[1].startswith("Cannot convert user_id")
+    assert fix_document({"_id": 1, "user_id": ObjectId(), "date": "yesterday"}, NOW)[1].startswith("Cannot parse date")
+
+
+def test_range_filter_resumes_after_the_checkpoint_within_the_partition():
+    lower, upper, last = ObjectId(), ObjectId(), ObjectId()
+    assert range_filter(None, None, None) == NEEDS_FIX
+    assert range_filter(lower, upper, None)["_id"] == {"$gte": lower, "$lt": upper}
+    assert range_filter(lower, upper, last)["_id"] == {"$gt": last, "$lt": upper}
+    assert range_filter(lower, None, last)["$or"] == NEEDS_FIX["$or"]
@@ -0,0 +1,110 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+import database.migrations as migrations
+from database.migrations import LOCK_ID, acquire_lock, run_migrations, schema_version
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, *args):
+        return self
+
+    async def to_list(self, length):
+        return self.docs
+
+
+class FakeMigrationsCollection:
+    """Just enough of schema_migrations: numeric _ids are records, LOCK_ID is the lock"""
+
+    def __init__(self):
+        self.records = {}
+        self.lock = None
+
+    async def find_one(self, filter, projection=None, sort=None):
+        return {"_id": max(self.records)} if self.records else None
+
+    def find(self, filter):
+        return FakeCursor([self.records[v] for v in sorted(self.records)])
+
+    async def insert_one(self, doc):
+        if doc["_id"] in self.records:
+            raise DuplicateKeyError("duplicate migration record")
+        self.records[doc["_id"]] = doc
+
+    async def update_one(self, filter, update, upsert=False):
+        owner, now = filter["$or"][0]["owner"], filter["$or"][1]["expires_at"]["$lt"]
+        if self.lock and self.lock["owner"] != owner and self.lock["expires_at"] >= now:
+            raise DuplicateKeyError("lock held")
+        self.lock = dict(update["$set"])
+
+    async def delete_one(self, filter):
+        if self.lock and self.lock["owner"] == filter["owner"]:
+            self.lock = None
+
+
+class FakeDB:
+    def __init__(self):
+        self.schema_migrations = FakeMigrationsCollection()
+
+
+def fake_migrations(monkeypatch, calls, delay=0.0):
+    async def step(db, version):
+        await asyncio.sleep(delay)
+        calls.append(version)
+
+    monkeypatch.setattr(migrations, "MIGRATIONS", [
+        {"version": v, "name": f"step_{v}", "up": lambda db, v=v: step(db, v)} for v in (1, 2, 3)
+    ])
+    monkeypatch.setattr(migrations, "MIGRATION_LOCK_POLL_SECONDS", 0.01)
+
+
+def test_each_migration_runs_once_across_concurrent_runners(monkeypatch):
+    calls = []
+    fake_migrations(monkeypatch, calls, delay=0.01)
+    db = FakeDB()
+
+    async def scenario():
+        return await asyncio.gather(
+            run_migrations(db, owner="a"), run_migrations(db, owner="b"), run_migrations(db, owner="c", wait=False)
+        )
+
+    results = asyncio.run(scenario())
+    assert calls == [1, 2, 3]
+    assert sorted(v for applied in results for v in applied) == [1, 2, 3]
+    assert results[2] == []
+    assert asyncio.run(schema_version(db)) == 3
+    assert db.schema_migrations.lock is None
+    assert asyncio.run(run_migrations(db, owner="d")) == []
+
+
+def test_runner_resumes_after_a_failed_step(monkeypatch):
+    calls = []
+    fake_migrations(monkeypatch, calls)
+
+    async def broken(db):
+        raise RuntimeError("index build failed")
+
+    db = FakeDB()
+    good = migrations.MIGRATIONS[2]["up"]
+    migrations.MIGRATIONS[2]["up"] = broken
+    with pytest.raises(RuntimeError):
+        asyncio.run(run_migrations(db, owner="a"))
+    assert sorted(db.schema_migrations.records) == [1, 2]
+    assert db.schema_migrations.lock is None
+
+    migrations.MIGRATIONS[2]["up"] = good
+    assert asyncio.run(run_migrations(db, owner="b")) == [3]
+    assert calls == [1, 2, 3]
+
+
+def test_expired_lock_can_be_taken_over():
+    db = FakeDB()
+    db.schema_migrations.lock = {"_id": LOCK_ID, "owner": "crashed", "expires_at": datetime.now() - timedelta(seconds=1)}
+    assert asyncio.run(acquire_lock(db, "a"))
+    assert not asyncio.run(acquire_lock(db, "b"))
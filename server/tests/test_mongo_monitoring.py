@@ -0,0 +1,73 @@
+import json
+from datetime import datetime
+from types import SimpleNamespace
+
+from bson import ObjectId
+
+from database.monitoring import CommandMetricsListener, command_shape, current_route, summarize_explain
+
+PIPELINE = [
+    {"$match": {"user_id": ObjectId(), "date": {"$gte": datetime(2024, 3, 1), "$lte": datetime(2024, 3, 31)}, "type": {"$in": ["debit", "credit"]}}},
+    {"$group": {"_id": "$category", "total": {"$sum": "$amount"}}},
+    {"$sort": {"total": -1}},
+]
+
+
+def started(request_id, name, command):
+    return SimpleNamespace(connection_id=("db", 27017), request_id=request_id, command_name=name, command=command, database_name="farm")
+
+
+def succeeded(request_id, micros, reply):
+    return SimpleNamespace(connection_id=("db", 27017), request_id=request_id, duration_micros=micros, reply=reply)
+
+
+def test_command_shape_redacts_literals_but_keeps_structure():
+    shape = json.loads(command_shape("aggregate", {"aggregate": "transactions", "pipeline": PIPELINE}))
+
+    match = shape["pipeline"][0]["$match"]
+    assert match == {"user_id": "?", "date": {"$gte": "?", "$lte": "?"}, "type": {"$in": ["?"]}}
+    assert shape["pipeline"][1] == {"$group": {"_id": "$category", "total": {"$sum": "$amount"}}}
+    assert shape["pipeline"][2] == {"$sort": {"total": -1}}
+
+
+def test_slow_commands_are_logged_with_route_and_getmore_batches_attributed():
+    listener = CommandMetricsListener(slow_query_ms=100)
+    token = current_route.set("GET /dashboard/kpis")
+    try:
+        listener.started(started(1, "aggregate", {"aggregate": "transactions", "pipeline": PIPELINE, "cursor": {}, "lsid": {}, "$db": "farm"}))
+    finally:
+        current_route.reset(token)
+    listener.succeeded(succeeded(1, 250_000, {"cursor": {"id": 77, "firstBatch": [{}] * 101}}))
+    listener.started(started(2, "getMore", {"getMore": 77, "collection": "transactions"}))
+    listener.succeeded(succeeded(2, 5_000, {"cursor": {"id": 0, "nextBatch": [{}] * 20}}))
+    listener.started(started(3, "find", {"find": "users", "filter": {"email": "a@b.c"}}))
+    listener.succeeded(succeeded(3, 1_000, {"cursor": {"id": 0, "firstBatch": [{}]}}))
+
+    slow = listener.slow_queries()
+    assert len(slow) == 1
+    assert slow[0]["route"] == "GET /dashboard/kpis"
+    assert slow[0]["collection"] == "transactions"
+    assert slow[0]["docs"] == 101
+    assert "_command" not in slow[0]
+    assert set(listener.get_slow_query(slow[0]["id"])["_command"]) == {"aggregate", "pipeline", "cursor"}
+
+    stats = listener.query_stats()
+    assert stats[0]["collection"] == "transactions"
+    assert stats[0]["count"] == 2
+    assert stats[0]["docs"] == 121
+    assert stats[1]["shape"] == '{"filter":{"email":"?"}}'
+
+
+def test_explain_summary_flags_collection_scans():
+    explain = {
+        "queryPlanner": {"winningPlan": {"stage": "SORT", "inputStage": {"stage": "COLLSCAN"}}},
+        "executionStats": {"nReturned": 5, "totalDocsExamined": 12000, "totalKeysExamined": 0, "executionTimeMillis": 48},
+    }
+    summary = summarize_explain(explain)
+    assert summary["plan"] == "COLLSCAN -> SORT"
+    assert summary["collection_scan"] is True
+    assert summary["docs_examined"] == 12000
+
+    indexed = summarize_explain({"queryPlanner": {"winningPlan": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "user_id_1_date_-1"}}}})
+    assert indexed["indexes"] == ["user_id_1_date_-1"]
+    assert indexed["collection_scan"] is False
@@ -0,0 +1,62 @@
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+
+from serve import worker_max_requests
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MASTER = """
+import os
+from fastapi import FastAPI
+from serve import Master, bind_socket
+
+app = FastAPI()
+
+@app.get("/pid")
+async def pid():
+    return {"pid": os.getpid()}
+
+sock = bind_socket("127.0.0.1", 0)
+print("PORT", sock.getsockname()[1], flush=True)
+Master(app, workers=2, max_requests=3, max_requests_jitter=0, graceful_timeout=5, sock=sock).run()
+"""
+
+
+def test_max_requests_jitter_stays_within_range():
+    rng = random.Random(50)
+    assert worker_max_requests(0, 10, rng) is None
+    assert worker_max_requests(100, 0, rng) == 100
+    limits = {worker_max_requests(100, 10, rng) for _ in range(200)}
+    assert min(limits) >= 100 and max(limits) <= 110 and len(limits) > 5
+
+
+def test_master_recycles_workers_and_stops_them_on_sigterm():
+    master = subprocess.Popen([sys.executable, "-c", MASTER], cwd=SERVER_DIR, stdout=subprocess.PIPE, text=True)
+    try:
+        port = int(master.stdout.readline().split()[1])
+        pids = []
+        deadline = time.monotonic() + 30
+        # uvicorn checks the request limit every 100ms, so keep asking until replacements show up
+        while len(set(pids)) < 4 and time.monotonic() < deadline:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/pid", timeout=5) as response:
+                    pids.append(json.load(response)["pid"])
+            except OSError:
+                pass
+            time.sleep(0.05)
+        assert len(set(pids)) >= 4
+        assert master.pid not in pids
+
+        master.send_signal(signal.SIGTERM)
+        assert master.wait(timeout=15) == 0
+        for pid in set(pids):
+            assert not os.path.exists(f"/proc/{pid}") or open(f"/proc/{pid}/stat").read().split()[2] == "Z"
+    finally:
+        if master.poll() is None:
+            master.kill()
@@ -0,0 +1,64 @@
+import asyncio
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import utils.profiling as profiling
+from utils.profiling import ProfileStore, ProfilingMiddleware
+
+
+def busy_wait(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+async def slow_query():
+    await asyncio.sleep(0.08)
+
+
+def make_app(store, monkeypatch, role="admin"):
+    async def fake_admin_user(scope):
+        return {"id": "u1", "role": role} if role == "admin" else None
+
+    monkeypatch.setattr(profiling, "admin_user", fake_admin_user)
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware, store=store, sample_rate=1.0, interval_ms=2)
+
+    @app.get("/dashboard/kpis")
+    async def kpis():
+        await slow_query()
+        busy_wait(0.08)
+        return {"ok": True}
+
+    return app
+
+
+def test_flagged_admin_request_is_profiled_across_awaits_and_cpu(tmp_path, monkeypatch):
+    store = ProfileStore(str(tmp_path), max_stored=10)
+    client = TestClient(make_app(store, monkeypatch))
+
+    response = client.get("/dashboard/kpis", headers={"X-Profile": "1"})
+
+    profile_id = response.headers["x-profile-id"]
+    profile = store.get(profile_id)
+    assert profile["route"] == "/dashboard/kpis"
+    assert profile["status"] == 200
+    assert profile["samples"] > 10
+    frames = {entry["frame"].split(" ")[0]: entry for entry in profile["top"]}
+    assert frames["slow_query"]["total"] > 10
+    assert frames["busy_wait"]["self"] > 3
+    assert not any(line.startswith("__call__ (utils/profiling.py") for line in profile["folded"].splitlines())
+    assert "folded" not in store.list()[0]
+
+
+def test_unflagged_or_non_admin_requests_are_not_profiled(tmp_path, monkeypatch):
+    store = ProfileStore(str(tmp_path))
+    client = TestClient(make_app(store, monkeypatch))
+    assert "x-profile-id" not in client.get("/dashboard/kpis").headers
+
+    client = TestClient(make_app(store, monkeypatch, role="user"))
+    assert "x-profile-id" not in client.get("/dashboard/kpis?profile=1").headers
+    assert store.list() == []
+    assert store.get("../../etc/passwd") is None
@@ -0,0 +1,62 @@
+import asyncio
+import os
+
+import pytest
+
+from scripts.check_query_plans import CASE_NAMES, command_target, plan_problems, run_plan_checks
+
+TEST_MONGODB_URL = os.getenv("TEST_MONGODB_URL")
+
+# Queries the previous index set could not serve well. The workload-driven
+# indexes (scripts/create_indexes.py) target them, but the plans have not
+# been checked against a live mongod yet; drop an entry once it passes there.
+KNOWN_GAPS = {
+    "highest_expense_month": "(user_id, type, amount, date) index not yet verified against a live mongod",
+    "list_by_amount": "(user_id, amount, date) index not yet verified against a live mongod",
+    "list_credits_month": "(user_id, type, date) index not yet verified against a live mongod",
+    "count_credits_month": "(user_id, type, date) index not yet verified against a live mongod",
+    "category_credit_month": "(user_id, type, date) index not yet verified against a live mongod",
+}
+
+
+def summary(plan, docs=None, keys=None):
+    return {"plan": plan, "collection_scan": plan.startswith("COLLSCAN"), "docs_examined": docs, "keys_examined": keys,
+            "indexes": [s[s.index("(") + 1:-1] for s in plan.split(" -> ") if "(" in s]}
+
+
+def test_plan_problems_flag_scans_blocking_sorts_and_wasted_reads():
+    assert plan_problems(summary("IXSCAN(user_id_1_date_-1) -> FETCH", docs=800, keys=800), ideal=800, sorted_with_limit=False) == []
+    assert plan_problems(summary("IDHACK", docs=1, keys=1), ideal=1, sorted_with_limit=False) == []
+    assert plan_problems(summary("COLLSCAN", docs=60000, keys=0), ideal=10, sorted_with_limit=False, max_docs_ratio=None) == ["collection scan"]
+
+    problems = plan_problems(summary("IXSCAN(user_id_1_date_-1) -> FETCH -> SORT -> LIMIT", docs=820, keys=820), ideal=1, sorted_with_limit=True)
+    assert problems == ["in-memory SORT before LIMIT", "examined 820 documents for 1 needed", "examined 820 keys for 1 needed"]
+    assert plan_problems(summary("IXSCAN(user_id_1_type_1_amount_-1) -> FETCH -> LIMIT", docs=1, keys=40), ideal=1,
+                         sorted_with_limit=True, max_keys_ratio=None) == []
+
+
+def test_command_target_reads_filter_limit_and_sort():
+    find = {"find": "transactions", "filter": {"user_id": 1}, "sort": {"date": -1}, "skip": 100, "limit": 50}
+    assert command_target(find) == {"filter": {"user_id": 1}, "limit": 150, "sorted": True}
+
+    top = {"aggregate": "transactions", "pipeline": [{"$match": {"user_id": 1}}, {"$sort": {"amount": -1}}, {"$limit": 1}]}
+    assert command_target(top) == {"filter": {"user_id": 1}, "limit": 1, "sorted": True}
+
+    grouped = {"aggregate": "transactions", "pipeline": [{"$match": {"user_id": 1}}, {"$group": {"_id": "$type"}}]}
+    assert command_target(grouped) == {"filter": {"user_id": 1}, "limit": None, "sorted": False}
+
+
+@pytest.fixture(scope="module")
+def plan_results():
+    if not TEST_MONGODB_URL:
+        pytest.skip("set TEST_MONGODB_URL to a disposable mongod to check query plans")
+    results = asyncio.run(run_plan_checks(TEST_MONGODB_URL, database="expense_tracker_plans_test"))
+    return {result["name"]: result for result in results}
+
+
+@pytest.mark.parametrize("name", [
+    pytest.param(name, marks=pytest.mark.xfail(reason=KNOWN_GAPS[name])) if name in KNOWN_GAPS else name
+    for name in CASE_NAMES
+])
+def test_query_is_index_backed(plan_results, name):
+    assert plan_results[name]["problems"] == []
@@ -0,0 +1,106 @@
+import asyncio
+import io
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import services.statement_cache_service as statement_cache_service
+from services.statement_cache_service import get_cached_analysis, set_cached_analysis, statement_cache_key
+
+ROWS = [{"date": "2024-03-02", "description": "SWIGGY", "amount": 250.0, "type": "debit", "category": "Food"}]
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, field, direction):
+        self.docs.sort(key=lambda doc: doc[field], reverse=direction < 0)
+        return self
+
+    def limit(self, count):
+        self.docs = self.docs[:count]
+        return self
+
+    async def to_list(self, length):
+        return self.docs
+
+
+class FakeCacheCollection:
+    def __init__(self):
+        self.docs = {}
+
+    async def find_one(self, filter):
+        doc = self.docs.get(filter["_id"])
+        if doc and doc["created_at"] > filter["created_at"]["$gt"]:
+            return doc
+        return None
+
+    async def replace_one(self, filter, replacement, upsert=False):
+        self.docs[filter["_id"]] = {"_id": filter["_id"], **replacement}
+
+    async def estimated_document_count(self):
+        return len(self.docs)
+
+    def find(self, filter, projection=None):
+        return FakeCursor(list(self.docs.values()))
+
+    async def delete_many(self, filter):
+        for key in filter["_id"]["$in"]:
+            self.docs.pop(key, None)
+
+
+def fake_cache(monkeypatch):
+    collection = FakeCacheCollection()
+    monkeypatch.setattr(statement_cache_service, "db", SimpleNamespace(statement_analysis_cache=collection))
+    return collection
+
+
+def test_key_depends_on_content_type_and_version_not_on_name_or_source():
+    content = b"Date,Description,Amount\n2024-03-02,SWIGGY,-250.00\n"
+    stream = io.BytesIO(content)
+
+    key = statement_cache_key(content, "march.csv", "v1")
+
+    assert statement_cache_key(stream, "MARCH-copy.CSV", "v1") == key
+    assert stream.tell() == 0
+    assert statement_cache_key(content, "march.xlsx", "v1") != key
+    assert statement_cache_key(content, "march.csv", "v2") != key
+    assert statement_cache_key(content + b"\n", "march.csv", "v1") != key
+
+
+def test_hit_miss_and_expiry_use_utc_timestamps(monkeypatch):
+    collection = fake_cache(monkeypatch)
+
+    assert asyncio.run(get_cached_analysis("k")) is None
+    asyncio.run(set_cached_analysis("k", ROWS))
+    created_at = collection.docs["k"]["created_at"]
+
+    assert created_at.tzinfo is not None and created_at.utcoffset() == timedelta(0)
+    assert abs(created_at - datetime.now(timezone.utc)) < timedelta(seconds=5)
+    assert asyncio.run(get_cached_analysis("k")) == ROWS
+
+    ttl = timedelta(seconds=statement_cache_service.STATEMENT_CACHE_TTL_SECONDS)
+    collection.docs["k"]["created_at"] = datetime.now(timezone.utc) - ttl - timedelta(seconds=1)
+    assert asyncio.run(get_cached_analysis("k")) is None
+
+
+def test_oldest_entries_are_evicted_beyond_the_size_bound(monkeypatch):
+    collection = fake_cache(monkeypatch)
+    monkeypatch.setattr(statement_cache_service, "STATEMENT_CACHE_MAX_ENTRIES", 2)
+    start = datetime.now(timezone.utc) - timedelta(minutes=10)
+
+    for minute, key in enumerate(["a", "b", "c"]):
+        asyncio.run(set_cached_analysis(key, ROWS))
+        collection.docs[key]["created_at"] = start + timedelta(minutes=minute)
+    asyncio.run(set_cached_analysis("d", ROWS))
+
+    assert sorted(collection.docs) == ["c", "d"]
+
+
+def test_oversized_results_are_not_cached(monkeypatch):
+    collection = fake_cache(monkeypatch)
+    monkeypatch.setattr(statement_cache_service, "STATEMENT_CACHE_MAX_TRANSACTIONS", 1)
+
+    asyncio.run(set_cached_analysis("k", ROWS * 2))
+
+    assert collection.docs == {}
@@ -0,0 +1,70 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import services.ai_service as ai_service
+from services.ai_service import categorize_descriptions, read_tabular_file, parse_tabular_statement
+
+
+HDFC_CSV = b"""Statement of account
+Account No,50100123456789
+Date,Narration,Chq./Ref.No.,Value Dt,Withdrawal Amt.,Deposit Amt.,Closing Balance
+01/04/24,UPI-SWIGGY-ORDER,0000412,01/04/24,"1,250.50",,"48,749.50"
+02/04/24,SALARY APR 2024,0000413,02/04/24,,"85,000.00","1,33,749.50"
+15/04/24,RENT TRANSFER,0000414,15/04/24,"25,000.00",,"1,08,749.50"
+"""
+
+SIGNED_CSV = b"""Posting Date,Description,Amount,Category
+2024-03-01,Payroll,3000.00,Salary
+2024-03-02,Coffee shop,-4.75,
+2024-03-03,Refund,(12.00),
+"""
+
+
+def test_parses_known_bank_layout_with_preamble():
+    rows = parse_tabular_statement(read_tabular_file(HDFC_CSV, "hdfc.csv"))
+
+    assert rows == [
+        {"date": "2024-04-01", "description": "UPI-SWIGGY-ORDER", "amount": 1250.5, "type": "debit", "category": ""},
+        {"date": "2024-04-02", "description": "SALARY APR 2024", "amount": 85000.0, "type": "credit", "category": ""},
+        {"date": "2024-04-15", "description": "RENT TRANSFER", "amount": 25000.0, "type": "debit", "category": ""},
+    ]
+
+
+def test_parses_signed_amount_column():
+    rows = parse_tabular_statement(read_tabular_file(SIGNED_CSV, "export.csv"))
+
+    assert [(r["date"], r["amount"], r["type"], r["category"]) for r in rows] == [
+        ("2024-03-01", 3000.0, "credit", "Salary"),
+        ("2024-03-02", 4.75, "debit", ""),
+        ("2024-03-03", 12.0, "debit", ""),
+    ]
+
+
+def test_ambiguous_sheet_falls_back_to_ai():
+    raw = read_tabular_file(b"when,what\nyesterday,lunch\n", "notes.csv")
+
+    assert parse_tabular_statement(raw) is None
+
+
+@pytest.mark.parametrize("reply", ['["Food", "Salary"]', '"Food"', "null", "not json"])
+def test_categorisation_gives_up_on_a_reply_that_is_not_a_mapping(monkeypatch, reply):
+    class FakeModel:
+        async def generate_content_async(self, prompt):
+            return SimpleNamespace(text=reply)
+
+    monkeypatch.setattr(ai_service, "GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr(ai_service, "genai", SimpleNamespace(GenerativeModel=lambda name: FakeModel()))
+    assert asyncio.run(categorize_descriptions(["SWIGGY", "Payroll"])) == {}
+
+
+def test_categorisation_keeps_only_known_categories_for_requested_descriptions(monkeypatch):
+    class FakeModel:
+        async def generate_content_async(self, prompt):
+            return SimpleNamespace(text='{"SWIGGY": "Dining", "Payroll": "Income", "Extra": "Rent"}')
+
+    monkeypatch.setattr(ai_service, "GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr(ai_service, "genai", SimpleNamespace(GenerativeModel=lambda name: FakeModel()))
+
+    assert asyncio.run(categorize_descriptions(["SWIGGY", "Payroll"])) == {"SWIGGY": "Dining", "Payroll": "Other"}
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from scripts.create_indexes import REDUNDANT_TRANSACTION_INDEXES, TRANSACTION_INDEXES
+from scripts.migrate_transaction_indexes import index_models, index_plan, migrate_indexes
+
+TARGETS = [model.document["name"] for model in index_models()]
+LEGACY = ["_id_", "user_id_1_date_-1", "category_1", "type_1", "user_id_1_category_1", "user_id_1_type_1",
+          "user_id_1_fingerprint_1"]
+
+
+class FakeCollection:
+    def __init__(self, names, fail_builds=False):
+        self.indexes = {name: {} for name in names}
+        self.fail_builds = fail_builds
+        self.calls = []
+
+    async def index_information(self):
+        return {name: dict(info) for name, info in self.indexes.items()}
+
+    async def create_indexes(self, models):
+        for model in models:
+            self.calls.append(("build", model.document["name"]))
+            if not self.fail_builds:
+                self.indexes[model.document["name"]] = {}
+
+    async def drop_index(self, name):
+        self.calls.append(("drop", name))
+        del self.indexes[name]
+
+
+class FakeDB:
+    def __init__(self, collection):
+        self.transactions = collection
+
+    async def command(self, command):
+        index = command["index"]
+        self.transactions.calls.append(("hidden" if index["hidden"] else "unhidden", index["name"]))
+        self.transactions.indexes[index["name"]]["hidden"] = index["hidden"]
+
+
+def test_every_list_sort_and_type_filter_has_a_user_scoped_compound():
+    keys = [[field for field, _ in index] for index, _ in TRANSACTION_INDEXES]
+    for field in ("date", "amount", "category", "type"):
+        assert ["user_id", field] in [k[:2] for k in keys]
+    assert ["user_id", "type", "date"] in keys
+    assert all(k[0] == "user_id" for k in keys)
+
+
+def test_plan_builds_missing_targets_and_drops_only_redundant_indexes():
+    plan = index_plan({name: {} for name in LEGACY})
+    assert plan["build"] == [name for name in TARGETS if name not in LEGACY]
+    assert plan["drop"] == REDUNDANT_TRANSACTION_INDEXES
+    assert index_plan({name: {} for name in ["_id_", *TARGETS]}) == {"build": [], "drop": [], "hide": [], "unhide": []}
+
+
+def test_migration_builds_before_dropping_and_is_idempotent():
+    collection = FakeCollection(LEGACY)
+    asyncio.run(migrate_indexes(FakeDB(collection)))
+    steps = [step for step, _ in collection.calls]
+    assert steps.index("drop") > max(i for i, step in enumerate(steps) if step == "build")
+    assert sorted(collection.indexes) == sorted(["_id_", *TARGETS])
+
+    collection.calls.clear()
+    asyncio.run(migrate_indexes(FakeDB(collection)))
+    assert collection.calls == []
+
+
+def test_migration_keeps_old_indexes_when_a_build_is_missing():
+    collection = FakeCollection(LEGACY, fail_builds=True)
+    with pytest.raises(RuntimeError):
+        asyncio.run(migrate_indexes(FakeDB(collection)))
+    assert sorted(collection.indexes) == sorted(LEGACY)
+
+
+def test_hide_then_unhide_rolls_back_without_dropping():
+    collection = FakeCollection(LEGACY)
+    db = FakeDB(collection)
+    asyncio.run(migrate_indexes(db, hide=True))
+    assert all(collection.indexes[name]["hidden"] for name in REDUNDANT_TRANSACTION_INDEXES)
+    asyncio.run(migrate_indexes(db, unhide=True))
+    assert not any(collection.indexes[name]["hidden"] for name in REDUNDANT_TRANSACTION_INDEXES)
+    assert not [call for call in collection.calls if call[0] == "drop"]
@@ -0,0 +1,96 @@
+import io
+from tempfile import SpooledTemporaryFile
+
+import pytest
+from fastapi import HTTPException, UploadFile
+from fastapi.testclient import TestClient
+from starlette.datastructures import Headers
+
+import app as app_module
+from services.ai_service import extract_text_from_pdf, parse_tabular_statement, read_tabular_file
+from utils.uploads import MULTIPART_OVERHEAD_BYTES, open_upload, sniff_file_type
+
+CSV = b"Date,Description,Amount\n2024-03-02,SWIGGY,-250.00\n2024-03-05,Payroll,3000.00\n"
+
+
+def make_pdf(lines):
+    from reportlab.pdfgen import canvas
+
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer)
+    for i, line in enumerate(lines):
+        pdf.drawString(72, 760 - 18 * i, line)
+    pdf.save()
+    return buffer.getvalue()
+
+
+def make_upload(content, filename, content_type="application/octet-stream"):
+    spool = SpooledTemporaryFile(max_size=1024)
+    spool.write(content)
+    spool.seek(0)
+    return UploadFile(file=spool, filename=filename, headers=Headers({"content-type": content_type}))
+
+
+def test_sniffs_statement_types_from_leading_bytes():
+    assert sniff_file_type(b"%PDF-1.7\n") == "pdf"
+    assert sniff_file_type(b"PK\x03\x04rest") == "xlsx"
+    assert sniff_file_type(b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1") == "xls"
+    assert sniff_file_type(CSV) == "csv"
+    assert sniff_file_type(b"\x7fELF\x00\x00") is None
+    assert sniff_file_type(b"") is None
+
+
+@pytest.mark.parametrize("content, filename, content_type", [
+    (CSV, "statement.exe", "text/csv"),
+    (CSV, "statement", "text/csv"),
+    (CSV, "statement.csv", "image/png"),
+    (b"%PDF-1.7\n", "statement.csv", "text/csv"),
+    (CSV, "statement.pdf", "application/pdf"),
+    (b"\x7fELF\x00\x00\x00", "statement.xlsx", "application/octet-stream"),
+])
+def test_wrong_extension_type_or_magic_bytes_are_rejected(content, filename, content_type):
+    with pytest.raises(HTTPException) as error:
+        open_upload(make_upload(content, filename, content_type))
+
+    assert error.value.status_code == 415
+
+
+def test_oversize_upload_is_rejected_by_open_upload():
+    with pytest.raises(HTTPException) as error:
+        open_upload(make_upload(CSV, "statement.csv", "text/csv"), max_bytes=10)
+
+    assert error.value.status_code == 413
+
+
+def test_csv_upload_streams_through_the_tabular_parser():
+    handle = open_upload(make_upload(CSV, "statement.csv", "text/csv; charset=utf-8"))
+
+    assert not isinstance(handle, (bytes, bytearray)) and handle.tell() == 0
+    rows = parse_tabular_statement(read_tabular_file(handle, "statement.csv"))
+
+    assert [(r["description"], r["amount"], r["type"]) for r in rows] == [("SWIGGY", 250.0, "debit"), ("Payroll", 3000.0, "credit")]
+    assert not handle.closed
+
+
+def test_pdf_upload_streams_through_the_pdf_extractor():
+    handle = open_upload(make_upload(make_pdf(["02/03/2024 SWIGGY 250.00", "05/03/2024 PAYROLL 3000.00"]),
+                                     "statement.pdf", "application/pdf"))
+
+    text = extract_text_from_pdf(handle)
+
+    assert "SWIGGY 250.00" in text and "PAYROLL 3000.00" in text
+
+
+def test_oversize_content_length_is_rejected_before_the_body_is_read(monkeypatch):
+    monkeypatch.setattr(app_module, "MAX_UPLOAD_BYTES", 1024)
+    client = TestClient(app_module.app)
+    body = b"x" * (1024 + MULTIPART_OVERHEAD_BYTES + 1)
+
+    rejected = client.post("/api/upload/analyze", content=body, headers={"content-type": "multipart/form-data; boundary=x"})
+    rejected_job = client.post("/api/import-jobs", content=body, headers={"content-type": "multipart/form-data; boundary=x"})
+    other_route = client.post("/api/transactions/bulk", content=body, headers={"content-type": "application/json"})
+
+    assert rejected.status_code == 413
+    assert rejected.json()["error"] == "File too large"
+    assert rejected_job.status_code == 413
+    assert other_route.status_code != 413
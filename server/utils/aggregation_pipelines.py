@@ -1,9 +1,10 @@
 """
 Reusable MongoDB aggregation pipelines for dashboard analytics
 """
+import re
 from datetime import datetime
 from bson import ObjectId
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 
 def build_kpi_pipeline(user_id: str, start_date: datetime, end_date: datetime) -> List[Dict[str, Any]]:
@@ -200,3 +201,76 @@ def build_budget_alerts_pipeline(user_id: str, year: int, month: int) -> List[Di
             }
         }
     ]
+
+
+def build_date_range_totals_pipeline(user_id: str, start_date: datetime, end_date: datetime, category: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Aggregation pipeline for credit/debit totals in a date range (optionally one category, case-insensitive)
+    """
+    match_stage = {
+        "user_id": ObjectId(user_id),
+        "date": {"$gte": start_date, "$lte": end_date}
+    }
+
+    if category:
+        match_stage["category"] = {"$regex": f"^{re.escape(category)}$", "$options": "i"}
+
+    return [
+        {"$match": match_stage},
+        {
+            "$group": {
+                "_id": "$type",
+                "total": {"$sum": "$amount"},
+                "count": {"$sum": 1}
+            }
+        }
+    ]
+
+
+def build_merchant_totals_pipeline(user_id: str, start_date: datetime, end_date: datetime, limit: int = 500) -> List[Dict[str, Any]]:
+    """
+    Aggregation pipeline for spending per description (merchant), largest first
+    """
+    return [
+        {
+            "$match": {
+                "user_id": ObjectId(user_id),
+                "type": "debit",
+                "date": {"$gte": start_date, "$lte": end_date}
+            }
+        },
+        {
+            "$group": {
+                "_id": "$description",
+                "total": {"$sum": "$amount"},
+                "count": {"$sum": 1}
+            }
+        },
+        {"$sort": {"total": -1}},
+        {"$limit": limit}
+    ]
+
+
+def build_search_pipeline(user_id: str, text: str, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None, limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    Aggregation pipeline for transactions whose description contains text, newest first
+    """
+    match_stage: Dict[str, Any] = {"user_id": ObjectId(user_id)}
+
+    if text:
+        match_stage["description"] = {"$regex": re.escape(text), "$options": "i"}
+
+    if start_date or end_date:
+        date_query = {}
+        if start_date:
+            date_query["$gte"] = start_date
+        if end_date:
+            date_query["$lte"] = end_date
+        match_stage["date"] = date_query
+
+    return [
+        {"$match": match_stage},
+        {"$sort": {"date": -1}},
+        {"$limit": limit},
+        {"$project": {"_id": 0, "date": 1, "amount": 1, "type": 1, "category": 1, "description": 1}}
+    ]
@@ -0,0 +1,57 @@
+"""
+Lazy module imports for heavy optional libraries
+
+    genai = LazyModule("google.generativeai", on_import=configure)
+
+behaves like the module but imports it on first attribute access, so a
+worker only pays for pandas, pdfplumber or the Gemini SDK once a request
+needs them. Setting an attribute (e.g. monkeypatch in tests) imports the
+module and sets it there.
+
+Annotations must not touch a lazy module at definition time; quote them
+("pd.DataFrame").
+"""
+import importlib
+import threading
+from types import ModuleType
+from typing import Callable, Optional
+
+
+class LazyModule:
+    """Module stand-in that imports `name` on first use"""
+
+    def __init__(self, name: str, on_import: Optional[Callable[[ModuleType], None]] = None):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_on_import", on_import)
+        object.__setattr__(self, "_module", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def _load(self) -> ModuleType:
+        module = self._module
+        if module is None:
+            # Imports also happen from worker threads (asyncio.to_thread)
+            with self._lock:
+                module = self._module
+                if module is None:
+                    module = importlib.import_module(self._name)
+                    if self._on_import is not None:
+                        self._on_import(module)
+                    object.__setattr__(self, "_module", module)
+        return module
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr: str, value):
+        setattr(self._load(), attr, value)
+
+    def __delattr__(self, attr: str):
+        delattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.loaded else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
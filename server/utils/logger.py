@@ -1,9 +1,29 @@
 """
 Centralized logging configuration
+
+Log calls only enqueue the record (QueueHandler); a background QueueListener
+thread formats it and does the file and console I/O, so the event loop
+never blocks on a write.
+
+Environment:
+    LOG_LEVEL          console level (INFO)
+    LOG_FILE_LEVEL     file level (INFO; DEBUG for verbose troubleshooting)
+    LOG_FORMAT         "text" or "json" (one JSON object per line)
+    LOG_MAX_BYTES      rotate the log file at this size (10MB)
+    LOG_BACKUP_COUNT   rotated files to keep (5)
+    LOG_SAMPLE_RATES   per-logger sampling for hot paths, e.g.
+                       "expense_tracker.requests=0.1" keeps ~10% of that
+                       logger's records below WARNING
 """
+import atexit
+import json
 import logging
+import queue
+import random
 import sys
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict
 
 # Create logs directory
 import os
@@ -11,40 +31,132 @@ log_dir = "logs"
 if not os.path.exists(log_dir):
     os.makedirs(log_dir)
 
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FILE_LEVEL = os.getenv("LOG_FILE_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+
 # Configure logging
 log_filename = f"logs/app_{datetime.now().strftime('%Y%m%d')}.log"
 
-# Create formatters
-detailed_formatter = logging.Formatter(
-    '%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
+# Attributes every LogRecord has; anything else was passed via `extra=`
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; `extra=` fields are included as top-level keys"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "source": f"{record.filename}:{record.lineno}",
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of a logger's records below WARNING; warnings and errors always pass"""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        for name, rate in self.rates.items():
+            if record.name == name or record.name.startswith(name + "."):
+                return random.random() < rate
+        return True
 
-console_formatter = logging.Formatter(
-    '%(levelname)s - %(message)s'
-)
 
-# File handler (detailed logs)
-file_handler = logging.FileHandler(log_filename, encoding='utf-8')
-file_handler.setLevel(logging.DEBUG)
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    """'a.b=0.1,c=0.5' -> {'a.b': 0.1, 'c': 0.5}"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, rate = item.partition("=")
+        try:
+            rates[name.strip()] = max(0.0, min(float(rate), 1.0))
+        except ValueError:
+            continue
+    return rates
+
+
+# Create formatters
+if LOG_FORMAT == "json":
+    detailed_formatter = console_formatter = JsonFormatter()
+else:
+    detailed_formatter = logging.Formatter(
+        '%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+    console_formatter = logging.Formatter(
+        '%(levelname)s - %(message)s'
+    )
+
+# File handler (detailed logs, rotated by size)
+file_handler = RotatingFileHandler(log_filename, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8')
+file_handler.setLevel(LOG_FILE_LEVEL)
 file_handler.setFormatter(detailed_formatter)
 
 # Console handler (simpler logs)
 console_handler = logging.StreamHandler(sys.stdout)
-console_handler.setLevel(logging.INFO)
+console_handler.setLevel(LOG_LEVEL)
 console_handler.setFormatter(console_formatter)
 
-# Root logger configuration
+# Callers only enqueue; the listener thread writes to the real handlers
+log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+queue_handler = QueueHandler(log_queue)
+queue_handler.addFilter(SamplingFilter(parse_sample_rates(LOG_SAMPLE_RATES)))
+queue_listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+
+# Root logger configuration: the level is the most verbose handler's, so
+# disabled levels are rejected before a record is even created
 logging.basicConfig(
-    level=logging.DEBUG,
-    handlers=[file_handler, console_handler]
+    level=min(file_handler.level, console_handler.level),
+    handlers=[queue_handler]
 )
 
+# QueueHandler merges args into the message before enqueueing; the real formatting happens in the listener
+queue_handler.setFormatter(logging.Formatter("%(message)s"))
+
 # Create named logger
 logger = logging.getLogger("expense_tracker")
 
+# Hot path (one record per request); sample it with LOG_SAMPLE_RATES
+request_logger = logging.getLogger("expense_tracker.requests")
+
 # Silence some noisy loggers
 logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
 logging.getLogger("uvicorn.error").setLevel(logging.WARNING)
 logging.getLogger("pdfminer").setLevel(logging.ERROR)
 logging.getLogger("multipart").setLevel(logging.WARNING)
+
+
+def start_logging():
+    """Start the background writer (idempotent)"""
+    if queue_listener._thread is None:
+        queue_listener.start()
+
+
+def stop_logging():
+    """Flush queued records and stop the background writer"""
+    if queue_listener._thread is not None:
+        queue_listener.stop()
+
+
+start_logging()
+atexit.register(stop_logging)
+# The writer thread does not survive fork(): flush and stop it first, then
+# restart it on both sides (serve.py forks workers after importing the app)
+os.register_at_fork(before=stop_logging, after_in_parent=start_logging, after_in_child=start_logging)
@@ -0,0 +1,144 @@
+"""
+Event-loop lag monitor and blocking-call detector
+
+A heartbeat task sleeps LOOP_LAG_INTERVAL_MS at a time and records how late
+it wakes up (event_loop_lag_seconds). A watchdog thread checks the heartbeat;
+when the loop has not run it for LOOP_BLOCK_THRESHOLD_MS, a single callback is
+hogging the loop, and the watchdog captures the loop thread's stack at that
+moment. That stack names the blocking call (bcrypt, reportlab, pandas, a
+synchronous SDK call...). It is logged and kept for /api/admin/loop-blocks.
+
+Tests can use the monitor as an async context manager:
+
+    async with EventLoopMonitor(threshold_ms=50) as monitor:
+        await code_under_test()
+    assert not monitor.blocking_events()
+
+Environment:
+    LOOP_MONITOR_ENABLED     "false" disables the monitor (true)
+    LOOP_LAG_INTERVAL_MS     heartbeat interval (100)
+    LOOP_BLOCK_THRESHOLD_MS  report callbacks that block longer than this (200)
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+
+from utils.logger import logger
+from utils.metrics import metrics
+
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "true").lower() == "true"
+LOOP_LAG_INTERVAL_MS = float(os.getenv("LOOP_LAG_INTERVAL_MS", "100"))
+LOOP_BLOCK_THRESHOLD_MS = float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "200"))
+MAX_BLOCKING_EVENTS = 50
+STACK_DEPTH = 30
+
+event_loop_lag_seconds = metrics.histogram(
+    "event_loop_lag_seconds", "How late the event loop ran a scheduled heartbeat",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+event_loop_blocked_total = metrics.counter(
+    "event_loop_blocked_total", "Times a single callback blocked the event loop longer than LOOP_BLOCK_THRESHOLD_MS"
+)
+
+
+class EventLoopMonitor:
+    """Heartbeat task (lag) plus watchdog thread (blocking stacks) for one event loop"""
+
+    def __init__(self, interval_ms: float = LOOP_LAG_INTERVAL_MS, threshold_ms: float = LOOP_BLOCK_THRESHOLD_MS):
+        self.interval = interval_ms / 1000
+        self.threshold = threshold_ms / 1000
+        self._events: Deque[Dict[str, Any]] = deque(maxlen=MAX_BLOCKING_EVENTS)
+        self._lock = threading.Lock()
+        self._last_beat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    async def start(self):
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name="event-loop-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info(f"✅ Event loop monitor started (block threshold {self.threshold * 1000:.0f}ms)")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._stop.set()
+        self._watchdog.join()
+        self._watchdog = None
+
+    async def __aenter__(self) -> "EventLoopMonitor":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def _heartbeat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._last_beat = now
+            event_loop_lag_seconds.observe(max(0.0, now - expected))
+
+    def _watch(self):
+        episode: Optional[Dict[str, Any]] = None
+        check_every = min(self.interval, self.threshold) / 2
+        while not self._stop.wait(check_every):
+            last_beat = self._last_beat
+            stalled = time.monotonic() - last_beat - self.interval
+            if episode is None and stalled >= self.threshold:
+                episode = self._capture(last_beat)
+            elif episode is not None and last_beat != episode["_beat"]:
+                # The loop ran the heartbeat again: the blocking callback finished.
+                # The episode is already visible to blocking_events(), so update it under the lock
+                with self._lock:
+                    episode["blocked_ms"] = round((last_beat - episode["_beat"] - self.interval) * 1000, 1)
+                    episode.pop("_beat")
+                episode = None
+
+    def _capture(self, last_beat: float) -> Dict[str, Any]:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = [line.rstrip() for line in traceback.format_stack(frame, limit=STACK_DEPTH)] if frame else []
+        event = {
+            "detected_at": datetime.now().isoformat(timespec="milliseconds"),
+            "blocked_ms": None,  # filled in once the loop recovers
+            "stack": stack,
+            "_beat": last_beat,
+        }
+        with self._lock:
+            self._events.append(event)
+        event_loop_blocked_total.inc()
+        where = stack[-1].strip().splitlines()[0] if stack else "unknown"
+        logger.warning(
+            f"⚠️ Event loop blocked for more than {self.threshold * 1000:.0f}ms at {where}\n" + "\n".join(stack)
+        )
+        return event
+
+    def blocking_events(self) -> List[Dict[str, Any]]:
+        """Recent blocking episodes, newest first"""
+        with self._lock:
+            return [{k: v for k, v in event.items() if not k.startswith("_")} for event in reversed(self._events)]
+
+
+# Global instance
+loop_monitor = EventLoopMonitor()
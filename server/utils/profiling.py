@@ -0,0 +1,301 @@
+"""
+On-demand per-request profiling
+
+An admin adds `X-Profile: 1` (or `?profile=1`) to a request; a sampled
+share of those requests is profiled and the result saved under
+PROFILE_DIR. The response carries `X-Profile-Id`, which the admin
+endpoints (/api/admin/profiles) resolve to the stored profile.
+
+The profiler is a wall-clock stack sampler that understands asyncio: every
+PROFILE_INTERVAL_MS a background thread looks at the request's task. If the
+task is running, it records the event-loop thread's real stack; if it is
+suspended, it records the chain of awaiting coroutines, so time spent waiting
+on Mongo, Gemini or asyncio.to_thread shows up at the await that caused it.
+Stacks are stored in the folded format ("a;b;c 12") read by flamegraph.pl
+and speedscope. While the handler holds the GIL the sampler only gets to run
+about once per sys.getswitchinterval() (5ms), which bounds the resolution of
+CPU-bound sections.
+
+Environment:
+    PROFILE_SAMPLE_RATE  share of flagged admin requests that are profiled (1.0)
+    PROFILE_INTERVAL_MS  sampling interval (5)
+    PROFILE_DIR          where profiles are written (logs/profiles)
+    PROFILE_MAX_STORED   newest profiles kept on disk (100)
+"""
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException
+from starlette.requests import Request
+from utils.logger import logger
+from utils.metrics import route_template
+
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "1.0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join("logs", "profiles"))
+PROFILE_MAX_STORED = int(os.getenv("PROFILE_MAX_STORED", "100"))
+
+PROFILE_HEADER = "x-profile"
+PROFILE_QUERY_PARAM = "profile"
+TOP_FRAMES = 25
+WAITING_FRAME = "<await>"
+
+_PROFILE_ID = re.compile(r"^[0-9a-f]{32}$")
+_SERVER_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_STDLIB_ROOT = os.path.dirname(os.__file__)
+
+
+def _frame_label(frame) -> str:
+    filename = frame.f_code.co_filename
+    if filename.startswith(_SERVER_ROOT):
+        filename = os.path.relpath(filename, _SERVER_ROOT)
+    elif "site-packages" in filename:
+        filename = filename.split("site-packages" + os.sep, 1)[1]
+    elif filename.startswith(_STDLIB_ROOT):
+        filename = os.path.relpath(filename, _STDLIB_ROOT)
+    return f"{frame.f_code.co_name} ({filename}:{frame.f_lineno})"
+
+
+def _awaited_by(awaitable):
+    """Next object in a coroutine's await chain (coroutines, generators, async generators)"""
+    for attr in ("cr_await", "gi_yieldfrom", "ag_await"):
+        if hasattr(awaitable, attr):
+            return getattr(awaitable, attr)
+    return None
+
+
+def _frame_of(awaitable):
+    for attr in ("cr_frame", "gi_frame", "ag_frame"):
+        frame = getattr(awaitable, attr, None)
+        if frame is not None:
+            return frame
+    return None
+
+
+class TaskSampler:
+    """
+    Samples one asyncio task's stack from a background thread. Only frames
+    below `root` (the frame that started profiling) are recorded.
+    """
+
+    def __init__(self, task: asyncio.Task, root, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.task = task
+        self.root = root
+        self.loop = task.get_loop()
+        self.thread_id = threading.get_ident()
+        self.interval = interval_ms / 1000
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                stack = self.sample()
+            except Exception:
+                # The task's frames changed under us; drop this sample
+                continue
+            if stack:
+                self.stacks[";".join(stack)] += 1
+                self.samples += 1
+
+    def sample(self) -> List[str]:
+        """Root-first frame labels for where the task is right now"""
+        if asyncio.current_task(self.loop) is self.task:
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                if frame is self.root:
+                    return stack[::-1]
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            # Between steps of the task; fall through to the await chain
+        stack = None
+        awaitable = self.task.get_coro()
+        while awaitable is not None:
+            frame = _frame_of(awaitable)
+            if frame is None:
+                break
+            if stack is not None:
+                stack.append(_frame_label(frame))
+            elif frame is self.root:
+                stack = []
+            awaitable = _awaited_by(awaitable)
+        if not stack:
+            return []
+        stack.append(WAITING_FRAME)
+        return stack
+
+
+def summarize_stacks(stacks: Counter, limit: int = TOP_FRAMES) -> List[Dict[str, Any]]:
+    """Frames ordered by inclusive samples, with their self (leaf) samples"""
+    total: Counter = Counter()
+    own: Counter = Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(";")
+        for frame in set(frames):
+            total[frame] += count
+        leaf = frames[-2] if frames[-1] == WAITING_FRAME and len(frames) > 1 else frames[-1]
+        own[leaf] += count
+    return [
+        {"frame": frame, "total": count, "self": own.get(frame, 0)}
+        for frame, count in total.most_common(limit)
+        if frame != WAITING_FRAME
+    ]
+
+
+class ProfileStore:
+    """Profiles as JSON files in a directory, newest PROFILE_MAX_STORED kept"""
+
+    def __init__(self, directory: str = PROFILE_DIR, max_stored: int = PROFILE_MAX_STORED):
+        self.directory = directory
+        self.max_stored = max_stored
+
+    def _path(self, profile_id: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}.json")
+
+    def save(self, profile: Dict[str, Any]):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(profile["id"]), "w", encoding="utf-8") as f:
+            json.dump(profile, f)
+        for path in self._files()[self.max_stored:]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _files(self) -> List[str]:
+        """Profile files, newest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        paths = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith(".json")]
+        return sorted(paths, key=os.path.getmtime, reverse=True)
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        if not _PROFILE_ID.match(profile_id):
+            return None
+        try:
+            with open(self._path(profile_id), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def list(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Metadata of the newest profiles (without stacks)"""
+        profiles = []
+        for path in self._files()[:limit]:
+            try:
+                with open(path, encoding="utf-8") as f:
+                    profile = json.load(f)
+            except (OSError, ValueError):
+                continue
+            profile.pop("folded", None)
+            profile.pop("top", None)
+            profiles.append(profile)
+        return profiles
+
+
+def profile_requested(scope: Dict[str, Any]) -> bool:
+    request = Request(scope)
+    flag = request.headers.get(PROFILE_HEADER) or request.query_params.get(PROFILE_QUERY_PARAM)
+    return (flag or "").lower() in ("1", "true", "yes")
+
+
+async def admin_user(scope: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """The authenticated user if it has the admin role, otherwise None"""
+    from utils.auth import get_current_user
+
+    request = Request(scope)
+    authorization = request.headers.get("authorization", "")
+    token = authorization[7:] if authorization.lower().startswith("bearer ") else None
+    try:
+        user = await get_current_user(request, token)
+    except HTTPException:
+        return None
+    return user if user.get("role") == "admin" else None
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that profiles flagged admin requests. Registered before
+    the @app.middleware functions so it is the innermost layer and runs in
+    the same task as the route handler.
+    """
+
+    def __init__(self, app, store: Optional[ProfileStore] = None, sample_rate: Optional[float] = None,
+                 interval_ms: Optional[float] = None):
+        self.app = app
+        self.store = store or profile_store
+        self.sample_rate = PROFILE_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.interval_ms = interval_ms or PROFILE_INTERVAL_MS
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not profile_requested(scope) or random.random() >= self.sample_rate:
+            return await self.app(scope, receive, send)
+        user = await admin_user(scope)
+        if user is None:
+            return await self.app(scope, receive, send)
+
+        profile_id = uuid.uuid4().hex
+        status_code = 500
+
+        async def send_with_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        sampler = TaskSampler(asyncio.current_task(), sys._getframe(), self.interval_ms)
+        started_at = datetime.now()
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            sampler.stop()
+            duration = time.perf_counter() - start
+            profile = {
+                "id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": route_template(scope),
+                "status": status_code,
+                "user_id": user.get("id"),
+                "started_at": started_at.isoformat(timespec="milliseconds"),
+                "duration_ms": round(duration * 1000, 1),
+                "interval_ms": self.interval_ms,
+                "samples": sampler.samples,
+                "top": summarize_stacks(sampler.stacks),
+                "folded": "\n".join(f"{stack} {count}" for stack, count in sampler.stacks.most_common()),
+            }
+            try:
+                await asyncio.to_thread(self.store.save, profile)
+                logger.info(f"🔬 Profiled {scope['method']} {scope['path']} ({profile['duration_ms']}ms, {sampler.samples} samples) -> {profile_id}")
+            except Exception as e:
+                logger.error(f"❌ Failed to save profile {profile_id}: {str(e)}")
+
+
+# Global instance
+profile_store = ProfileStore()
@@ -0,0 +1,82 @@
+"""
+Upload validation helpers: size limits and file type sniffing
+"""
+import os
+from typing import BinaryIO, Optional
+from fastapi import HTTPException, UploadFile, status
+
+MAX_UPLOAD_BYTES = int(float(os.getenv("MAX_UPLOAD_MB", "20")) * 1024 * 1024)
+
+# Multipart framing adds a little on top of the file itself
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+EXTENSION_TYPES = {
+    ".pdf": {"pdf"},
+    ".csv": {"csv"},
+    ".xlsx": {"xlsx"},
+    ".xls": {"xls", "xlsx"},  # plenty of ".xls" exports are really OOXML
+}
+
+ALLOWED_CONTENT_TYPES = {
+    None, "", "application/octet-stream",
+    "application/pdf", "application/x-pdf",
+    "text/csv", "text/plain", "application/csv", "text/comma-separated-values",
+    "application/vnd.ms-excel",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+SNIFF_BYTES = 2048
+
+
+def sniff_file_type(head: bytes) -> Optional[str]:
+    """Identify a statement file from its leading bytes"""
+    if head.startswith(b"%PDF-"):
+        return "pdf"
+    if head.startswith(b"PK\x03\x04"):
+        return "xlsx"
+    if head.startswith(b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"):
+        return "xls"
+    if head and b"\x00" not in head:
+        return "csv"
+    return None
+
+
+def open_upload(file: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> BinaryIO:
+    """
+    Validate an uploaded statement and return its spooled file handle,
+    rewound, so extractors can stream from it without a bytes copy.
+    """
+    content_type = (file.content_type or "").split(";")[0].strip().lower()
+    if content_type not in ALLOWED_CONTENT_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Unsupported content type '{content_type}'. Please upload PDF, Excel, or CSV."
+        )
+
+    extension = os.path.splitext((file.filename or "").lower())[1]
+    if extension not in EXTENSION_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Unsupported file format. Please upload PDF, Excel, or CSV."
+        )
+
+    handle = file.file
+    size = file.size
+    if size is None:
+        handle.seek(0, os.SEEK_END)
+        size = handle.tell()
+    if size > max_bytes:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File too large. Maximum upload size is {max_bytes // (1024 * 1024)}MB."
+        )
+
+    handle.seek(0)
+    head = handle.read(SNIFF_BYTES)
+    handle.seek(0)
+    if sniff_file_type(head) not in EXTENSION_TYPES[extension]:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"File content does not match its '{extension}' extension."
+        )
+    return handle